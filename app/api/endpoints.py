@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.core.config import settings
 
 router = APIRouter()
@@ -6,3 +7,8 @@ router = APIRouter()
 @router.get("/health")
 async def health_check():
     return {"status": "ok", "app": settings.PROJECT_NAME}
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus exposition of this process's metrics (workers push theirs)."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,58 @@
+"""
+Telegram webhook ingestion.
+
+Used instead of long polling when BOT_MODE=webhook. Every replica can serve
+this route, so bot-side throughput scales with the number of uvicorn workers
+behind the load balancer. Updates are acknowledged immediately and handled
+in the background, since Telegram redelivers anything not acknowledged
+quickly.
+"""
+import hmac
+import asyncio
+import logging
+from fastapi import APIRouter, Header, HTTPException, Request
+from aiogram.types import Update
+from app.core.config import settings
+from app.db.redis_client import mark_update_seen
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Strong references to in-flight update handlers so they aren't garbage collected
+_pending_updates: set[asyncio.Task] = set()
+
+
+async def _process_update(request: Request, update: Update):
+    try:
+        await request.app.state.dp.feed_update(request.app.state.bot, update)
+    except Exception as e:
+        logger.error(f"Failed to handle update {update.update_id}: {e}")
+
+
+@router.post(settings.WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: str | None = Header(default=None),
+):
+    secret = settings.WEBHOOK_SECRET
+    if not secret or not hmac.compare_digest(x_telegram_bot_api_secret_token or "", secret):
+        raise HTTPException(status_code=403, detail="Invalid secret token")
+
+    update = Update.model_validate(await request.json(), context={"bot": request.app.state.bot})
+
+    # Telegram retries deliveries, and retries may land on a different replica
+    if not await mark_update_seen(update.update_id):
+        logger.info(f"Skipping duplicate update {update.update_id}")
+        return {"ok": True}
+
+    task = asyncio.create_task(_process_update(request, update))
+    _pending_updates.add(task)
+    task.add_done_callback(_pending_updates.discard)
+    return {"ok": True}
+
+
+async def drain_pending_updates(timeout: float = 30):
+    """Wait for in-flight updates to finish handling, e.g. on shutdown."""
+    if _pending_updates:
+        await asyncio.wait(set(_pending_updates), timeout=timeout)
@@ -1,26 +1,35 @@
 import logging
+import uuid
 import asyncio
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message
 from app.services.youtube import extract_video_id
 from app.bot.tasks import process_video_task
-from app.bot.session import (
-    set_current_video, get_current_video, 
-    set_user_language, get_user_language,
-    add_to_conversation_history, get_conversation_history,
-    clear_conversation_history
-)
+from app.bot.task_listener import task_listener
+from app.bot.session import UserSession, SessionMiddleware
 from app.services.translation import (
-    translate_text, detect_language_request,
+    translate_text, get_translated_summary, detect_language_request,
     is_supported_language, get_supported_languages_str
 )
-from app.services.llm import answer_question, generate_deepdive, generate_actionpoints
-from app.rag.vector_store import VectorStore
-from app.db.redis_client import check_rate_limit, get_rate_limit_remaining
+from app.services.llm import (
+    answer_question, stream_answer_question,
+    generate_deepdive, stream_deepdive, get_actionpoints
+)
+from app.bot.streaming import StreamingReply
+from app.bot.ui_strings import ui_text
+from app.bot.outbound import outbound
+from app.rag.vector_store import AsyncVectorStore, aembed_query
+from app.rag.answer_cache import answer_cache, is_follow_up
+from app.db.redis_client import (
+    claim_video_job, get_video_job_owner, get_task_result,
+    read_summary_stream
+)
 from app.db.persistence import save_qa_history
 
 router = Router()
+# Loads each update's session in one round trip and flushes it at the end
+router.message.middleware(SessionMiddleware())
 logger = logging.getLogger(__name__)
 
 # ── Rate Limit Config ──────────────────────────────────────────────────────
@@ -29,43 +38,29 @@ VIDEO_RATE_WINDOW = 3600      # 1 hour
 QUESTION_RATE_LIMIT = 30      # max questions per window
 QUESTION_RATE_WINDOW = 3600   # 1 hour
 TASK_TIMEOUT = 300            # max seconds to wait for Celery task
+LEASE_CHECK_INTERVAL = 15     # seconds between liveness checks on an attached job
 
-
-WELCOME_MSG = (
-    "👋 Welcome to the YouTube AI Assistant!\n\n"
-    "Here's what I can do:\n"
-    "1️⃣ Send me a YouTube link → get a structured summary\n"
-    "2️⃣ /summary <link> → summarize a video\n"
-    "3️⃣ Ask me any question about the video\n"
-    "4️⃣ /deepdive <topic> → deep analysis of a topic\n"
-    "5️⃣ /actionpoints → extract all action items\n"
-    "6️⃣ /language <lang> → change output language\n"
-    "7️⃣ /help → show this message again\n\n"
-    "💡 You can also say things like 'Summarize in Hindi' or 'Explain in Tamil'!\n"
-    "🌐 Supported: English, Hindi, Tamil, Telugu, Kannada, Marathi, Bengali, Gujarati, Malayalam, Punjabi"
-)
+VIDEO_RATE_FLAG = {"rate_limit": ("video", VIDEO_RATE_LIMIT, VIDEO_RATE_WINDOW)}
+QUESTION_RATE_FLAG = {"rate_limit": ("question", QUESTION_RATE_LIMIT, QUESTION_RATE_WINDOW)}
 
 
 @router.message(Command("start"))
-async def cmd_start(message: Message):
-    lang = await get_user_language(message.from_user.id)
-    translated = await translate_text(WELCOME_MSG, lang)
-    await message.answer(translated)
+async def cmd_start(message: Message, session: UserSession):
+    await outbound.answer(message, await ui_text("welcome", session.language))
 
 
 @router.message(Command("help"))
-async def cmd_help(message: Message):
+async def cmd_help(message: Message, session: UserSession):
     """Alias for /start — shows available commands."""
-    lang = await get_user_language(message.from_user.id)
-    translated = await translate_text(WELCOME_MSG, lang)
-    await message.answer(translated)
+    await outbound.answer(message, await ui_text("welcome", session.language))
 
 
 @router.message(Command("language"))
-async def cmd_language(message: Message):
+async def cmd_language(message: Message, session: UserSession):
     args = message.text.split(maxsplit=1)
     if len(args) < 2:
-        await message.answer(
+        await outbound.answer(
+            message,
             f"Please specify a language. Example: /language Hindi\n\n"
             f"🌐 Supported languages: {get_supported_languages_str()}"
         )
@@ -75,52 +70,53 @@ async def cmd_language(message: Message):
     
     # Validate against supported languages
     if not is_supported_language(new_lang):
-        await message.answer(
+        await outbound.answer(
+            message,
             f"❌ '{new_lang}' is not supported.\n\n"
             f"🌐 Supported languages: {get_supported_languages_str()}"
         )
         return
     
-    await set_user_language(message.from_user.id, new_lang)
-    await message.answer(f"✅ Language set to **{new_lang}**. All future responses will be in {new_lang}.")
+    session.set_language(new_lang)
+    await outbound.answer(message, f"✅ Language set to **{new_lang}**. All future responses will be in {new_lang}.")
 
 
-@router.message(Command("summary"))
-async def cmd_summary(message: Message):
+@router.message(Command("summary"), flags=VIDEO_RATE_FLAG)
+async def cmd_summary(message: Message, session: UserSession):
     args = message.text.split(maxsplit=1)
     if len(args) < 2:
-        await message.answer("Please provide a YouTube link. Example: /summary https://youtube.com/...")
+        session.refund_rate_limit()
+        await outbound.answer(message, "Please provide a YouTube link. Example: /summary https://youtube.com/...")
         return
-    await process_video_request(message, args[1])
+    await process_video_request(message, session, args[1])
 
 
-@router.message(Command("deepdive"))
-async def cmd_deepdive(message: Message):
+@router.message(Command("deepdive"), flags=QUESTION_RATE_FLAG)
+async def cmd_deepdive(message: Message, session: UserSession):
     """Deep dive into a specific topic from the current video."""
-    user_id = message.from_user.id
     args = message.text.split(maxsplit=1)
     
     if len(args) < 2:
-        await message.answer("Please provide a topic. Example: /deepdive pricing strategy")
+        session.refund_rate_limit()
+        await outbound.answer(message, "Please provide a topic. Example: /deepdive pricing strategy")
         return
     
-    video_id = await get_current_video(user_id)
-    lang = await get_user_language(user_id)
+    video_id = session.current_video
+    lang = session.language
     
     if not video_id:
-        msg = await translate_text("Please send a YouTube video link first before using /deepdive.", lang)
-        await message.answer(msg)
+        session.refund_rate_limit()
+        msg = await ui_text("deepdive_no_video", lang)
+        await outbound.answer(message, msg)
         return
     
-    # Rate limit check
-    allowed = await check_rate_limit(user_id, "question", QUESTION_RATE_LIMIT, QUESTION_RATE_WINDOW)
-    if not allowed:
-        remaining = await get_rate_limit_remaining(user_id, "question", QUESTION_RATE_LIMIT)
-        await message.answer(f"⏳ Rate limit reached. You can ask up to {QUESTION_RATE_LIMIT} questions per hour. Try again later.")
+    # Rate limit check (consumed atomically when the session was loaded)
+    if not session.allowed:
+        await outbound.answer(message, f"⏳ Rate limit reached. You can ask up to {QUESTION_RATE_LIMIT} questions per hour. Try again later.")
         return
     
     topic = args[1].strip()
-    status_msg = await message.answer(await translate_text("🔬 Performing deep dive analysis...", lang))
+    status_msg = await outbound.answer(message, await ui_text("deepdive_status", lang))
     
     try:
         # Translate topic to English for retrieval if needed
@@ -130,87 +126,80 @@ async def cmd_deepdive(message: Message):
             english_topic = topic
         
         # Search vector store with more chunks for deep dive
-        vector_store = VectorStore(video_id=video_id)
-        results = vector_store.search(english_topic, top_k=8)
+        vector_store = await AsyncVectorStore.open(video_id)
+        results = await vector_store.asearch(english_topic, top_k=8)
         
         if not results:
-            msg = await translate_text("Video data unavailable. Please process the video again.", lang)
-            await status_msg.edit_text(msg)
+            msg = await ui_text("video_unavailable", lang)
+            await outbound.edit_text(status_msg, msg)
             return
         
-        context_text = "\n\n".join([r['text'] for r in results])
+        # Generate deep dive (streamed straight into the chat for English)
+        if lang.lower() == "english":
+            await StreamingReply(message, status_msg).consume(stream_deepdive(results, english_topic))
+            return
         
-        # Generate deep dive
-        analysis = await generate_deepdive(context_text, english_topic)
+        analysis = await generate_deepdive(results, english_topic)
         final = await translate_text(analysis, lang)
         
         await _send_long_message(message, status_msg, final)
     except ValueError as e:
-        await status_msg.edit_text(str(e))
+        await outbound.edit_text(status_msg, str(e))
     except Exception as e:
         logger.error(f"Deep dive error: {e}")
-        await status_msg.edit_text("❌ An error occurred during analysis. Please try again.")
+        await outbound.edit_text(status_msg, "❌ An error occurred during analysis. Please try again.")
 
 
-@router.message(Command("actionpoints"))
-async def cmd_actionpoints(message: Message):
+@router.message(Command("actionpoints"), flags=QUESTION_RATE_FLAG)
+async def cmd_actionpoints(message: Message, session: UserSession):
     """Extract action points from the current video."""
-    user_id = message.from_user.id
-    video_id = await get_current_video(user_id)
-    lang = await get_user_language(user_id)
+    video_id = session.current_video
+    lang = session.language
     
     if not video_id:
-        msg = await translate_text("Please send a YouTube video link first before using /actionpoints.", lang)
-        await message.answer(msg)
+        session.refund_rate_limit()
+        msg = await ui_text("actionpoints_no_video", lang)
+        await outbound.answer(message, msg)
         return
     
-    # Rate limit check
-    allowed = await check_rate_limit(user_id, "question", QUESTION_RATE_LIMIT, QUESTION_RATE_WINDOW)
-    if not allowed:
-        await message.answer(f"⏳ Rate limit reached. Try again later.")
+    # Rate limit check (consumed atomically when the session was loaded)
+    if not session.allowed:
+        await outbound.answer(message, f"⏳ Rate limit reached. Try again later.")
         return
     
-    status_msg = await message.answer(await translate_text("📋 Extracting action points...", lang))
+    status_msg = await outbound.answer(message, await ui_text("actionpoints_status", lang))
     
     try:
-        # Get all available context
-        vector_store = VectorStore(video_id=video_id)
-        # Use a broad query to get representative chunks
-        results = vector_store.search("main topics actions recommendations steps", top_k=10)
+        # Cached per video; generated from representative chunks on a miss
+        actionpoints = await get_actionpoints(video_id)
         
-        if not results:
-            msg = await translate_text("Video data unavailable. Please process the video again.", lang)
-            await status_msg.edit_text(msg)
+        if actionpoints is None:
+            msg = await ui_text("video_unavailable", lang)
+            await outbound.edit_text(status_msg, msg)
             return
         
-        context_text = "\n\n".join([r['text'] for r in results])
-        
-        # Generate action points
-        actionpoints = await generate_actionpoints(context_text)
         final = await translate_text(actionpoints, lang)
         
         await _send_long_message(message, status_msg, final)
     except ValueError as e:
-        await status_msg.edit_text(str(e))
+        await outbound.edit_text(status_msg, str(e))
     except Exception as e:
         logger.error(f"Action points error: {e}")
-        await status_msg.edit_text("❌ An error occurred during extraction. Please try again.")
+        await outbound.edit_text(status_msg, "❌ An error occurred during extraction. Please try again.")
 
 
-@router.message(F.text.regexp(r'(https?://)?(www\.)?(youtube\.com|youtu\.?be)/.+'))
-async def handle_youtube_link(message: Message):
-    await process_video_request(message, message.text)
+@router.message(F.text.regexp(r'(https?://)?(www\.)?(youtube\.com|youtu\.?be)/.+'), flags=VIDEO_RATE_FLAG)
+async def handle_youtube_link(message: Message, session: UserSession):
+    await process_video_request(message, session, message.text)
 
 
-async def process_video_request(message: Message, url: str):
-    user_id = message.from_user.id
-    lang = await get_user_language(user_id)
+async def process_video_request(message: Message, session: UserSession, url: str):
+    lang = session.language
     
-    # ── Rate Limit Check ─────────────────────────────────────────────────
-    allowed = await check_rate_limit(user_id, "video", VIDEO_RATE_LIMIT, VIDEO_RATE_WINDOW)
-    if not allowed:
-        remaining = await get_rate_limit_remaining(user_id, "video", VIDEO_RATE_LIMIT)
-        await message.answer(
+    # ── Rate Limit Check (consumed atomically when the session was loaded) ─
+    if not session.allowed:
+        await outbound.answer(
+            message,
             f"⏳ Rate limit reached. You can process up to {VIDEO_RATE_LIMIT} videos per hour. "
             f"Try again later."
         )
@@ -218,121 +207,179 @@ async def process_video_request(message: Message, url: str):
     
     video_id = extract_video_id(url)
     if not video_id:
-        msg = await translate_text("❌ Invalid YouTube URL. Please make sure it's a valid link.", lang)
-        await message.answer(msg)
+        msg = await ui_text("invalid_url", lang)
+        await outbound.answer(message, msg)
         return
         
-    await set_current_video(user_id, video_id)
-    # Clear conversation history for the new video
-    await clear_conversation_history(user_id, video_id)
+    # Switch video and clear its conversation history. Flushed right away
+    # since processing can take minutes and other updates must see the switch.
+    session.switch_video(video_id)
+    await session.flush()
     
-    processing_msg = await translate_text(
-        f"⏳ Processing video `{video_id}`... This may take a moment.", lang
-    )
-    status_msg = await message.answer(processing_msg)
+    processing_msg = await ui_text("processing", lang, video_id=video_id)
+    status_msg = await outbound.answer(message, processing_msg)
     
-    # Hand off to Celery
-    task = process_video_task.delay(video_id)
+    # English users watch the summary stream in as the worker generates it
+    reply = StreamingReply(message, status_msg) if lang.lower() == "english" else None
     
-    # ── Non-blocking poll with TIMEOUT ───────────────────────────────────
-    elapsed = 0
-    poll_interval = 2
-    while not task.ready() and elapsed < TASK_TIMEOUT:
-        await asyncio.sleep(poll_interval)
-        elapsed += poll_interval
+    # Hand off to Celery, or attach to the job already running for this video
+    result = await _run_video_job(video_id, reply, language=lang)
     
-    if not task.ready():
-        error_msg = await translate_text(
-            "⏱ Processing is taking too long. The video may be very large. Please try again later.", lang
-        )
-        await status_msg.edit_text(error_msg)
-        return
-        
-    # task.result may be an exception if the Celery task raised after retries
-    result = task.result
-    if isinstance(result, Exception):
-        logger.error(f"Celery task failed with exception: {result}")
-        error_msg = await translate_text(
-            f"❌ Processing failed: {str(result)}. Please try again.", lang
-        )
-        await status_msg.edit_text(error_msg)
+    if result is None:
+        error_msg = await ui_text("processing_timeout", lang)
+        await outbound.edit_text(status_msg, error_msg)
         return
 
     if not result:
-        error_msg = await translate_text("❌ Processing failed unexpectedly. Please try again.", lang)
-        await status_msg.edit_text(error_msg)
+        error_msg = await ui_text("processing_failed", lang)
+        await outbound.edit_text(status_msg, error_msg)
         return
         
     if not isinstance(result, dict):
         logger.error(f"Unexpected task result type: {type(result)}")
-        error_msg = await translate_text("❌ Processing failed unexpectedly. Please try again.", lang)
-        await status_msg.edit_text(error_msg)
+        error_msg = await ui_text("processing_failed", lang)
+        await outbound.edit_text(status_msg, error_msg)
         return
 
     if result.get("status") == "error":
         error_msg = await translate_text(f"❌ Error: {result.get('message')}", lang)
-        await status_msg.edit_text(error_msg)
+        await outbound.edit_text(status_msg, error_msg)
         return
         
     summary = result.get("summary")
     cached_indicator = " ⚡ (cached)" if result.get("cached") else ""
-    translated_summary = await translate_text(summary, lang)
+    if result.get("translated_summary") and result.get("language") == lang.lower():
+        translated_summary = result["translated_summary"]
+    else:
+        # Attached to a job for another language, or the worker couldn't translate
+        translated_summary = await get_translated_summary(video_id, summary, lang)
     translated_summary += cached_indicator
     
-    await _send_long_message(message, status_msg, translated_summary)
+    if reply:
+        await reply.complete(translated_summary)
+    else:
+        await _send_long_message(message, status_msg, translated_summary)
+
 
+async def _tail_summary_stream(task_id: str, reply: StreamingReply):
+    """Render a worker's summary stream into the reply until it is done."""
+    last_id = "0"
+    try:
+        while True:
+            for entry_id, fields in await read_summary_stream(task_id, last_id):
+                last_id = entry_id
+                if "reset" in fields:
+                    await reply.reset()
+                elif "text" in fields:
+                    await reply.feed(fields["text"])
+                elif "done" in fields:
+                    return
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        # Progressive rendering is optional; the final result still arrives
+        logger.warning(f"Stopped tailing summary stream for task {task_id}: {e}")
 
-@router.message(F.text)
-async def handle_question(message: Message):
+
+async def _run_video_job(video_id: str, reply: StreamingReply | None = None,
+                         language: str = "english") -> dict | None:
+    """Wait for the single in-flight processing job of a video.
+    
+    Claims the video's job lease and enqueues a Celery task, or attaches to
+    the task that already holds it so concurrent requests share one result.
+    If the holder's lease expires without a result, the job is taken over.
+    With a `reply`, the summary is rendered progressively while waiting.
+    A new task also translates the summary into `language`.
+    Returns None on TIMEOUT.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + TASK_TIMEOUT
+    
+    while loop.time() < deadline:
+        task_id = str(uuid.uuid4())
+        owner = await claim_video_job(video_id, task_id)
+        if owner == task_id:
+            process_video_task.apply_async(args=[video_id, language], task_id=task_id)
+        else:
+            logger.info(f"Attaching to in-flight task {owner} for video {video_id}")
+        
+        tail = asyncio.create_task(_tail_summary_stream(owner, reply)) if reply else None
+        try:
+            # ── Wait for the worker's completion notification ────────────
+            while (remaining := deadline - loop.time()) > 0:
+                result = await task_listener.wait_for_result(owner, min(remaining, LEASE_CHECK_INTERVAL))
+                if result is not None:
+                    return result
+                if await get_video_job_owner(video_id) != owner:
+                    # Lease released or expired: use the result if there is one, else take over
+                    result = await get_task_result(owner)
+                    if result is not None:
+                        return result
+                    logger.warning(f"Task {owner} for video {video_id} lost its lease, taking over")
+                    break
+        finally:
+            if tail:
+                tail.cancel()
+    
+    return None
+
+
+@router.message(F.text, flags=QUESTION_RATE_FLAG)
+async def handle_question(message: Message, session: UserSession):
     """Fallback handler. Handles questions and inline language detection."""
     user_id = message.from_user.id
     text = message.text
     
     if text.startswith("/"):
+        session.refund_rate_limit()
         return
     
-    lang = await get_user_language(user_id)
+    lang = session.language
     
     # ── Inline Language Detection ────────────────────────────────────────
     detected_lang = await detect_language_request(text)
     if detected_lang:
+        # Not a question, give back the slot consumed on load
+        session.refund_rate_limit()
+        
         # Validate the detected language
         if not is_supported_language(detected_lang):
-            await message.answer(
+            await outbound.answer(
+                message,
                 f"❌ '{detected_lang}' is not supported.\n"
                 f"🌐 Supported: {get_supported_languages_str()}"
             )
             return
         
-        await set_user_language(user_id, detected_lang)
+        session.set_language(detected_lang)
         lang = detected_lang
-        await message.answer(f"🌐 Language switched to **{detected_lang}**!")
+        await outbound.answer(message, f"🌐 Language switched to **{detected_lang}**!")
         
         # If user also has a video loaded, re-send the summary in new language
-        video_id = await get_current_video(user_id)
+        video_id = session.current_video
         if video_id:
             from app.db.redis_client import get_cached_summary
             cached = await get_cached_summary(video_id)
             if cached:
-                translated = await translate_text(cached, lang)
+                translated = await get_translated_summary(video_id, cached, lang)
                 await _send_long_message(message, None, translated)
         return
     
     # ── Q&A Flow ─────────────────────────────────────────────────────────
-    video_id = await get_current_video(user_id)
+    video_id = session.current_video
     
     if not video_id:
-        msg = await translate_text("📎 Please send a YouTube video link first before asking questions.", lang)
-        await message.answer(msg)
+        session.refund_rate_limit()
+        msg = await ui_text("question_no_video", lang)
+        await outbound.answer(message, msg)
         return
     
-    # Rate limit check
-    allowed = await check_rate_limit(user_id, "question", QUESTION_RATE_LIMIT, QUESTION_RATE_WINDOW)
-    if not allowed:
-        await message.answer(f"⏳ Rate limit reached ({QUESTION_RATE_LIMIT} questions/hour). Try again later.")
+    # Rate limit check (consumed atomically when the session was loaded)
+    if not session.allowed:
+        await outbound.answer(message, f"⏳ Rate limit reached ({QUESTION_RATE_LIMIT} questions/hour). Try again later.")
         return
         
-    status_msg = await message.answer(await translate_text("🤔 Thinking...", lang))
+    status_msg = await outbound.answer(message, await ui_text("thinking", lang))
     
     try:
         if lang.lower() != "english":
@@ -340,25 +387,45 @@ async def handle_question(message: Message):
         else:
             english_question = text
             
-        # Search Vector Store
-        vector_store = VectorStore(video_id=video_id)
-        results = vector_store.search(english_question, top_k=5)
+        # Conversation history for context-aware answers (loaded with the session)
+        history = session.history
         
-        if not results:
-            msg = await translate_text("📎 Video data unavailable. Please process the video again.", lang)
-            await status_msg.edit_text(msg)
-            return
-            
-        context_text = "\n\n".join([r['text'] for r in results])
+        # Embedded once, for both the answer cache and the vector search
+        query_embedding = await aembed_query(english_question)
         
-        # Get conversation history for context-aware answers
-        history = await get_conversation_history(user_id, video_id)
+        # Follow-ups depend on this conversation, so they skip the shared cache
+        follow_up = is_follow_up(english_question, history)
+        if follow_up:
+            answer_cache.record_bypass()
+            answer = None
+        else:
+            answer = await answer_cache.lookup(video_id, query_embedding)
         
-        # Generate Answer with history
-        answer = await answer_question(context_text, english_question, history=history)
+        if answer is not None:
+            if lang.lower() == "english":
+                await _send_long_message(message, status_msg, answer)
+        else:
+            # Search Vector Store
+            vector_store = await AsyncVectorStore.open(video_id)
+            results = await vector_store.asearch(english_question, top_k=5, query_embedding=query_embedding)
+            
+            if not results:
+                msg = await ui_text("question_video_unavailable", lang)
+                await outbound.edit_text(status_msg, msg)
+                return
+                
+            # Generate Answer with history (streamed straight into the chat for English)
+            if lang.lower() == "english":
+                stream = stream_answer_question(results, english_question, history=history)
+                answer = await StreamingReply(message, status_msg).consume(stream)
+            else:
+                answer = await answer_question(results, english_question, history=history)
+            
+            if not follow_up:
+                await answer_cache.store(video_id, english_question, query_embedding, answer)
         
-        # Store in conversation history
-        await add_to_conversation_history(user_id, video_id, english_question, answer)
+        # Store in conversation history (written when the session is flushed)
+        session.add_history(english_question, answer)
         
         # Persist Q&A to PostgreSQL (non-blocking, don't fail on error)
         try:
@@ -366,29 +433,29 @@ async def handle_question(message: Message):
         except Exception as db_err:
             logger.warning(f"Failed to persist Q&A to PostgreSQL: {db_err}")
         
-        final_answer = await translate_text(answer, lang)
-        
-        await status_msg.edit_text(final_answer)
+        if lang.lower() != "english":
+            final_answer = await translate_text(answer, lang)
+            await outbound.edit_text(status_msg, final_answer)
     except ValueError as e:
-        await status_msg.edit_text(str(e))
+        await outbound.edit_text(status_msg, str(e))
     except Exception as e:
         logger.error(f"Q&A error: {e}")
-        await status_msg.edit_text("❌ An error occurred. Please try again.")
+        await outbound.edit_text(status_msg, "❌ An error occurred. Please try again.")
 
 
 async def _send_long_message(message: Message, status_msg, text: str):
     """Send long text as multiple messages if exceeding Telegram's 4096 char limit."""
     if len(text) <= 4000:
         if status_msg:
-            await status_msg.edit_text(text)
+            await outbound.edit_text(status_msg, text)
         else:
-            await message.answer(text)
+            await outbound.answer(message, text)
     else:
         # Delete the status message and send as multiple parts
         if status_msg:
             try:
-                await status_msg.delete()
+                await outbound.delete(status_msg)
             except Exception:
                 pass
         for i in range(0, len(text), 4000):
-            await message.answer(text[i:i+4000])
+            await outbound.answer(message, text[i:i+4000])
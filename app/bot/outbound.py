@@ -0,0 +1,202 @@
+"""
+Central outbound queue for every Telegram send, edit and delete.
+
+Keeps the bot inside Telegram's flood limits instead of reacting to 429s:
+- a global pace of ~30 requests per second across all chats
+- per-chat pacing (1 per second in private chats, 20 per minute in groups)
+- `retry_after` from a 429 pauses that chat and the request is retried
+- an edit still waiting in the queue is superseded by a newer edit of the
+  same message, so only the latest text is sent
+Requests to one chat are executed in order.
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from aiogram.types import Message
+from aiogram.exceptions import TelegramRetryAfter
+from app.core.metrics import OUTBOUND_QUEUE_DEPTH, OUTBOUND_WAIT_SECONDS, OUTBOUND_COALESCED
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_RATE = 30              # requests per second across all chats
+PRIVATE_CHAT_INTERVAL = 1.0   # seconds between requests to a private chat
+GROUP_CHAT_INTERVAL = 3.0     # 20 per minute in groups
+
+
+@dataclass
+class _Op:
+    kind: str                 # "send", "edit" or "delete"
+    target: Message
+    text: str | None = None
+    kwargs: dict = field(default_factory=dict)
+    futures: list[asyncio.Future] = field(default_factory=list)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    def call(self):
+        if self.kind == "send":
+            return self.target.answer(self.text, **self.kwargs)
+        if self.kind == "edit":
+            return self.target.edit_text(self.text, **self.kwargs)
+        return self.target.delete()
+
+
+class OutboundDispatcher:
+    """Paces and orders outbound Telegram requests per chat and globally."""
+
+    def __init__(self, global_rate: float = GLOBAL_RATE):
+        self.global_interval = 1 / global_rate
+        self._queues: dict[int, deque[_Op]] = {}
+        self._next_allowed: dict[int, float] = {}
+        self._busy: set[int] = set()
+        self._inflight: set[asyncio.Task] = set()
+        self._next_global = 0.0
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    # ── Public API ────────────────────────────────────────────────────────
+
+    async def answer(self, message: Message, text: str, **kwargs) -> Message:
+        """Send `text` to the chat of `message`."""
+        return await self._submit(_Op("send", message, text, kwargs))
+
+    async def edit_text(self, message: Message, text: str, **kwargs):
+        """Edit a sent message. A still-queued edit of it is replaced."""
+        return await self._submit(_Op("edit", message, text, kwargs))
+
+    async def delete(self, message: Message):
+        return await self._submit(_Op("delete", message))
+
+    async def stop(self, timeout: float = 10):
+        """Send what is still queued (up to `timeout` seconds), then stop."""
+        deadline = time.monotonic() + timeout
+        while (self._queues or self._busy) and self._task and not self._task.done():
+            if time.monotonic() >= deadline:
+                logger.warning(f"Dropping {sum(map(len, self._queues.values()))} queued Telegram requests")
+                break
+            await asyncio.sleep(0.05)
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ── Queueing ──────────────────────────────────────────────────────────
+
+    async def _submit(self, op: _Op):
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        chat_id = op.target.chat.id
+        queue = self._queues.setdefault(chat_id, deque())
+
+        if op.kind == "edit":
+            for pending in queue:
+                if pending.kind == "edit" and pending.target.message_id == op.target.message_id:
+                    pending.text = op.text
+                    pending.kwargs = op.kwargs
+                    pending.futures.append(future)
+                    OUTBOUND_COALESCED.inc()
+                    return await future
+
+        op.futures.append(future)
+        queue.append(op)
+        OUTBOUND_QUEUE_DEPTH.inc()
+        self._wakeup.set()
+        return await future
+
+    def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Queued requests can't outlive the loop they were made on
+            self._queues.clear()
+            self._next_allowed.clear()
+            self._busy.clear()
+            self._task = None
+            self._loop = loop
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _next_ready_chat(self, now: float) -> int | None:
+        """The ready chat whose head request has waited longest."""
+        best, best_enqueued = None, None
+        for chat_id, queue in self._queues.items():
+            if not queue or chat_id in self._busy or self._next_allowed.get(chat_id, 0) > now:
+                continue
+            if best is None or queue[0].enqueued_at < best_enqueued:
+                best, best_enqueued = chat_id, queue[0].enqueued_at
+        return best
+
+    def _seconds_until_ready(self, now: float) -> float | None:
+        waits = [
+            self._next_allowed.get(chat_id, 0) - now
+            for chat_id, queue in self._queues.items()
+            if queue and chat_id not in self._busy
+        ]
+        return max(0.0, min(waits)) if waits else None
+
+    # ── Scheduling ────────────────────────────────────────────────────────
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            chat_id = self._next_ready_chat(now)
+            if chat_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._seconds_until_ready(now))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Global pacing across all chats
+            if self._next_global > now:
+                await asyncio.sleep(self._next_global - now)
+                continue
+            self._next_global = max(now, self._next_global) + self.global_interval
+
+            op = self._queues[chat_id].popleft()
+            OUTBOUND_QUEUE_DEPTH.dec()
+            self._busy.add(chat_id)
+            self._next_allowed[chat_id] = now + self._chat_interval(op.target)
+            task = asyncio.create_task(self._execute(chat_id, op))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _execute(self, chat_id: int, op: _Op):
+        try:
+            result = await op.call()
+        except TelegramRetryAfter as e:
+            logger.warning(f"Telegram flood limit for chat {chat_id}, retrying in {e.retry_after}s")
+            self._queues.setdefault(chat_id, deque()).appendleft(op)
+            OUTBOUND_QUEUE_DEPTH.inc()
+            self._next_allowed[chat_id] = time.monotonic() + e.retry_after
+        except Exception as e:
+            for future in op.futures:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            OUTBOUND_WAIT_SECONDS.labels(kind=op.kind).observe(time.monotonic() - op.enqueued_at)
+            for future in op.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._busy.discard(chat_id)
+            # The queues may have been reset by _ensure_running meanwhile
+            if not self._queues.get(chat_id):
+                self._queues.pop(chat_id, None)
+            self._wakeup.set()
+
+    @staticmethod
+    def _chat_interval(message: Message) -> float:
+        if message.chat.type in ("group", "supergroup"):
+            return GROUP_CHAT_INTERVAL
+        return PRIVATE_CHAT_INTERVAL
+
+
+# Shared per-process dispatcher
+outbound = OutboundDispatcher()
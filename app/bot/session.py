@@ -1,15 +1,26 @@
 import json
-from app.db.redis_client import get_redis
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message
+from app.db.redis_client import get_redis, rate_limit_key
 
 # ── Core Session Helpers ───────────────────────────────────────────────────
+# A user's other keys carry `session:<id>` as their hash tag, so everything the
+# session script touches lives in one Redis Cluster slot.
+
+def _session_key(user_id: int) -> str:
+    return f"session:{user_id}"
+
+def _history_key(user_id: int, video_id: str = "") -> str:
+    return f"history:{{session:{user_id}}}:{video_id}"
 
 async def set_user_session(user_id: int, key: str, value: str):
     redis = await get_redis()
-    await redis.hset(f"session:{user_id}", key, value)
+    await redis.hset(_session_key(user_id), key, value)
 
 async def get_user_session(user_id: int, key: str) -> str | None:
     redis = await get_redis()
-    return await redis.hget(f"session:{user_id}", key)
+    return await redis.hget(_session_key(user_id), key)
 
 # ── Language ───────────────────────────────────────────────────────────────
 
@@ -31,23 +42,24 @@ async def get_current_video(user_id: int) -> str | None:
 # ── Conversation History (per user per video, last N exchanges) ────────────
 
 MAX_HISTORY = 5
+HISTORY_TTL = 21600  # 6 hours
 
 async def add_to_conversation_history(user_id: int, video_id: str, question: str, answer: str):
     """Append a Q&A pair to the user's conversation history for a video."""
     redis = await get_redis()
-    key = f"history:{user_id}:{video_id}"
+    key = _history_key(user_id, video_id)
     
     entry = json.dumps({"question": question, "answer": answer})
     await redis.rpush(key, entry)
     # Keep only last N entries
     await redis.ltrim(key, -MAX_HISTORY, -1)
     # Expire after 6 hours
-    await redis.expire(key, 21600)
+    await redis.expire(key, HISTORY_TTL)
 
 async def get_conversation_history(user_id: int, video_id: str) -> list[dict]:
     """Retrieve conversation history for context-aware Q&A."""
     redis = await get_redis()
-    key = f"history:{user_id}:{video_id}"
+    key = _history_key(user_id, video_id)
     
     entries = await redis.lrange(key, 0, -1)
     return [json.loads(e) for e in entries]
@@ -55,4 +67,149 @@ async def get_conversation_history(user_id: int, video_id: str) -> list[dict]:
 async def clear_conversation_history(user_id: int, video_id: str):
     """Clear conversation history when a new video is processed."""
     redis = await get_redis()
-    await redis.delete(f"history:{user_id}:{video_id}")
+    await redis.delete(_history_key(user_id, video_id))
+
+# ── Per-Update Session (one round trip in, one pipeline out) ───────────────
+# Loads language, current video, that video's history and the rate-limit
+# decision in a single Lua call, buffers mutations, and flushes them in one
+# pipeline once the update is handled.
+
+# KEYS[1] is the session hash, KEYS[2] the rate-limit counter (when checked).
+# The history key depends on the video read here, so it can't be declared up
+# front; its hash tag keeps it in KEYS[1]'s slot.
+_LOAD_SESSION_LUA = """
+local fields = redis.call('HMGET', KEYS[1], 'language', 'current_video')
+
+local history = {}
+if fields[2] then
+    history = redis.call('LRANGE', ARGV[1] .. fields[2], 0, -1)
+end
+
+-- Same atomic check-and-increment as the standalone rate limiter
+local allowed = 1
+if KEYS[2] then
+    local max_count = tonumber(ARGV[2])
+    local current = tonumber(redis.call('GET', KEYS[2]) or '0')
+    if current >= max_count then
+        allowed = 0
+    elseif redis.call('INCR', KEYS[2]) == 1 then
+        redis.call('EXPIRE', KEYS[2], tonumber(ARGV[3]))
+    end
+end
+
+return {fields[1], fields[2], history, allowed}
+"""
+
+# Gives back a rate-limit slot, unless the window already expired
+_REFUND_RATE_LIMIT_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('DECR', KEYS[1])
+end
+return 0
+"""
+
+
+class UserSession:
+    """A user's session state for the duration of one update."""
+    
+    def __init__(self, user_id: int, language: str | None, current_video: str | None,
+                 history: list[dict], rate_action: str | None = None, allowed: bool = True):
+        self.user_id = user_id
+        self.language = language or "english"
+        self.current_video = current_video
+        self.history = history
+        self.rate_action = rate_action
+        self.allowed = allowed
+        
+        self._fields: dict[str, str] = {}
+        self._clear_history = False
+        self._new_history: list[str] = []
+        self._refund = False
+    
+    @classmethod
+    async def load(cls, user_id: int, rate_limit: tuple[str, int, int] | None = None) -> "UserSession":
+        """Load the session in one round trip.
+        
+        `rate_limit` is an optional (action, max_count, window_seconds) that is
+        checked and consumed atomically as part of the load.
+        """
+        redis = await get_redis()
+        keys = [_session_key(user_id)]
+        action, max_count, window = rate_limit or ("", 0, 0)
+        if action:
+            keys.append(rate_limit_key(user_id, action))
+        language, current_video, history, allowed = await redis.eval(
+            _LOAD_SESSION_LUA, len(keys), *keys,
+            _history_key(user_id), max_count, window
+        )
+        return cls(
+            user_id, language, current_video,
+            [json.loads(e) for e in history],
+            rate_action=action or None, allowed=bool(allowed),
+        )
+    
+    def set_language(self, language: str):
+        self.language = language
+        self._fields["language"] = language
+    
+    def switch_video(self, video_id: str):
+        """Make `video_id` current and start a fresh conversation for it."""
+        self.current_video = video_id
+        self._fields["current_video"] = video_id
+        self.history = []
+        self._clear_history = True
+        self._new_history = []
+    
+    def add_history(self, question: str, answer: str):
+        self.history = (self.history + [{"question": question, "answer": answer}])[-MAX_HISTORY:]
+        self._new_history.append(json.dumps({"question": question, "answer": answer}))
+    
+    def refund_rate_limit(self):
+        """Give back the slot consumed on load when the update didn't use it."""
+        if self.rate_action and self.allowed:
+            self._refund = True
+    
+    async def flush(self):
+        """Write all buffered mutations in one pipeline."""
+        if not (self._fields or self._clear_history or self._new_history or self._refund):
+            return
+        
+        redis = await get_redis()
+        pipe = redis.pipeline(transaction=False)
+        if self._fields:
+            pipe.hset(_session_key(self.user_id), mapping=self._fields)
+        if self.current_video:
+            history_key = _history_key(self.user_id, self.current_video)
+            if self._clear_history:
+                pipe.delete(history_key)
+            if self._new_history:
+                pipe.rpush(history_key, *self._new_history)
+                pipe.ltrim(history_key, -MAX_HISTORY, -1)
+                pipe.expire(history_key, HISTORY_TTL)
+        if self._refund:
+            pipe.eval(_REFUND_RATE_LIMIT_LUA, 1, rate_limit_key(self.user_id, self.rate_action))
+        await pipe.execute()
+        
+        self._fields = {}
+        self._clear_history = False
+        self._new_history = []
+        self._refund = False
+
+
+class SessionMiddleware(BaseMiddleware):
+    """Injects a loaded `session` into message handlers and flushes it afterwards.
+    
+    Handlers declare their rate limit with the `rate_limit` flag, e.g.
+    `flags={"rate_limit": ("question", 30, 3600)}`.
+    """
+    
+    async def __call__(self, handler, event: Message, data: dict):
+        if event.from_user is None:
+            return await handler(event, data)
+        
+        session = await UserSession.load(event.from_user.id, get_flag(data, "rate_limit"))
+        data["session"] = session
+        try:
+            return await handler(event, data)
+        finally:
+            await session.flush()
@@ -0,0 +1,111 @@
+"""
+Progressive rendering of streamed LLM output into Telegram messages.
+
+Edits are throttled so a stream stays inside Telegram's edit limits
+(roughly one message per second per chat, 20 per minute in groups) and go
+through the outbound dispatcher, which also coalesces edits that queue up
+behind a slow request. The output rolls over into a new message at the same
+4000-char boundary `_send_long_message` splits on.
+"""
+import time
+import logging
+from typing import AsyncIterator
+from aiogram.types import Message
+from aiogram.exceptions import TelegramBadRequest
+from app.bot.outbound import outbound
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_CHUNK_SIZE = 4000     # stay below Telegram's 4096 char limit
+PRIVATE_EDIT_INTERVAL = 1.0   # min seconds between edits in a private chat
+GROUP_EDIT_INTERVAL = 3.0     # groups allow ~20 messages per minute
+
+
+class StreamingReply:
+    """Renders a token stream into a status message at a bounded edit rate."""
+
+    def __init__(self, message: Message, status_msg: Message | None = None):
+        self.message = message
+        self.status_msg = status_msg
+        self.current = status_msg
+        self.extra_messages: list[Message] = []  # messages opened by rollover
+        self.text = ""
+        self._offset = 0      # where the current message's slice starts in `text`
+        self._shown = None    # text currently rendered in `current`
+        self._last_edit = 0.0
+        is_group = message.chat.type in ("group", "supergroup")
+        self.edit_interval = GROUP_EDIT_INTERVAL if is_group else PRIVATE_EDIT_INTERVAL
+
+    async def consume(self, stream: AsyncIterator[str]) -> str:
+        """Render the whole stream and return the complete text."""
+        async for chunk in stream:
+            await self.feed(chunk)
+        return await self.finish()
+
+    async def feed(self, chunk: str):
+        self.text += chunk
+
+        # Freeze full slices and continue in a fresh message
+        while len(self.text) - self._offset > MESSAGE_CHUNK_SIZE:
+            await self._render(self.text[self._offset:self._offset + MESSAGE_CHUNK_SIZE])
+            self._offset += MESSAGE_CHUNK_SIZE
+            self.current = None
+            self._shown = None
+
+        if time.monotonic() - self._last_edit >= self.edit_interval:
+            await self._render(self.text[self._offset:], partial=True)
+
+    async def reset(self):
+        """Discard streamed text, e.g. when generation restarted upstream."""
+        for extra in self.extra_messages:
+            try:
+                await outbound.delete(extra)
+            except Exception:
+                pass
+        self.extra_messages = []
+        self.current = self.status_msg
+        self.text = ""
+        self._offset = 0
+        self._shown = None
+
+    async def complete(self, text: str) -> str:
+        """Finish with the authoritative final text.
+        
+        Only the missing suffix is rendered when the stream was a prefix of
+        it; otherwise the streamed output is replaced.
+        """
+        if not text.startswith(self.text):
+            await self.reset()
+        await self.feed(text[len(self.text):])
+        return await self.finish()
+
+    async def finish(self) -> str:
+        """Render the final text of the current message."""
+        tail = self.text[self._offset:]
+        if tail:
+            await self._render(tail)
+        return self.text
+
+    async def _render(self, text: str, partial: bool = False):
+        if not text.strip() or text == self._shown:
+            return
+        try:
+            if self.current is None:
+                self.current = await outbound.answer(self.message, text)
+                if self.status_msg is None:
+                    self.status_msg = self.current
+                else:
+                    self.extra_messages.append(self.current)
+            else:
+                await outbound.edit_text(self.current, text)
+            self._shown = text
+        except TelegramBadRequest as e:
+            if "message is not modified" not in str(e) and not partial:
+                raise
+            logger.debug(f"Skipped streaming edit: {e}")
+        except Exception as e:
+            # Intermediate edits are best-effort; the next one catches up
+            if not partial:
+                raise
+            logger.debug(f"Skipped streaming edit: {e}")
+        self._last_edit = time.monotonic()
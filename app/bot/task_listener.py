@@ -0,0 +1,110 @@
+"""
+Push-based completion notifications for Celery tasks.
+
+Workers publish every finished result on `task_done:{task_id}`. Each bot
+process keeps a single pattern subscription and resolves the asyncio futures
+of the handlers waiting on those tasks, instead of every request polling the
+Celery result backend.
+"""
+import json
+import asyncio
+import logging
+from app.db.redis_client import get_redis, get_task_result, TASK_RESULT_CHANNEL_PREFIX
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY = 1  # seconds between resubscribe attempts
+SUBSCRIBE_TIMEOUT = 5  # max seconds start() waits for the subscription
+
+
+class TaskResultListener:
+    """One shared Redis pub/sub listener resolving per-task futures."""
+
+    def __init__(self):
+        self._waiters: dict[str, set[asyncio.Future]] = {}
+        self._task: asyncio.Task | None = None
+        self._subscribed: asyncio.Event | None = None
+
+    async def start(self):
+        """Start the background listener if it isn't already running."""
+        if self._task and not self._task.done():
+            return
+        self._subscribed = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), SUBSCRIBE_TIMEOUT)
+        except asyncio.TimeoutError:
+            # Waiters still fall back to the stored result key
+            logger.warning("Task result listener is not subscribed yet")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def wait_for_result(self, task_id: str, timeout: float) -> dict | None:
+        """Wait for a task's result. Returns None if it doesn't arrive in time."""
+        await self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(task_id, set()).add(future)
+        try:
+            # The worker may have finished before we registered the future
+            stored = await get_task_result(task_id)
+            if stored is not None:
+                return stored
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(task_id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[task_id]
+
+    def _resolve(self, task_id: str, result: dict):
+        for future in self._waiters.pop(task_id, ()):
+            if not future.done():
+                future.set_result(result)
+
+    async def _recheck_pending(self):
+        """Pick up results published while we were not subscribed."""
+        for task_id in list(self._waiters):
+            stored = await get_task_result(task_id)
+            if stored is not None:
+                self._resolve(task_id, stored)
+
+    async def _run(self):
+        while True:
+            pubsub = None
+            try:
+                r = await get_redis()
+                pubsub = r.pubsub()
+                await pubsub.psubscribe(f"{TASK_RESULT_CHANNEL_PREFIX}*")
+                self._subscribed.set()
+                await self._recheck_pending()
+
+                async for msg in pubsub.listen():
+                    if msg["type"] != "pmessage":
+                        continue
+                    task_id = msg["channel"][len(TASK_RESULT_CHANNEL_PREFIX):]
+                    self._resolve(task_id, json.loads(msg["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Task result listener disconnected: {e}. Reconnecting...")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+
+# Shared per-process listener
+task_listener = TaskResultListener()
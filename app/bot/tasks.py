@@ -1,15 +1,32 @@
+from celery.signals import task_postrun, worker_process_shutdown
+from prometheus_client import REGISTRY, pushadd_to_gateway
 from app.core.celery_app import celery_app
-from app.services.youtube import fetch_transcript, get_full_text, fetch_video_title, extract_timestamp_sections
-from app.services.llm import generate_summary
+from app.core.config import settings
+from app.core.llm_scheduler import LANE_BACKGROUND
+from app.core.metrics import VIDEO_STAGE_SECONDS, TRANSCRIPT_TOKENS, TRANSCRIPT_TOKEN_REDUCTION
+from app.services.youtube import (
+    fetch_transcript, normalize_transcript, get_full_text, fetch_video_title, extract_timestamp_sections
+)
+from app.services.llm import stream_summary, get_actionpoints
+from app.services.translation import get_translated_summary
 from app.rag.chunking import chunk_transcript
+from app.rag.token_index import TokenIndex, count_tokens_batch
 from app.rag.vector_store import VectorStore
 from app.db.redis_client import (
     cache_transcript, get_cached_transcript,
-    cache_summary, get_cached_summary
+    cache_transcript_token_counts, get_cached_transcript_token_counts,
+    cache_summary, get_cached_summary,
+    publish_task_result, get_task_result, append_summary_stream,
+    claim_video_job, renew_video_job, release_video_job,
+    VIDEO_JOB_QUEUED_TTL, VIDEO_JOB_LEASE_TTL
 )
-from app.db.persistence import save_video_record
+from app.db.persistence import save_video_record, persistence_buffer
 import asyncio
 import logging
+import os
+import socket
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -27,11 +44,208 @@ def run_async(coro):
         asyncio.set_event_loop(_task_loop)
     return _task_loop.run_until_complete(coro)
 
+@task_postrun.connect
+def _flush_persistence(**kwargs):
+    """The worker's event loop only runs inside tasks, so flush between them."""
+    run_async(persistence_buffer.flush_if_due())
+
+@worker_process_shutdown.connect
+def _flush_persistence_on_shutdown(**kwargs):
+    run_async(persistence_buffer.flush())
+
+@task_postrun.connect
+def _push_metrics(**kwargs):
+    """Workers don't serve /api/metrics, so push to the Pushgateway after each task.
+    
+    Each worker process pushes its own registry under its own instance label.
+    """
+    if not settings.PROMETHEUS_PUSHGATEWAY_URL:
+        return
+    try:
+        pushadd_to_gateway(
+            settings.PROMETHEUS_PUSHGATEWAY_URL,
+            job="celery_worker",
+            grouping_key={"instance": f"{socket.gethostname()}:{os.getpid()}"},
+            registry=REGISTRY,
+        )
+    except Exception as e:
+        logger.warning(f"Failed to push metrics to the Pushgateway: {e}")
+
+def _notify_result(task_id: str, result: dict):
+    """Push the task result to waiting bot processes. Never fails the task."""
+    try:
+        run_async(publish_task_result(task_id, result))
+    except Exception as e:
+        logger.error(f"Failed to publish result for task {task_id}: {e}")
+
+BACKGROUND_TASK_PRIORITY = 9  # lowest Celery priority, behind video processing
+STREAM_FLUSH_CHARS = 200      # publish a summary delta once this much text is pending
+STREAM_FLUSH_INTERVAL = 0.3   # ...or once this many seconds have passed
+
+class _LeaseHeartbeat:
+    """Keeps a video job lease alive from a background thread while the task runs."""
+    
+    def __init__(self, video_id: str, task_id: str, ttl: int = VIDEO_JOB_LEASE_TTL):
+        self.video_id = video_id
+        self.task_id = task_id
+        self.ttl = ttl
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def _run(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                if not renew_video_job(self.video_id, self.task_id, self.ttl):
+                    logger.warning(f"Task {self.task_id} lost the lease for video {self.video_id}")
+                    return
+            except Exception as e:
+                logger.warning(f"Failed to renew lease for video {self.video_id}: {e}")
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
 @celery_app.task(bind=True, max_retries=3)
-def process_video_task(self, video_id: str):
+def process_video_task(self, video_id: str, language: str = "english"):
+    """Process a video and publish the result on its completion channel.
+    
+    Only the task holding the video's lease does the work. A duplicate task
+    returns at once rather than hold a worker slot: it republishes the
+    holder's result if there already is one, and otherwise leaves delivery
+    to the bot, which notices the lease changed hands and attaches to the
+    holder. The summary is also translated into the requester's
+    `language`, so the bot can send it as is.
+    """
+    task_id = self.request.id
+    owner = run_async(claim_video_job(video_id, task_id, VIDEO_JOB_LEASE_TTL))
+    if owner != task_id:
+        logger.info(f"Video {video_id} is already being processed by task {owner}, skipping duplicate")
+        result = run_async(get_task_result(owner))
+        if result is not None:
+            _notify_result(task_id, result)
+        return result
+    
+    try:
+        with _LeaseHeartbeat(video_id, task_id):
+            result = _process_video(video_id, task_id)
+            _translate_summary(video_id, result, language)
+    except Exception as e:
+        logger.error(f"Error processing video {video_id}: {str(e)}")
+        if self.request.retries >= self.max_retries:
+            _notify_result(task_id, {"status": "error", "message": str(e)})
+            run_async(release_video_job(video_id, task_id))
+            raise
+        # Keep the lease through the retry countdown so waiters stay attached
+        try:
+            renew_video_job(video_id, task_id, VIDEO_JOB_QUEUED_TTL)
+        except Exception as lease_err:
+            logger.warning(f"Failed to extend lease for video {video_id}: {lease_err}")
+        # Retry with exponential backoff on unexpected failure
+        raise self.retry(exc=e, countdown=2 ** self.request.retries)
+    
+    # Publish before releasing so nobody sees a free lease without a result
+    _notify_result(task_id, result)
+    run_async(release_video_job(video_id, task_id))
+    if settings.ACTIONPOINTS_PRECOMPUTE and result.get("status") == "success":
+        _schedule_actionpoints(video_id)
+    return result
+
+def _translate_summary(video_id: str, result: dict, language: str):
+    """Add the requester's translation of the summary to the result. Never fails the task.
+    
+    Goes through the per-(video, language) cache, so each pair is translated once.
+    """
+    if result.get("status") != "success" or not language or language.lower() == "english":
+        return
+    try:
+        with VIDEO_STAGE_SECONDS.labels(stage="translation").time():
+            result["translated_summary"] = run_async(get_translated_summary(video_id, result["summary"], language))
+        result["language"] = language.lower()
+    except Exception as e:
+        logger.warning(f"Failed to translate summary of {video_id} into {language}: {e}")
+
+def _schedule_actionpoints(video_id: str):
+    """Queue action point generation behind user-facing work. Never fails the task."""
+    try:
+        precompute_actionpoints_task.apply_async(args=[video_id], priority=BACKGROUND_TASK_PRIORITY)
+    except Exception as e:
+        logger.warning(f"Failed to queue action points for video {video_id}: {e}")
+
+@celery_app.task(ignore_result=True)
+def precompute_actionpoints_task(video_id: str):
+    """Generate and cache a video's action points so /actionpoints is served from cache."""
+    try:
+        if run_async(get_actionpoints(video_id, lane=LANE_BACKGROUND)) is None:
+            logger.info(f"No FAISS index for video {video_id}, skipping action points")
+    except Exception as e:
+        logger.warning(f"Failed to precompute action points for video {video_id}: {e}")
+
+async def _publish_summary_delta(task_id: str, fields: dict):
+    """Best-effort append to the summary stream; the final result is authoritative."""
+    try:
+        await append_summary_stream(task_id, fields)
+    except Exception as e:
+        logger.warning(f"Failed to publish summary stream for task {task_id}: {e}")
+
+async def _generate_summary_streamed(task_id: str, video_id: str, full_text: str, title: str, timestamp_sections: str,
+                                     token_index: TokenIndex | None = None) -> str:
+    """Generate the summary, streaming batched deltas into the task's Redis Stream."""
+    await _publish_summary_delta(task_id, {"reset": "1"})
+    
+    parts = []
+    pending = ""
+    last_flush = time.monotonic()
+    async for delta in stream_summary(full_text, video_title=title, timestamp_sections=timestamp_sections,
+                                      video_id=video_id, token_index=token_index):
+        parts.append(delta)
+        pending += delta
+        if len(pending) >= STREAM_FLUSH_CHARS or time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL:
+            await _publish_summary_delta(task_id, {"text": pending})
+            pending = ""
+            last_flush = time.monotonic()
+    
+    if pending:
+        await _publish_summary_delta(task_id, {"text": pending})
+    await _publish_summary_delta(task_id, {"done": "1"})
+    return "".join(parts)
+
+def _get_token_index(video_id: str, transcript_dicts: list[dict]) -> TokenIndex:
+    """Token index of the transcript, from the per-entry counts cached next to it."""
+    counts = run_async(get_cached_transcript_token_counts(video_id))
+    if counts and len(counts) == len(transcript_dicts):
+        return TokenIndex.from_counts(transcript_dicts, counts)
+    token_index = TokenIndex.build(transcript_dicts)
+    run_async(cache_transcript_token_counts(video_id, token_index.counts))
+    return token_index
+
+def _normalize_transcript(video_id: str, raw: list[dict]) -> tuple[list[dict], TokenIndex]:
+    """Normalise a fetched transcript and report how many tokens it saved.
+    
+    Returns the normalised transcript and its token index.
+    """
+    transcript = normalize_transcript(raw)
+    token_index = TokenIndex.build(transcript)
+    raw_tokens = sum(count_tokens_batch([entry.get("text", "") for entry in raw]))
+    saved = raw_tokens - token_index.total_tokens
+    
+    TRANSCRIPT_TOKENS.labels(form="raw").inc(raw_tokens)
+    TRANSCRIPT_TOKENS.labels(form="normalized").inc(token_index.total_tokens)
+    if raw_tokens:
+        TRANSCRIPT_TOKEN_REDUCTION.observe(max(0, saved) / raw_tokens)
+    logger.info(
+        f"Normalised transcript for {video_id}: {len(raw)} -> {len(transcript)} entries, "
+        f"{raw_tokens} -> {token_index.total_tokens} tokens ({saved} saved)"
+    )
+    return transcript, token_index
+
+def _process_video(video_id: str, task_id: str) -> dict:
     """
     1. Check cache for transcript + summary
-    2. Fetch transcript (if not cached)
+    2. Fetch and normalise transcript (if not cached)
     3. Chunk and Embedding -> VectorStore
     4. Generate Summary (if not cached)
     5. Cache everything for future use
@@ -41,11 +255,12 @@ def process_video_task(self, video_id: str):
         logger.info(f"Starting processing for video: {video_id}")
         
         # ── Check summary cache first (fastest path) ────────────────────
-        cached_summary_text = run_async(get_cached_summary(video_id))
-        
-        # Also check if FAISS index already exists (embeddings done)
-        vector_store = VectorStore(video_id=video_id)
-        embeddings_exist = vector_store.index.ntotal > 0
+        with VIDEO_STAGE_SECONDS.labels(stage="cache_check").time():
+            cached_summary_text = run_async(get_cached_summary(video_id))
+            
+            # Also check if FAISS index already exists (embeddings done)
+            vector_store = VectorStore(video_id=video_id)
+            embeddings_exist = vector_store.index.ntotal > 0
         
         if cached_summary_text and embeddings_exist:
             logger.info(f"Full cache hit for video: {video_id}")
@@ -54,29 +269,36 @@ def process_video_task(self, video_id: str):
             return {"status": "success", "summary": cached_summary_text, "title": title, "cached": True}
         
         # ── Fetch transcript (with cache) ────────────────────────────────
-        transcript_dicts = run_async(get_cached_transcript(video_id))
-        if transcript_dicts:
-            logger.info(f"Transcript cache hit for video: {video_id}")
-        else:
-            logger.info(f"Fetching transcript for video: {video_id}")
-            transcript_dicts = run_async(fetch_transcript(video_id))
-            if not transcript_dicts:
-                return {"status": "error", "message": "Transcript is empty or unavailable."}
-            # Cache transcript for 24h
-            run_async(cache_transcript(video_id, transcript_dicts))
+        with VIDEO_STAGE_SECONDS.labels(stage="transcript").time():
+            transcript_dicts = run_async(get_cached_transcript(video_id))
+            if transcript_dicts:
+                logger.info(f"Transcript cache hit for video: {video_id}")
+            else:
+                logger.info(f"Fetching transcript for video: {video_id}")
+                transcript_dicts = run_async(fetch_transcript(video_id))
+                if transcript_dicts:
+                    transcript_dicts, token_index = _normalize_transcript(video_id, transcript_dicts)
+                if not transcript_dicts:
+                    return {"status": "error", "message": "Transcript is empty or unavailable."}
+                # Cache the normalised transcript and its token counts for 24h
+                run_async(cache_transcript(video_id, transcript_dicts))
+                run_async(cache_transcript_token_counts(video_id, token_index.counts))
             
         full_text = get_full_text(transcript_dicts)
         
         # ── RAG Pipeline: Chunking and Embedding ────────────────────────
         if not embeddings_exist:
-            logger.info(f"Chunking transcript for {video_id}")
-            chunks = chunk_transcript(transcript_dicts)
+            with VIDEO_STAGE_SECONDS.labels(stage="chunking").time():
+                logger.info(f"Chunking transcript for {video_id}")
+                chunks = chunk_transcript(transcript_dicts)
             
-            logger.info(f"Storing embeddings for {video_id} in FAISS")
-            vector_store.add_chunks(chunks)
+            with VIDEO_STAGE_SECONDS.labels(stage="embedding").time():
+                logger.info(f"Storing embeddings for {video_id} in FAISS")
+                vector_store.add_chunks(chunks)
         
         # ── Fetch real video title ──────────────────────────────────────
-        title = run_async(fetch_video_title(video_id))
+        with VIDEO_STAGE_SECONDS.labels(stage="title").time():
+            title = run_async(fetch_video_title(video_id))
         logger.info(f"Video title: {title}")
         
         # ── Extract real timestamps for summary ─────────────────────────
@@ -87,18 +309,23 @@ def process_video_task(self, video_id: str):
             summary = cached_summary_text
         else:
             logger.info(f"Generating summary for {video_id}")
-            summary = run_async(generate_summary(
-                full_text, 
-                video_title=title,
-                timestamp_sections=timestamp_sections
-            ))
+            with VIDEO_STAGE_SECONDS.labels(stage="summary").time():
+                summary = run_async(_generate_summary_streamed(
+                    task_id,
+                    video_id,
+                    full_text,
+                    title=title,
+                    timestamp_sections=timestamp_sections,
+                    token_index=_get_token_index(video_id, transcript_dicts)
+                ))
             # Cache summary for 24h
             run_async(cache_summary(video_id, summary))
         
         # ── Persist to PostgreSQL ────────────────────────────────────────
         try:
-            run_async(save_video_record(video_id, title, summary))
-            logger.info(f"Saved video record to PostgreSQL for {video_id}")
+            with VIDEO_STAGE_SECONDS.labels(stage="persist").time():
+                run_async(save_video_record(video_id, title, summary))
+            logger.info(f"Queued video record for PostgreSQL for {video_id}")
         except Exception as db_err:
             # Don't fail the task if DB persistence fails
             logger.warning(f"Failed to persist video record to PostgreSQL: {db_err}")
@@ -109,7 +336,3 @@ def process_video_task(self, video_id: str):
     except ValueError as val_err:
         logger.error(f"Value Error processing video {video_id}: {str(val_err)}")
         return {"status": "error", "message": str(val_err)}
-    except Exception as e:
-        logger.error(f"Error processing video {video_id}: {str(e)}")
-        # Retry with exponential backoff on unexpected failure
-        raise self.retry(exc=e, countdown=2 ** self.request.retries)
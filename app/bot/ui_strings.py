@@ -0,0 +1,168 @@
+"""
+Pre-translated catalogue of the bot's fixed UI strings.
+
+Handlers look strings up by ID instead of translating them at request time,
+so status and error messages reach non-English users without an LLM call.
+The catalogue is built offline into a JSON file shipped with the app:
+
+    python -m app.bot.ui_strings
+
+Each entry records the English source it was translated from. Entries whose
+source has since changed are ignored, and strings missing from the
+catalogue (or the whole file) fall back to `translate_text`.
+"""
+import json
+import string
+import asyncio
+import logging
+import argparse
+from datetime import datetime, timezone
+from pathlib import Path
+from app.core.metrics import UI_STRING_LOOKUPS
+from app.services.translation import SUPPORTED_LANGUAGES, translate_text, translate_batch
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_PATH = Path(__file__).with_name("ui_strings.json")
+CATALOGUE_FORMAT = 1
+
+UI_STRINGS = {
+    "welcome": (
+        "👋 Welcome to the YouTube AI Assistant!\n\n"
+        "Here's what I can do:\n"
+        "1️⃣ Send me a YouTube link → get a structured summary\n"
+        "2️⃣ /summary <link> → summarize a video\n"
+        "3️⃣ Ask me any question about the video\n"
+        "4️⃣ /deepdive <topic> → deep analysis of a topic\n"
+        "5️⃣ /actionpoints → extract all action items\n"
+        "6️⃣ /language <lang> → change output language\n"
+        "7️⃣ /help → show this message again\n\n"
+        "💡 You can also say things like 'Summarize in Hindi' or 'Explain in Tamil'!\n"
+        "🌐 Supported: English, Hindi, Tamil, Telugu, Kannada, Marathi, Bengali, Gujarati, Malayalam, Punjabi"
+    ),
+    "deepdive_no_video": "Please send a YouTube video link first before using /deepdive.",
+    "deepdive_status": "🔬 Performing deep dive analysis...",
+    "actionpoints_no_video": "Please send a YouTube video link first before using /actionpoints.",
+    "actionpoints_status": "📋 Extracting action points...",
+    "video_unavailable": "Video data unavailable. Please process the video again.",
+    "invalid_url": "❌ Invalid YouTube URL. Please make sure it's a valid link.",
+    "processing": "⏳ Processing video `{video_id}`... This may take a moment.",
+    "processing_timeout": "⏱ Processing is taking too long. The video may be very large. Please try again later.",
+    "processing_failed": "❌ Processing failed unexpectedly. Please try again.",
+    "question_no_video": "📎 Please send a YouTube video link first before asking questions.",
+    "thinking": "🤔 Thinking...",
+    "question_video_unavailable": "📎 Video data unavailable. Please process the video again.",
+}
+
+
+def _placeholders(template: str) -> set[str] | None:
+    """Names of the `{param}` fields in a template, None if it isn't a valid template."""
+    try:
+        return {field for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+    except ValueError:
+        return None
+
+
+class UICatalogue:
+    """Translated UI strings by language and ID, loaded from the catalogue file."""
+
+    def __init__(self, path: Path = CATALOGUE_PATH):
+        self.path = path
+        self._strings: dict[str, dict[str, str]] | None = None
+
+    def load(self) -> int:
+        """(Re)load the catalogue file. Returns the number of usable entries."""
+        self._strings = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            logger.info(f"No UI string catalogue at {self.path}, translating UI strings on demand")
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load UI string catalogue {self.path}: {e}")
+            return 0
+        if data.get("format") != CATALOGUE_FORMAT:
+            logger.warning(f"Ignoring UI string catalogue with unknown format {data.get('format')!r}")
+            return 0
+
+        # Only entries translated from the current English text are still valid
+        source = data.get("source", {})
+        current = {sid for sid, text in UI_STRINGS.items() if source.get(sid) == text}
+        for language, entries in data.get("languages", {}).items():
+            self._strings[language.lower()] = {sid: text for sid, text in entries.items() if sid in current}
+
+        count = sum(len(entries) for entries in self._strings.values())
+        stale = len(UI_STRINGS) - len(current)
+        logger.info(f"Loaded {count} UI strings for {len(self._strings)} languages (built {data.get('built_at')}, "
+                    f"{stale} stale or missing)")
+        return count
+
+    def lookup(self, string_id: str, language: str) -> str | None:
+        if self._strings is None:
+            self.load()
+        return self._strings.get(language.lower(), {}).get(string_id)
+
+
+ui_catalogue = UICatalogue()
+
+
+async def ui_text(string_id: str, language: str, **params) -> str:
+    """A UI string in the user's language, formatted with `params`.
+
+    Served from the catalogue without an LLM call when it has the string,
+    otherwise translated on demand.
+    """
+    template = UI_STRINGS[string_id]
+    if not language or language.lower() == "english":
+        return template.format(**params)
+
+    translated = ui_catalogue.lookup(string_id, language)
+    if translated is not None:
+        UI_STRING_LOOKUPS.labels(result="catalogue").inc()
+        return translated.format(**params)
+
+    UI_STRING_LOOKUPS.labels(result="translated").inc()
+    return await translate_text(template.format(**params), language)
+
+
+async def build_catalogue(languages: list[str]) -> dict:
+    """Translate every UI string into each language, one batched LLM call per language.
+
+    Translations that lose or invent a `{param}` are left out, so they fall
+    back to on-demand translation at runtime.
+    """
+    ids = list(UI_STRINGS)
+    catalogue = {
+        "format": CATALOGUE_FORMAT,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source": dict(UI_STRINGS),
+        "languages": {},
+    }
+    for language in languages:
+        translated = await translate_batch([UI_STRINGS[sid] for sid in ids], language.title())
+        entries = {}
+        for sid, text in zip(ids, translated):
+            if _placeholders(text) != _placeholders(UI_STRINGS[sid]):
+                logger.warning(f"Dropping {language} translation of {sid!r}: placeholders don't match")
+                continue
+            entries[sid] = text
+        catalogue["languages"][language] = entries
+        logger.info(f"Translated {len(entries)}/{len(ids)} UI strings into {language}")
+    return catalogue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the pre-translated UI string catalogue.")
+    parser.add_argument("--output", type=Path, default=CATALOGUE_PATH, help="catalogue file to write")
+    parser.add_argument("--languages", nargs="+", default=sorted(SUPPORTED_LANGUAGES - {"english"}),
+                        help="languages to translate into (default: every supported language)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    catalogue = asyncio.run(build_catalogue([language.lower() for language in args.languages]))
+    args.output.write_text(json.dumps(catalogue, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Hedged LLM requests.
+
+Occasional slow Groq responses dominate tail latency. When the primary call
+hasn't answered (or, when streaming, produced its first token) within the
+model's recent latency percentile, the same prompt is sent to a faster
+fallback model and whichever answers first wins; the loser is cancelled.
+
+Hedges are capped at a fraction of primary calls, and only sent when the
+fallback model has Groq budget right now. That charge is settled once the
+race is over: with the fallback's usage if it won, else with its prompt.
+"""
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import AsyncIterator
+from app.core.metrics import LLM_LATENCY_SECONDS, LLM_HEDGES
+from app.core.llm_scheduler import count_tokens
+
+logger = logging.getLogger(__name__)
+
+LATENCY_WINDOW = 200      # recent samples per model used for the percentile
+MIN_LATENCY_SAMPLES = 20  # don't hedge before the percentile means something
+MIN_HEDGE_DELAY = 0.5     # seconds; never hedge sooner than this
+BUDGET_WINDOW = 500       # primary calls over which the hedge ratio is enforced
+
+
+class LatencyTracker:
+    """Rolling per-model latency samples, mirrored to a Prometheus histogram."""
+
+    def __init__(self, window: int = LATENCY_WINDOW, min_samples: int = MIN_LATENCY_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: dict[tuple[str, str], deque[float]] = {}
+
+    def observe(self, model: str, kind: str, seconds: float):
+        """Record a latency; `kind` is "total" or "first_token"."""
+        self._samples.setdefault((model, kind), deque(maxlen=self.window)).append(seconds)
+        LLM_LATENCY_SECONDS.labels(model=model, kind=kind).observe(seconds)
+
+    def percentile(self, model: str, kind: str, q: float) -> float | None:
+        """The q-quantile of recent latencies, or None with too few samples."""
+        samples = self._samples.get((model, kind))
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget:
+    """Allows hedges for at most `max_ratio` of recent primary calls."""
+
+    def __init__(self, max_ratio: float, window: int = BUDGET_WINDOW):
+        self.max_ratio = max_ratio
+        self._calls: deque[bool] = deque(maxlen=window)  # True where a hedge was sent
+
+    def allow(self) -> bool:
+        return sum(self._calls) + 1 <= self.max_ratio * (len(self._calls) + 1)
+
+    def record(self, hedged: bool):
+        self._calls.append(hedged)
+
+
+def _model_name(model) -> str:
+    return str(getattr(model, "model_name", None) or type(model).__name__)
+
+
+async def _first_token(stream) -> str | None:
+    """Advance a chunk stream to its first non-empty content."""
+    async for chunk in stream:
+        if chunk.content:
+            return chunk.content
+    return None
+
+
+async def _settle_race(tasks: dict[asyncio.Task, str]) -> tuple[asyncio.Task, str]:
+    """Wait for the first task to succeed and cancel the rest.
+
+    If the first to finish failed, the other still gets its chance; when all
+    fail, the first task's (the primary's) error is raised.
+    """
+    pending = set(tasks)
+    try:
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task, tasks[task]
+            if not pending:
+                raise next(iter(tasks)).exception()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class Hedger:
+    """Races a fallback model against slow primary calls."""
+
+    def __init__(self, fallback_scheduler, percentile: float, max_ratio: float,
+                 min_delay: float = MIN_HEDGE_DELAY, tracker: LatencyTracker | None = None):
+        self.fallback_scheduler = fallback_scheduler
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.budget = HedgeBudget(max_ratio)
+        self.tracker = tracker or LatencyTracker()
+
+    def hedge_delay(self, model: str, kind: str) -> float | None:
+        """Seconds to wait on the primary before hedging, None to never hedge."""
+        threshold = self.tracker.percentile(model, kind, self.percentile)
+        return None if threshold is None else max(threshold, self.min_delay)
+
+    async def _may_hedge(self, prompt: str, lane: str) -> int | None:
+        """Tokens charged to the fallback's budget for a hedge, None to not hedge."""
+        if not self.budget.allow():
+            LLM_HEDGES.labels(outcome="skipped_budget").inc()
+            return None
+        charged = await self.fallback_scheduler.try_acquire(prompt, lane)
+        if charged is None:
+            LLM_HEDGES.labels(outcome="skipped_rate_limit").inc()
+        return charged
+
+    async def _race(self, tasks: dict[asyncio.Task, str], start_hedge, kind: str,
+                    primary_name: str, fallback_name: str, prompt: str, lane: str):
+        """Give the primary until the hedge delay, then race a hedge against it.
+
+        `tasks` maps the running primary task to "primary"; a hedge task is
+        added to it when sent. Returns (winning task, "primary" or "fallback",
+        tokens charged for a winning hedge). A losing or failed hedge is
+        settled here; the caller settles a winning one once its usage is known.
+        """
+        primary_task = next(iter(tasks))
+        delay = self.hedge_delay(primary_name, kind)
+        if delay is not None:
+            done, _ = await asyncio.wait({primary_task}, timeout=delay)
+            charged = None if done else await self._may_hedge(prompt, lane)
+            if charged is not None:
+                self.budget.record(True)
+                hedge_start = time.monotonic()
+                tasks[asyncio.create_task(start_hedge())] = "fallback"
+                role = None
+                try:
+                    winner, role = await _settle_race(tasks)
+                finally:
+                    if role != "fallback":
+                        await self.fallback_scheduler.settle(charged, count_tokens(prompt))
+                if role == "fallback":
+                    self.tracker.observe(fallback_name, kind, time.monotonic() - hedge_start)
+                LLM_HEDGES.labels(outcome=f"{role}_won").inc()
+                return winner, role, charged if role == "fallback" else 0
+        self.budget.record(False)
+        await asyncio.wait({primary_task})
+        return primary_task, "primary", 0
+
+    async def ainvoke(self, primary, fallback, prompt: str, lane: str):
+        """Invoke `primary`, hedging with `fallback` if it is slow.
+
+        Returns (response message, "primary" or "fallback").
+        """
+        primary_name, fallback_name = _model_name(primary), _model_name(fallback)
+        start = time.monotonic()
+        tasks = {asyncio.create_task(primary.ainvoke(prompt)): "primary"}
+        try:
+            winner, role, hedge_charge = await self._race(
+                tasks, lambda: fallback.ainvoke(prompt), "total",
+                primary_name, fallback_name, prompt, lane,
+            )
+            response = winner.result()
+            if hedge_charge:
+                usage = getattr(response, "usage_metadata", None)
+                used = usage.get("total_tokens") if usage else None
+                await self.fallback_scheduler.settle(
+                    hedge_charge, used if used is not None else count_tokens(prompt) + count_tokens(response.content)
+                )
+            # A cancelled primary's elapsed time is only a lower bound; recording
+            # it would drag the percentile down and make hedging ever more frequent
+            if role == "primary":
+                self.tracker.observe(primary_name, "total", time.monotonic() - start)
+            return response, role
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def astream(self, primary, fallback, prompt: str, lane: str,
+                      winner_info: dict | None = None) -> AsyncIterator[str]:
+        """Stream from `primary`, hedging with `fallback` if its first token is slow.
+
+        The winning role ("primary" or "fallback") is stored under "role" in
+        `winner_info`, if given.
+        """
+        primary_name, fallback_name = _model_name(primary), _model_name(fallback)
+        start = time.monotonic()
+        streams = {"primary": primary.astream(prompt)}
+
+        def start_hedge():
+            streams["fallback"] = fallback.astream(prompt)
+            return _first_token(streams["fallback"])
+
+        tasks = {asyncio.create_task(_first_token(streams["primary"])): "primary"}
+        hedge_charge, received = 0, []
+        try:
+            winner, role, hedge_charge = await self._race(
+                tasks, start_hedge, "first_token",
+                primary_name, fallback_name, prompt, lane,
+            )
+            first = winner.result()
+            if winner_info is not None:
+                winner_info["role"] = role
+            if role == "primary":
+                self.tracker.observe(primary_name, "first_token", time.monotonic() - start)
+            if first is None:
+                return
+            received.append(first)
+            yield first
+            async for chunk in streams[role]:
+                if chunk.content:
+                    received.append(chunk.content)
+                    yield chunk.content
+        finally:
+            if hedge_charge:
+                # Streams don't report usage, so settle the winning hedge with an estimate
+                await self.fallback_scheduler.settle(
+                    hedge_charge, count_tokens(prompt) + count_tokens("".join(received))
+                )
+            for task in tasks:
+                task.cancel()
+            # A stream can only be closed once its cancelled reader has stopped
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for stream in streams.values():
+                try:
+                    await stream.aclose()
+                except Exception:
+                    pass
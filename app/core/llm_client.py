@@ -3,10 +3,17 @@ Shared LLM client with built-in retry logic for Groq API rate limits.
 Both llm.py and translation.py import from this module instead of
 creating their own ChatGroq instances.
 """
+import time
+import hashlib
 import logging
 import asyncio
+from typing import AsyncIterator
 from langchain_groq import ChatGroq
 from app.core.config import settings
+from app.core.metrics import LLM_CACHE_REQUESTS, LLM_REQUEST_SECONDS, LLM_TOKENS, LLM_RATE_LIMITED
+from app.core.llm_scheduler import LLMScheduler, LANE_INTERACTIVE, count_tokens
+from app.core.hedging import Hedger
+from app.db.redis_client import get_bounded_cache, set_bounded_cache
 
 logger = logging.getLogger(__name__)
 
@@ -16,30 +23,217 @@ llm = ChatGroq(
     temperature=0.0
 )
 
+# Faster model raced against slow interactive calls
+fallback_llm = ChatGroq(
+    api_key=settings.GROQ_API_KEY,
+    model_name=settings.LLM_FALLBACK_MODEL,
+    temperature=0.0
+)
+
+# Shared Groq RPM/TPM budget per model across all processes
+scheduler = LLMScheduler(llm.model_name)
+fallback_scheduler = LLMScheduler(fallback_llm.model_name)
+
+hedger = Hedger(
+    fallback_scheduler,
+    percentile=settings.LLM_HEDGE_PERCENTILE,
+    max_ratio=settings.LLM_HEDGE_MAX_RATIO,
+)
+
+
+LLM_CACHE_NAMESPACE = "llm_cache"
+
+
+def _response_cache_key(prompt: str) -> str:
+    """Content address of a completion: model, temperature and exact prompt."""
+    material = f"{llm.model_name}\x00{llm.temperature}\x00{prompt}"
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+async def _get_cached_response(key: str) -> str | None:
+    try:
+        cached = await get_bounded_cache(LLM_CACHE_NAMESPACE, key, ttl=settings.LLM_CACHE_TTL)
+    except Exception as e:
+        logger.warning(f"LLM response cache read failed: {e}")
+        cached = None
+    LLM_CACHE_REQUESTS.labels(result="hit" if cached is not None else "miss").inc()
+    return cached
+
+
+async def _cache_response(key: str, content: str):
+    try:
+        await set_bounded_cache(
+            LLM_CACHE_NAMESPACE, key, content,
+            ttl=settings.LLM_CACHE_TTL, max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+        )
+    except Exception as e:
+        logger.warning(f"LLM response cache write failed: {e}")
+
+
+def _is_rate_limit_error(error: Exception) -> bool:
+    error_str = str(error).lower()
+    return "429" in error_str or "rate" in error_str or "limit" in error_str
+
+
+def _hedged(lane: str) -> bool:
+    return settings.LLM_HEDGE_ENABLED and lane == LANE_INTERACTIVE
+
+
+def _usage_tokens(message) -> int | None:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+def _estimated_usage(prompt: str, content: str = "") -> int:
+    """Tokens a call consumed when Groq didn't report them."""
+    return count_tokens(prompt) + (count_tokens(content) if content else 0)
+
+
+def _record_tokens(prompt_type: str, input_tokens: int | None, output_tokens: int | None):
+    if input_tokens:
+        LLM_TOKENS.labels(prompt_type=prompt_type, direction="input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels(prompt_type=prompt_type, direction="output").inc(output_tokens)
+
 
-async def invoke_with_retry(prompt: str, max_retries: int = 3) -> str:
+def _record_usage(prompt_type: str, message):
+    usage = getattr(message, "usage_metadata", None)
+    if isinstance(usage, dict):
+        _record_tokens(prompt_type, usage.get("input_tokens"), usage.get("output_tokens"))
+
+
+async def invoke_with_retry(prompt: str, max_retries: int = 3, use_cache: bool = True,
+                            lane: str = LANE_INTERACTIVE, prompt_type: str = "other") -> str:
     """Invoke the LLM with automatic retry on rate-limit (429) errors.
     
-    Uses exponential backoff: 2s, 4s, 8s between retries.
-    Returns the response content string.
+    Each attempt first waits for budget in the shared scheduler, in the given
+    priority `lane`. Uses exponential backoff: 2s, 4s, 8s between retries if
+    Groq still answers 429. Returns the response content string.
+    
+    Interactive calls are hedged: if the primary model is slower than its
+    recent latency percentile, the fallback model races it.
+    
+    Responses are cached in Redis by model, temperature and exact prompt
+    (temperature is 0.0, so a repeat prompt gets the same answer anyway).
+    Pass `use_cache=False` to always call the model.
+    
+    Latency, token usage and 429s are recorded per `prompt_type`.
     """
+    cache_key = None
+    if use_cache and settings.LLM_CACHE_TTL > 0:
+        cache_key = _response_cache_key(prompt)
+        cached = await _get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+    
+    start = time.monotonic()
     for attempt in range(max_retries + 1):
+        # Every attempt's up-front charge is corrected, whether it succeeds or not
+        charged, used = 0, None
         try:
-            response = await llm.ainvoke(prompt)
+            charged = await scheduler.acquire(prompt, lane)
+            if _hedged(lane):
+                response, role = await hedger.ainvoke(llm, fallback_llm, prompt, lane)
+            else:
+                response, role = await llm.ainvoke(prompt), "primary"
+            LLM_REQUEST_SECONDS.labels(prompt_type=prompt_type).observe(time.monotonic() - start)
+            _record_usage(prompt_type, response)
+            if role == "fallback":
+                # The cancelled primary only consumed its prompt, not the estimated completion
+                used = count_tokens(prompt)
+                # Answered by the fallback model, which the cache key doesn't describe
+                return response.content
+            used = _usage_tokens(response) or _estimated_usage(prompt, response.content)
+            if cache_key:
+                await _cache_response(cache_key, response.content)
             return response.content
         except Exception as e:
-            error_str = str(e).lower()
-            is_rate_limit = "429" in error_str or "rate" in error_str or "limit" in error_str
+            is_rate_limit = _is_rate_limit_error(e)
             
             if is_rate_limit and attempt < max_retries:
+                LLM_RATE_LIMITED.labels(prompt_type=prompt_type, outcome="retried").inc()
                 wait_time = 2 ** (attempt + 1)
                 logger.warning(f"Groq rate limit hit (attempt {attempt + 1}/{max_retries}). Retrying in {wait_time}s...")
                 await asyncio.sleep(wait_time)
                 continue
             
             if is_rate_limit:
+                LLM_RATE_LIMITED.labels(prompt_type=prompt_type, outcome="failed").inc()
                 logger.error(f"Groq rate limit exceeded after {max_retries} retries: {e}")
                 raise ValueError("⏳ AI service is temporarily busy. Please try again in a few seconds.")
             
             logger.error(f"LLM invocation error: {e}")
             raise
+        finally:
+            # A failed or cancelled attempt sent its prompt at most
+            await scheduler.settle(charged, used if used is not None else count_tokens(prompt))
+
+
+async def stream_with_retry(prompt: str, max_retries: int = 3, use_cache: bool = True,
+                            lane: str = LANE_INTERACTIVE, prompt_type: str = "other") -> AsyncIterator[str]:
+    """Stream the LLM response as content deltas, with the same scheduling and 429 retry policy.
+    
+    Retries only happen before the first token is yielded; a failure
+    mid-stream is raised to the caller since partial output was already shown.
+    Token counts are estimated with tiktoken, since streams don't report usage.
+    
+    Shares the response cache with `invoke_with_retry`: a cached completion
+    is yielded as a single delta, and a complete primary-model stream is
+    stored. Pass `use_cache=False` to always call the model.
+    """
+    cache_key = None
+    if use_cache and settings.LLM_CACHE_TTL > 0:
+        cache_key = _response_cache_key(prompt)
+        cached = await _get_cached_response(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    start = time.monotonic()
+    for attempt in range(max_retries + 1):
+        started = False
+        parts = []
+        winner = {"role": "primary"}
+        charged = 0
+        try:
+            charged = await scheduler.acquire(prompt, lane)
+            if _hedged(lane):
+                async for delta in hedger.astream(llm, fallback_llm, prompt, lane, winner_info=winner):
+                    started = True
+                    parts.append(delta)
+                    yield delta
+            else:
+                async for chunk in llm.astream(prompt):
+                    if chunk.content:
+                        started = True
+                        parts.append(chunk.content)
+                        yield chunk.content
+            content = "".join(parts)
+            LLM_REQUEST_SECONDS.labels(prompt_type=prompt_type).observe(time.monotonic() - start)
+            _record_tokens(prompt_type, count_tokens(prompt), count_tokens(content))
+            # Fallback answers aren't described by the cache key
+            if cache_key and content and winner["role"] == "primary":
+                await _cache_response(cache_key, content)
+            return
+        except Exception as e:
+            is_rate_limit = _is_rate_limit_error(e)
+            
+            if is_rate_limit and not started and attempt < max_retries:
+                LLM_RATE_LIMITED.labels(prompt_type=prompt_type, outcome="retried").inc()
+                wait_time = 2 ** (attempt + 1)
+                logger.warning(f"Groq rate limit hit (attempt {attempt + 1}/{max_retries}). Retrying in {wait_time}s...")
+                await asyncio.sleep(wait_time)
+                continue
+            
+            if is_rate_limit:
+                LLM_RATE_LIMITED.labels(prompt_type=prompt_type, outcome="failed").inc()
+                logger.error(f"Groq rate limit exceeded while streaming: {e}")
+                raise ValueError("⏳ AI service is temporarily busy. Please try again in a few seconds.")
+            
+            logger.error(f"LLM streaming error: {e}")
+            raise
+        finally:
+            # Streams don't report usage: settle with what was sent and received.
+            # When the fallback answered, the cancelled primary only read the prompt.
+            received = "".join(parts) if winner["role"] == "primary" else ""
+            await scheduler.settle(charged, _estimated_usage(prompt, received))
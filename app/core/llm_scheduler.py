@@ -0,0 +1,173 @@
+"""
+Cluster-wide client-side scheduler for the Groq rate limits.
+
+Every bot process and Celery worker draws from the same pair of token buckets
+in Redis (requests per minute and tokens per minute), so calls wait for
+budget up front instead of all hitting 429s at once and backing off together.
+Prompt tokens are estimated with tiktoken before each call, and the estimate
+is corrected with the actual usage Groq reports afterwards.
+
+Two priority lanes share the buckets: the background lane (summaries,
+translations) may only spend budget above a reserve fraction of capacity,
+which is kept free for the interactive lane (Q&A, /deepdive, /actionpoints).
+"""
+import time
+import random
+import asyncio
+import logging
+import tiktoken
+from app.core.config import settings
+from app.core.metrics import LLM_QUEUE_WAIT_SECONDS
+from app.db.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LANE_INTERACTIVE = "interactive"
+LANE_BACKGROUND = "background"
+
+LLM_BUDGET_PREFIX = "llm_budget:"
+EXPECTED_COMPLETION_TOKENS = 800  # charged up front, corrected once usage is known
+MAX_POLL_INTERVAL = 2.0           # re-check at least this often while waiting
+
+# cl100k_base differs from Llama's tokenizer but is close enough for budgeting
+_encoding = tiktoken.get_encoding("cl100k_base")
+
+# Refills both buckets from the time elapsed (Redis clock, so hosts agree),
+# then takes one request and `cost` tokens if enough remain above the lane's
+# reserve. Returns the seconds to wait as a string (0 when taken).
+_ACQUIRE_LUA = """
+local key = KEYS[1]
+local rpm = tonumber(ARGV[1])
+local tpm = tonumber(ARGV[2])
+local reserve = tonumber(ARGV[4])
+-- A single call can never need more than the lane may spend
+local cost = math.min(tonumber(ARGV[3]), tpm * (1 - reserve))
+
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call('HMGET', key, 'requests', 'tokens', 'ts')
+local requests = tonumber(state[1]) or rpm
+local tokens = tonumber(state[2]) or tpm
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+requests = math.min(rpm, requests + elapsed * rpm / 60)
+tokens = math.min(tpm, tokens + elapsed * tpm / 60)
+
+local wait = 0
+local need_requests = 1 + reserve * rpm
+local need_tokens = cost + reserve * tpm
+if requests < need_requests then
+    wait = math.max(wait, (need_requests - requests) * 60 / rpm)
+end
+if tokens < need_tokens then
+    wait = math.max(wait, (need_tokens - tokens) * 60 / tpm)
+end
+if wait == 0 then
+    requests = requests - 1
+    tokens = tokens - cost
+end
+
+redis.call('HSET', key, 'requests', requests, 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', key, 120)
+return tostring(wait)
+"""
+
+# Returns over-charged tokens to the bucket (or charges the shortfall)
+_SETTLE_LUA = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+if tokens then
+    redis.call('HSET', KEYS[1], 'tokens', math.min(tonumber(ARGV[2]), tokens + tonumber(ARGV[1])))
+end
+return 1
+"""
+
+
+def count_tokens(text: str) -> int:
+    """Estimated token count of a prompt."""
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+class LLMScheduler:
+    """Waits for Groq request and token budget shared across the cluster."""
+
+    def __init__(self, model: str, rpm: int = settings.GROQ_RPM_LIMIT, tpm: int = settings.GROQ_TPM_LIMIT,
+                 background_reserve: float = settings.GROQ_BACKGROUND_RESERVE):
+        self.key = f"{LLM_BUDGET_PREFIX}{model}"
+        self.rpm = rpm
+        self.tpm = tpm
+        self.reserves = {LANE_INTERACTIVE: 0.0, LANE_BACKGROUND: background_reserve}
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 and self.tpm > 0
+
+    def lane_capacity(self, lane: str) -> float:
+        """Tokens the lane can spend from a full bucket."""
+        return self.tpm * (1 - self.reserves[lane])
+
+    def min_seconds(self, tokens: int, requests: int, lane: str) -> float:
+        """Shortest time the lane can spend this much budget: a full bucket, then the refill rate."""
+        if not self.enabled:
+            return 0.0
+        reserve = self.reserves[lane]
+        token_wait = max(0.0, tokens - self.tpm * (1 - reserve)) * 60 / self.tpm
+        request_wait = max(0.0, requests - self.rpm * (1 - reserve)) * 60 / self.rpm
+        return max(token_wait, request_wait)
+
+    async def _take(self, r, cost: int, lane: str) -> float:
+        """Try to take budget once. Returns 0 if taken, else seconds to wait."""
+        return float(await r.eval(
+            _ACQUIRE_LUA, 1, self.key, self.rpm, self.tpm, cost, self.reserves[lane]
+        ))
+
+    async def acquire(self, prompt: str, lane: str = LANE_INTERACTIVE) -> int:
+        """Wait until the call fits the budget. Returns the tokens charged.
+
+        Fails open: if Redis is unavailable the call proceeds unthrottled.
+        """
+        if not self.enabled:
+            return 0
+        cost = count_tokens(prompt) + EXPECTED_COMPLETION_TOKENS
+        start = time.monotonic()
+        try:
+            r = await get_redis()
+            while True:
+                wait = await self._take(r, cost, lane)
+                if wait <= 0:
+                    break
+                # Jitter spreads out waiters that would otherwise retry in lockstep
+                await asyncio.sleep(min(wait, MAX_POLL_INTERVAL) + random.uniform(0, 0.1))
+        except Exception as e:
+            logger.warning(f"LLM scheduler unavailable, calling Groq unthrottled: {e}")
+            cost = 0
+        waited = time.monotonic() - start
+        LLM_QUEUE_WAIT_SECONDS.labels(lane=lane).observe(waited)
+        if waited > 1:
+            logger.info(f"Waited {waited:.1f}s for Groq budget ({lane} lane, ~{cost} tokens)")
+        return cost
+
+    async def try_acquire(self, prompt: str, lane: str = LANE_INTERACTIVE) -> int | None:
+        """Take budget only if it is available right now.
+
+        Returns the tokens charged, or None if the call would have to wait
+        (or Redis is unavailable), for optional calls such as hedges.
+        """
+        if not self.enabled:
+            return 0
+        cost = count_tokens(prompt) + EXPECTED_COMPLETION_TOKENS
+        try:
+            r = await get_redis()
+            return cost if await self._take(r, cost, lane) <= 0 else None
+        except Exception as e:
+            logger.debug(f"LLM scheduler unavailable: {e}")
+            return None
+
+    async def settle(self, charged: int, used: int | None):
+        """Correct the up-front estimate with the tokens Groq actually counted."""
+        if not charged or used is None:
+            return
+        try:
+            r = await get_redis()
+            await r.eval(_SETTLE_LUA, 1, self.key, charged - used, self.tpm)
+        except Exception as e:
+            logger.debug(f"Failed to settle LLM token budget: {e}")
@@ -0,0 +1,51 @@
+"""
+Event-loop lag monitoring.
+
+A background task sleeps for a fixed interval and records how late it wakes
+up. Anything that blocks the loop (synchronous I/O, model inference, FAISS
+work) shows up as lag, since every other update waits just as long.
+"""
+import asyncio
+import logging
+from app.core.metrics import EVENT_LOOP_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 0.5    # seconds between samples
+WARN_LAG = 0.25          # log a warning once the loop is blocked this long
+
+
+class LoopLagMonitor:
+    """Samples the running event loop's scheduling lag into a histogram."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        """Start sampling on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            if lag >= WARN_LAG:
+                logger.warning(f"Event loop was blocked for {lag:.3f}s")
+
+
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,214 @@
+"""
+Prometheus metrics shared across the bot and workers.
+Metrics are defined once here and imported where they are recorded.
+"""
+from prometheus_client import Counter, Gauge, Histogram
+
+# ── Write-Behind Persistence ───────────────────────────────────────────────
+
+PERSISTENCE_FLUSH_SECONDS = Histogram(
+    "persistence_flush_seconds",
+    "Time to flush buffered records to PostgreSQL",
+    ["table"],
+)
+PERSISTENCE_BACKLOG = Gauge(
+    "persistence_backlog_records",
+    "Records waiting in the write-behind buffer",
+    ["table"],
+)
+PERSISTENCE_FLUSHED = Counter(
+    "persistence_flushed_records_total",
+    "Records written to PostgreSQL by the write-behind buffer",
+    ["table"],
+)
+PERSISTENCE_DROPPED = Counter(
+    "persistence_dropped_records_total",
+    "Records dropped because the write-behind buffer was full",
+    ["table"],
+)
+
+# ── Outbound Telegram Queue ────────────────────────────────────────────────
+
+OUTBOUND_QUEUE_DEPTH = Gauge(
+    "telegram_outbound_queue_depth",
+    "Telegram requests waiting in the outbound queue",
+)
+OUTBOUND_WAIT_SECONDS = Histogram(
+    "telegram_outbound_wait_seconds",
+    "Time from enqueueing a Telegram request to its completion",
+    ["kind"],
+)
+OUTBOUND_COALESCED = Counter(
+    "telegram_outbound_coalesced_edits_total",
+    "Queued message edits superseded by a newer edit of the same message",
+)
+
+# ── Semantic Answer Cache ──────────────────────────────────────────────────
+
+ANSWER_CACHE_REQUESTS = Counter(
+    "answer_cache_requests_total",
+    "Q&A answer cache lookups by result (hit, miss, bypass for follow-ups)",
+    ["result"],
+)
+ANSWER_CACHE_EVICTIONS = Counter(
+    "answer_cache_evictions_total",
+    "Cached answers evicted because a video's cache was full",
+)
+
+# ── LLM Response Cache ─────────────────────────────────────────────────────
+
+LLM_CACHE_REQUESTS = Counter(
+    "llm_cache_requests_total",
+    "LLM response cache lookups by result (hit, miss)",
+    ["result"],
+)
+
+# ── Translation Cache ──────────────────────────────────────────────────────
+
+TRANSLATION_CACHE_REQUESTS = Counter(
+    "translation_cache_requests_total",
+    "Translation cache lookups by result (local_hit, redis_hit, miss)",
+    ["result"],
+)
+
+# ── Language Request Detection ─────────────────────────────────────────────
+
+LANGUAGE_DETECTIONS = Counter(
+    "language_detections_total",
+    "Language-request detections by method (local, llm for ambiguous messages)",
+    ["method"],
+)
+
+# ── UI String Catalogue ────────────────────────────────────────────────────
+
+UI_STRING_LOOKUPS = Counter(
+    "ui_string_lookups_total",
+    "Non-English UI string lookups by source (catalogue, translated on demand)",
+    ["result"],
+)
+
+# ── Groq Budget Scheduler ──────────────────────────────────────────────────
+
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "llm_queue_wait_seconds",
+    "Time LLM calls waited for Groq request/token budget",
+    ["lane"],
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120),
+)
+
+# ── LLM Latency & Hedging ──────────────────────────────────────────────────
+
+LLM_LATENCY_SECONDS = Histogram(
+    "llm_latency_seconds",
+    "LLM call latency per model, to completion (total) or first streamed token",
+    ["model", "kind"],
+    buckets=(0.25, 0.5, 1, 1.5, 2, 3, 5, 8, 13, 20, 30, 60),
+)
+LLM_HEDGES = Counter(
+    "llm_hedges_total",
+    "Hedged LLM requests by outcome (primary_won, fallback_won, skipped_budget, skipped_rate_limit)",
+    ["outcome"],
+)
+
+# ── LLM Calls ──────────────────────────────────────────────────────────────
+
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_seconds",
+    "LLM call duration per prompt type, including budget waits and retries",
+    ["prompt_type"],
+    buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60, 120),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "LLM tokens per prompt type and direction (input, output); estimated for streams",
+    ["prompt_type", "direction"],
+)
+LLM_RATE_LIMITED = Counter(
+    "llm_rate_limited_total",
+    "Groq 429 responses per prompt type, by outcome (retried, failed)",
+    ["prompt_type", "outcome"],
+)
+
+# ── Embeddings ─────────────────────────────────────────────────────────────
+
+EMBEDDING_BATCH_SIZE = Histogram(
+    "embedding_batch_size",
+    "Texts per embedding model call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024),
+)
+EMBEDDING_SECONDS = Histogram(
+    "embedding_seconds",
+    "Embedding model call duration",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+EMBEDDING_RPC_SECONDS = Histogram(
+    "embedding_rpc_seconds",
+    "Round trip of a request to the embedding service, including batching wait",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+EMBEDDING_SERVICE_BATCH_REQUESTS = Histogram(
+    "embedding_service_batch_requests",
+    "Caller requests coalesced into one embedding service batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+# ── FAISS Index Loading ────────────────────────────────────────────────────
+
+FAISS_LOAD_SECONDS = Histogram(
+    "faiss_load_seconds",
+    "Time to deserialize a video's FAISS index and chunk metadata from Redis",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+FAISS_LOAD_BYTES = Histogram(
+    "faiss_load_bytes",
+    "Serialized size of a loaded FAISS index plus its chunk metadata",
+    buckets=(1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7, 5e7),
+)
+
+VECTOR_STORE_CACHE_REQUESTS = Counter(
+    "vector_store_cache_requests_total",
+    "Process-local FAISS index cache lookups by result (hit, miss)",
+    ["result"],
+)
+VECTOR_STORE_CACHE_BYTES = Gauge(
+    "vector_store_cache_bytes",
+    "Serialized size of the FAISS indexes held in the process-local cache",
+)
+
+# ── Event Loop ─────────────────────────────────────────────────────────────
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the bot's event loop woke up a periodic sampling task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+# ── Redis Caches ───────────────────────────────────────────────────────────
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Redis cache lookups by cache (transcript, summary, translated_summary, actionpoints, faiss) and result (hit, miss)",
+    ["cache", "result"],
+)
+
+# ── Video Processing ───────────────────────────────────────────────────────
+
+VIDEO_STAGE_SECONDS = Histogram(
+    "video_processing_stage_seconds",
+    "Duration of each stage of process_video_task",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+# ── Transcript Normalisation ───────────────────────────────────────────────
+
+TRANSCRIPT_TOKENS = Counter(
+    "transcript_tokens_total",
+    "Tokens in fetched transcripts, before (raw) and after (normalized) normalisation",
+    ["form"],
+)
+TRANSCRIPT_TOKEN_REDUCTION = Histogram(
+    "transcript_token_reduction_ratio",
+    "Share of a transcript's tokens removed by normalisation",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75),
+)
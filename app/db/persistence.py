@@ -1,44 +1,219 @@
 """
 Database persistence helpers for writing records to PostgreSQL.
-These are used by handlers and tasks to persist data that was
-previously only defined in models but never written.
+
+Writes are write-behind: handlers and tasks enqueue records into a bounded
+in-memory buffer, which is flushed periodically (or as soon as a batch fills
+up) as multi-row INSERTs and `ON CONFLICT (video_id) DO UPDATE` upserts, off
+the user's request path.
 """
+import time
+import asyncio
 import logging
-from sqlalchemy import select
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.db.postgres import AsyncSessionLocal
 from app.db.models import VideoRecord, QAHistory
+from app.core.metrics import (
+    PERSISTENCE_FLUSH_SECONDS, PERSISTENCE_BACKLOG,
+    PERSISTENCE_FLUSHED, PERSISTENCE_DROPPED
+)
 
 logger = logging.getLogger(__name__)
 
+MAX_BUFFERED_RECORDS = 5000   # per table; the oldest records are dropped beyond this
+FLUSH_BATCH_SIZE = 200        # flush early once this many records are waiting
+FLUSH_INTERVAL = 2.0          # seconds between periodic flushes
+MAX_WRITE_ATTEMPTS = 5        # a record whose batch fails this often is dropped
 
-async def save_video_record(video_id: str, title: str, summary: str):
-    """Save or update a video record in PostgreSQL."""
-    async with AsyncSessionLocal() as session:
-        # Check if record already exists
-        result = await session.execute(
-            select(VideoRecord).where(VideoRecord.video_id == video_id)
-        )
-        existing = result.scalar_one_or_none()
-        
-        if existing:
-            existing.title = title
-            existing.summary = summary
+
+class WriteBehindBuffer:
+    """Bounded buffer of pending PostgreSQL writes, flushed in batches."""
+
+    def __init__(self, max_size: int = MAX_BUFFERED_RECORDS,
+                 batch_size: int = FLUSH_BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._qa_rows: list[dict] = []
+        # Keyed by video_id: an upsert can't touch the same row twice per statement
+        self._video_rows: dict[str, dict] = {}
+        # id(row) -> failed writes, for rows waiting to be retried
+        self._attempts: dict[int, int] = {}
+        self._last_flush = time.monotonic()
+        self._flush_lock: asyncio.Lock | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    # ── Enqueueing ────────────────────────────────────────────────────────
+
+    def add_qa(self, row: dict):
+        if len(self._qa_rows) >= self.max_size:
+            self._attempts.pop(id(self._qa_rows.pop(0)), None)
+            PERSISTENCE_DROPPED.labels(table="qa_history").inc()
+        self._qa_rows.append(row)
+        self._on_enqueue()
+
+    def add_video(self, row: dict):
+        if row["video_id"] not in self._video_rows and len(self._video_rows) >= self.max_size:
+            self._attempts.pop(id(self._video_rows.pop(next(iter(self._video_rows)))), None)
+            PERSISTENCE_DROPPED.labels(table="video_records").inc()
+        replaced = self._video_rows.pop(row["video_id"], None)
+        if replaced is not None:
+            self._attempts.pop(id(replaced), None)
+        self._video_rows[row["video_id"]] = row
+        self._on_enqueue()
+
+    def _on_enqueue(self):
+        self._update_backlog()
+        if self._wake is not None and self._pending() >= self.batch_size:
+            self._wake.set()
+
+    def _pending(self) -> int:
+        return len(self._qa_rows) + len(self._video_rows)
+
+    def _update_backlog(self):
+        PERSISTENCE_BACKLOG.labels(table="qa_history").set(len(self._qa_rows))
+        PERSISTENCE_BACKLOG.labels(table="video_records").set(len(self._video_rows))
+
+    # ── Flushing ──────────────────────────────────────────────────────────
+
+    async def flush(self):
+        """Write everything buffered so far. Unwritten records are re-queued."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            self._last_flush = time.monotonic()
+            qa_rows, self._qa_rows = self._qa_rows, []
+            video_rows, self._video_rows = list(self._video_rows.values()), {}
+            self._update_backlog()
+
+            if qa_rows:
+                await self._write("qa_history", qa_rows, self._insert_qa)
+            if video_rows:
+                await self._write("video_records", video_rows, self._upsert_videos)
+
+    async def flush_if_due(self):
+        """Flush when a batch is full or the flush interval has passed."""
+        if not self._pending():
+            return
+        if self._pending() >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def _write(self, table: str, rows: list[dict], writer):
+        start = time.perf_counter()
+        written = 0
+        try:
+            while written < len(rows):
+                batch = rows[written:written + self.batch_size]
+                await writer(batch)
+                written += len(batch)
+                for row in batch:
+                    self._attempts.pop(id(row), None)
+        except Exception as e:
+            logger.error(f"Failed to flush {len(rows) - written} {table} records to PostgreSQL: {e}")
+            # Earlier batches are committed; only the failed one counts an attempt
+            failed = self._count_failure(table, rows[written:written + self.batch_size])
+            self._requeue(table, failed + rows[written + self.batch_size:])
+        if written:
+            PERSISTENCE_FLUSHED.labels(table=table).inc(written)
+        if written == len(rows):
+            PERSISTENCE_FLUSH_SECONDS.labels(table=table).observe(time.perf_counter() - start)
+
+    def _count_failure(self, table: str, rows: list[dict]) -> list[dict]:
+        """Rows of a failed batch that may be retried; those out of attempts are dropped."""
+        retry = []
+        for row in rows:
+            attempts = self._attempts.pop(id(row), 0) + 1
+            if attempts < MAX_WRITE_ATTEMPTS:
+                self._attempts[id(row)] = attempts
+                retry.append(row)
+        dropped = len(rows) - len(retry)
+        if dropped:
+            logger.error(f"Dropping {dropped} {table} records after {MAX_WRITE_ATTEMPTS} failed writes")
+            PERSISTENCE_DROPPED.labels(table=table).inc(dropped)
+        return retry
+
+    def _requeue(self, table: str, rows: list[dict]):
+        # Newer records enqueued during the flush win over the failed batch
+        if table == "qa_history":
+            self._qa_rows = rows + self._qa_rows
+            overflow = len(self._qa_rows) - self.max_size
+            if overflow > 0:
+                for row in self._qa_rows[:overflow]:
+                    self._attempts.pop(id(row), None)
+                del self._qa_rows[:overflow]
+                PERSISTENCE_DROPPED.labels(table=table).inc(overflow)
         else:
-            record = VideoRecord(video_id=video_id, title=title, summary=summary)
-            session.add(record)
-        
-        await session.commit()
+            for row in rows:
+                if row["video_id"] not in self._video_rows and len(self._video_rows) < self.max_size:
+                    self._video_rows[row["video_id"]] = row
+                else:
+                    self._attempts.pop(id(row), None)
+        self._update_backlog()
 
+    @staticmethod
+    async def _insert_qa(rows: list[dict]):
+        async with AsyncSessionLocal() as session:
+            await session.execute(insert(QAHistory), rows)
+            await session.commit()
 
-async def save_qa_history(user_id: str, video_id: str, question: str, answer: str, language: str = "english"):
-    """Save a Q&A interaction to PostgreSQL for analytics."""
-    async with AsyncSessionLocal() as session:
-        record = QAHistory(
-            user_id=str(user_id),
-            video_id=video_id,
-            question=question,
-            answer=answer,
-            language=language
+    @staticmethod
+    async def _upsert_videos(rows: list[dict]):
+        stmt = pg_insert(VideoRecord).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[VideoRecord.video_id],
+            set_={"title": stmt.excluded.title, "summary": stmt.excluded.summary},
         )
-        session.add(record)
-        await session.commit()
+        async with AsyncSessionLocal() as session:
+            await session.execute(stmt)
+            await session.commit()
+
+    # ── Background Flusher ────────────────────────────────────────────────
+
+    async def start(self):
+        """Start periodic flushing on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out whatever is still buffered."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._wake = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush_if_due()
+
+
+# Shared per-process buffer
+persistence_buffer = WriteBehindBuffer()
+
+
+async def save_video_record(video_id: str, title: str, summary: str):
+    """Queue an upsert of a video record."""
+    persistence_buffer.add_video({"video_id": video_id, "title": title, "summary": summary})
+
+
+async def save_qa_history(user_id: str, video_id: str, question: str, answer: str, language: str = "english"):
+    """Queue a Q&A interaction for analytics."""
+    persistence_buffer.add_qa({
+        "user_id": str(user_id),
+        "video_id": video_id,
+        "question": question,
+        "answer": answer,
+        "language": language,
+    })
@@ -1,6 +1,9 @@
 import json
+import time
 import redis.asyncio as redis
+from redis import Redis as SyncRedis
 from app.core.config import settings
+from app.core.metrics import CACHE_REQUESTS
 
 redis_client = redis.from_url(
     settings.REDIS_URL,
@@ -8,9 +11,19 @@ redis_client = redis.from_url(
     decode_responses=True
 )
 
+# Synchronous client for code running outside an event loop (worker threads)
+sync_redis_client = SyncRedis.from_url(
+    settings.REDIS_URL,
+    encoding="utf-8",
+    decode_responses=True
+)
+
 async def get_redis():
     return redis_client
 
+def get_sync_redis():
+    return sync_redis_client
+
 # ── Transcript Caching (24h TTL) ───────────────────────────────────────────
 
 TRANSCRIPT_CACHE_PREFIX = "transcript:"
@@ -29,6 +42,22 @@ async def get_cached_transcript(video_id: str) -> list[dict] | None:
     """Retrieve cached transcript, returns None on miss."""
     r = await get_redis()
     data = await r.get(f"{TRANSCRIPT_CACHE_PREFIX}{video_id}")
+    CACHE_REQUESTS.labels(cache="transcript", result="hit" if data else "miss").inc()
+    if data:
+        return json.loads(data)
+    return None
+
+TRANSCRIPT_TOKENS_PREFIX = "transcript_tokens:"
+
+async def cache_transcript_token_counts(video_id: str, counts: list[int]):
+    """Cache per-entry token counts of a transcript, alongside the transcript."""
+    r = await get_redis()
+    await r.setex(f"{TRANSCRIPT_TOKENS_PREFIX}{video_id}", TRANSCRIPT_TTL, json.dumps(counts))
+
+async def get_cached_transcript_token_counts(video_id: str) -> list[int] | None:
+    """Retrieve cached per-entry token counts, returns None on miss."""
+    r = await get_redis()
+    data = await r.get(f"{TRANSCRIPT_TOKENS_PREFIX}{video_id}")
     if data:
         return json.loads(data)
     return None
@@ -39,19 +68,321 @@ SUMMARY_CACHE_PREFIX = "summary:"
 SUMMARY_TTL = 86400  # 24 hours
 
 async def cache_summary(video_id: str, summary: str):
-    """Cache generated summary in Redis."""
+    """Cache generated summary in Redis, dropping translations of the previous one."""
     r = await get_redis()
     await r.setex(f"{SUMMARY_CACHE_PREFIX}{video_id}", SUMMARY_TTL, summary)
+    await r.delete(f"{SUMMARY_TRANSLATIONS_PREFIX}{video_id}")
 
 async def get_cached_summary(video_id: str) -> str | None:
     """Retrieve cached summary, returns None on miss."""
     r = await get_redis()
-    return await r.get(f"{SUMMARY_CACHE_PREFIX}{video_id}")
+    summary = await r.get(f"{SUMMARY_CACHE_PREFIX}{video_id}")
+    CACHE_REQUESTS.labels(cache="summary", result="hit" if summary else "miss").inc()
+    return summary
+
+# ── Translated Summary Caching (24h TTL) ───────────────────────────────────
+# One hash per video next to its summary, mapping language -> translation,
+# so each (video, language) pair is translated once instead of per request.
+
+SUMMARY_TRANSLATIONS_PREFIX = "summary_translations:"
+
+async def cache_translated_summary(video_id: str, language: str, translation: str):
+    """Cache a video's summary translated into `language`."""
+    r = await get_redis()
+    key = f"{SUMMARY_TRANSLATIONS_PREFIX}{video_id}"
+    pipe = r.pipeline()
+    pipe.hset(key, language.lower(), translation)
+    pipe.expire(key, SUMMARY_TTL)
+    await pipe.execute()
+
+async def get_cached_translated_summary(video_id: str, language: str) -> str | None:
+    """Retrieve a video's translated summary, returns None on miss."""
+    r = await get_redis()
+    translation = await r.hget(f"{SUMMARY_TRANSLATIONS_PREFIX}{video_id}", language.lower())
+    CACHE_REQUESTS.labels(cache="translated_summary", result="hit" if translation else "miss").inc()
+    return translation
+
+# ── Action Points Caching (24h TTL) ────────────────────────────────────────
+# /actionpoints uses a fixed query and prompt, so the result is per video.
+
+ACTIONPOINTS_CACHE_PREFIX = "actionpoints:"
+
+async def cache_actionpoints(video_id: str, actionpoints: str):
+    """Cache a video's action points for as long as its summary."""
+    r = await get_redis()
+    await r.setex(f"{ACTIONPOINTS_CACHE_PREFIX}{video_id}", SUMMARY_TTL, actionpoints)
+
+async def get_cached_actionpoints(video_id: str) -> str | None:
+    """Retrieve cached action points, returns None on miss."""
+    r = await get_redis()
+    actionpoints = await r.get(f"{ACTIONPOINTS_CACHE_PREFIX}{video_id}")
+    CACHE_REQUESTS.labels(cache="actionpoints", result="hit" if actionpoints else "miss").inc()
+    return actionpoints
+
+# ── Section Summary Caching (24h TTL) ──────────────────────────────────────
+# Partial summaries of transcript sections for map-reduce summarisation,
+# keyed by video and a hash of the section text.
+
+SECTION_SUMMARY_PREFIX = "summary_section:"
+
+async def cache_section_summaries(video_id: str, partials: dict[str, str]):
+    """Cache partial summaries, mapping section key -> summary."""
+    if not partials:
+        return
+    r = await get_redis()
+    pipe = r.pipeline(transaction=False)
+    for section_key, summary in partials.items():
+        pipe.setex(f"{SECTION_SUMMARY_PREFIX}{video_id}:{section_key}", SUMMARY_TTL, summary)
+    await pipe.execute()
+
+async def get_cached_section_summaries(video_id: str, section_keys: list[str]) -> list[str | None]:
+    """Retrieve cached partial summaries in order, None for each miss."""
+    if not section_keys:
+        return []
+    r = await get_redis()
+    return await r.mget([f"{SECTION_SUMMARY_PREFIX}{video_id}:{key}" for key in section_keys])
+
+# ── Task Completion Notifications ──────────────────────────────────────────
+
+TASK_RESULT_PREFIX = "task_result:"
+TASK_RESULT_CHANNEL_PREFIX = "task_done:"
+TASK_RESULT_TTL = 600  # 10 minutes, long enough for late waiters to pick it up
+
+async def publish_task_result(task_id: str, result: dict):
+    """Store a finished task's result and notify listening bot processes.
+    
+    The result is kept under its own key as well as published, so a waiter
+    that subscribes after the worker finished still finds it.
+    """
+    r = await get_redis()
+    payload = json.dumps(result)
+    pipe = r.pipeline()
+    pipe.setex(f"{TASK_RESULT_PREFIX}{task_id}", TASK_RESULT_TTL, payload)
+    pipe.publish(f"{TASK_RESULT_CHANNEL_PREFIX}{task_id}", payload)
+    await pipe.execute()
+
+async def get_task_result(task_id: str) -> dict | None:
+    """Retrieve a stored task result, returns None if the task hasn't finished."""
+    r = await get_redis()
+    data = await r.get(f"{TASK_RESULT_PREFIX}{task_id}")
+    if data:
+        return json.loads(data)
+    return None
+
+# ── Summary Token Streams ──────────────────────────────────────────────────
+# Workers append summary deltas to a per-task Redis Stream while the LLM is
+# generating; bot processes tail it to render the summary progressively.
+# Entries carry one of: {"text": delta}, {"reset": "1"} (generation restarted)
+# or {"done": "1"}.
+
+SUMMARY_STREAM_PREFIX = "summary_stream:"
+SUMMARY_STREAM_MAXLEN = 1000  # approximate cap on entries per stream
+SUMMARY_STREAM_TTL = 600      # abandoned streams expire after 10 minutes
+
+async def append_summary_stream(task_id: str, fields: dict):
+    """Append an entry to a task's summary stream, bounding length and lifetime."""
+    r = await get_redis()
+    key = f"{SUMMARY_STREAM_PREFIX}{task_id}"
+    pipe = r.pipeline()
+    pipe.xadd(key, fields, maxlen=SUMMARY_STREAM_MAXLEN, approximate=True)
+    pipe.expire(key, SUMMARY_STREAM_TTL)
+    await pipe.execute()
+
+async def read_summary_stream(task_id: str, last_id: str = "0", block_ms: int = 5000) -> list[tuple[str, dict]]:
+    """Read entries after `last_id`, blocking up to `block_ms` for new ones."""
+    r = await get_redis()
+    response = await r.xread({f"{SUMMARY_STREAM_PREFIX}{task_id}": last_id}, block=block_ms)
+    if not response:
+        return []
+    return response[0][1]
+
+# ── Single-Flight Video Jobs (Leases) ──────────────────────────────────────
+# One lease per video_id names the Celery task currently responsible for it.
+# Every other requester attaches to that task's result instead of enqueueing
+# a duplicate. The holder renews the lease while it works; if it dies, the
+# lease expires and the next requester takes over.
+
+VIDEO_JOB_PREFIX = "video_job:"
+VIDEO_JOB_QUEUED_TTL = 300  # lease while the task waits in the queue
+VIDEO_JOB_LEASE_TTL = 60    # lease while a worker runs it, renewed by heartbeat
+
+# Returns the current owner, claiming the lease for ARGV[1] if it is free
+# (or already ours)
+_CLAIM_LEASE_LUA = """
+local owner = redis.call('GET', KEYS[1])
+if owner and owner ~= ARGV[1] then
+    return owner
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', tonumber(ARGV[2]))
+return ARGV[1]
+"""
+
+# Extends the lease only if ARGV[1] still owns it. Returns 1 on success.
+_RENEW_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+end
+return 0
+"""
+
+# Deletes the lease only if ARGV[1] still owns it
+_RELEASE_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+async def claim_video_job(video_id: str, task_id: str, ttl: int = VIDEO_JOB_QUEUED_TTL) -> str:
+    """Atomically claim the job lease for a video.
+    
+    Returns the task id that owns the lease: `task_id` if the claim
+    succeeded, otherwise the in-flight task to attach to.
+    """
+    r = await get_redis()
+    return await r.eval(_CLAIM_LEASE_LUA, 1, f"{VIDEO_JOB_PREFIX}{video_id}", task_id, ttl)
+
+async def get_video_job_owner(video_id: str) -> str | None:
+    """Return the task id currently holding the video's lease, if any."""
+    r = await get_redis()
+    return await r.get(f"{VIDEO_JOB_PREFIX}{video_id}")
+
+async def release_video_job(video_id: str, task_id: str) -> bool:
+    """Release the video's lease if `task_id` still owns it."""
+    r = await get_redis()
+    return bool(await r.eval(_RELEASE_LEASE_LUA, 1, f"{VIDEO_JOB_PREFIX}{video_id}", task_id))
+
+def renew_video_job(video_id: str, task_id: str, ttl: int = VIDEO_JOB_LEASE_TTL) -> bool:
+    """Extend the video's lease if `task_id` still owns it.
+    
+    Synchronous so it can run from a worker's heartbeat thread.
+    """
+    r = get_sync_redis()
+    return bool(r.eval(_RENEW_LEASE_LUA, 1, f"{VIDEO_JOB_PREFIX}{video_id}", task_id, ttl))
+
+# ── Webhook Update Deduplication ───────────────────────────────────────────
+
+UPDATE_SEEN_PREFIX = "tg_update:"
+UPDATE_SEEN_TTL = 86400  # Telegram stops redelivering an update well within a day
+
+async def mark_update_seen(update_id: int) -> bool:
+    """Record a Telegram update id. Returns False if any replica already saw it."""
+    r = await get_redis()
+    return bool(await r.set(f"{UPDATE_SEEN_PREFIX}{update_id}", 1, nx=True, ex=UPDATE_SEEN_TTL))
+
+# ── Bounded Response Cache ─────────────────────────────────────────────────
+# Generic size-capped cache: values live under `{namespace}:{key}` with a TTL,
+# and a sorted set `{namespace}:index` orders keys by last use so the least
+# recently used ones are evicted once `max_entries` is exceeded. The braces
+# are a Redis Cluster hash tag, so a namespace's keys share one slot.
+
+# Stores a value, drops index entries whose keys have expired, then removes
+# the least recently used keys beyond the cap from the index. Returns those
+# keys; the caller deletes them, so the script only touches declared keys.
+_BOUNDED_CACHE_SET_LUA = """
+local index = KEYS[1]
+local entry = KEYS[2]
+local now = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+local max_entries = tonumber(ARGV[4])
+
+redis.call('SETEX', entry, ttl, ARGV[1])
+redis.call('ZADD', index, now, entry)
+redis.call('ZREMRANGEBYSCORE', index, '-inf', now - ttl)
+
+local evicted = {}
+local excess = redis.call('ZCARD', index) - max_entries
+if excess > 0 then
+    evicted = redis.call('ZRANGE', index, 0, excess - 1)
+    redis.call('ZREMRANGEBYRANK', index, 0, excess - 1)
+end
+redis.call('EXPIRE', index, ttl)
+return evicted
+"""
+
+def _bounded_index_key(namespace: str) -> str:
+    return f"{{{namespace}}}:index"
+
+def _bounded_entry_key(namespace: str, key: str) -> str:
+    return f"{{{namespace}}}:{key}"
+
+async def get_bounded_cache(namespace: str, key: str, ttl: int) -> str | None:
+    """Read a cached value and mark it as recently used. None on miss.
+    
+    A hit also restarts the entry's `ttl`, so an entry the index keeps as
+    recently used doesn't expire under it.
+    """
+    r = await get_redis()
+    cache_key = _bounded_entry_key(namespace, key)
+    index_key = _bounded_index_key(namespace)
+    pipe = r.pipeline(transaction=False)
+    pipe.get(cache_key)
+    pipe.zadd(index_key, {cache_key: time.time()}, xx=True)
+    pipe.expire(cache_key, ttl)
+    pipe.expire(index_key, ttl)
+    value, *_ = await pipe.execute()
+    return value
+
+async def set_bounded_cache(namespace: str, key: str, value: str, ttl: int, max_entries: int) -> int:
+    """Cache a value, evicting least recently used entries beyond `max_entries`.
+    
+    Returns the number of evicted entries.
+    """
+    r = await get_redis()
+    evicted = await r.eval(
+        _BOUNDED_CACHE_SET_LUA, 2, _bounded_index_key(namespace), _bounded_entry_key(namespace, key),
+        value, time.time(), ttl, max_entries,
+    )
+    if evicted:
+        await r.delete(*evicted)
+    return len(evicted)
+
+async def get_bounded_cache_many(namespace: str, keys: list[str], ttl: int) -> list[str | None]:
+    """Read several cached values in one round trip, marking hits as recently used."""
+    if not keys:
+        return []
+    r = await get_redis()
+    cache_keys = [_bounded_entry_key(namespace, key) for key in keys]
+    index_key = _bounded_index_key(namespace)
+    now = time.time()
+    pipe = r.pipeline(transaction=False)
+    pipe.mget(cache_keys)
+    pipe.zadd(index_key, {cache_key: now for cache_key in cache_keys}, xx=True)
+    for cache_key in cache_keys:
+        pipe.expire(cache_key, ttl)
+    pipe.expire(index_key, ttl)
+    values, *_ = await pipe.execute()
+    return values
+
+async def set_bounded_cache_many(namespace: str, items: dict[str, str], ttl: int, max_entries: int) -> int:
+    """Cache several values in one round trip. Returns the number of evicted entries."""
+    if not items:
+        return 0
+    r = await get_redis()
+    now = time.time()
+    pipe = r.pipeline(transaction=False)
+    for key, value in items.items():
+        pipe.eval(
+            _BOUNDED_CACHE_SET_LUA, 2, _bounded_index_key(namespace), _bounded_entry_key(namespace, key),
+            value, now, ttl, max_entries,
+        )
+    evicted = [key for keys in await pipe.execute() for key in keys]
+    if evicted:
+        await r.delete(*evicted)
+    return len(evicted)
 
 # ── Rate Limiting (Atomic Lua Script) ──────────────────────────────────────
 
 RATE_LIMIT_PREFIX = "ratelimit:"
 
+def rate_limit_key(user_id: int, action: str) -> str:
+    """Counter key for a user's action.
+
+    Hash-tagged with the user's `session:<id>` key so the session loader can
+    check it in the same script on Redis Cluster.
+    """
+    return f"{RATE_LIMIT_PREFIX}{action}:{{session:{user_id}}}"
+
 # Lua script for atomic check-and-increment — eliminates TOCTOU race condition
 # Returns 1 if allowed, 0 if denied
 _RATE_LIMIT_LUA = """
@@ -82,7 +413,7 @@ async def check_rate_limit(user_id: int, action: str, max_count: int, window_sec
     """
     global _rate_limit_script
     r = await get_redis()
-    key = f"{RATE_LIMIT_PREFIX}{action}:{user_id}"
+    key = rate_limit_key(user_id, action)
     
     if _rate_limit_script is None:
         _rate_limit_script = r.register_script(_RATE_LIMIT_LUA)
@@ -93,7 +424,7 @@ async def check_rate_limit(user_id: int, action: str, max_count: int, window_sec
 async def get_rate_limit_remaining(user_id: int, action: str, max_count: int) -> int:
     """Get remaining requests for a user in the current window."""
     r = await get_redis()
-    key = f"{RATE_LIMIT_PREFIX}{action}:{user_id}"
+    key = rate_limit_key(user_id, action)
     count = await r.get(key)
     if count is None:
         return max_count
@@ -2,13 +2,18 @@ import logging
 import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from aiogram.types import Update
 
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core.loop_monitor import loop_lag_monitor
 from app.api.endpoints import router as api_router
+from app.api.webhook import router as webhook_router, drain_pending_updates
 from app.db.postgres import init_db
+from app.db.persistence import persistence_buffer
 from app.bot.telegram_bot import get_bot, get_dispatcher
+from app.bot.task_listener import task_listener
+from app.bot.outbound import outbound
+from app.bot.ui_strings import ui_catalogue
 
 logger = logging.getLogger(__name__)
 bot = get_bot()
@@ -19,18 +24,46 @@ async def lifespan(app: FastAPI):
     # Startup
     setup_logging()
     logger.info("Starting up Bot backend...")
+    ui_catalogue.load()
+    await loop_lag_monitor.start()
     await init_db()
+    await persistence_buffer.start()
     
-    logger.info("Starting Telegram matching polling...")
-    polling_task = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
+    logger.info("Subscribing to Celery task completion notifications...")
+    await task_listener.start()
+    
+    polling_task = None
+    if settings.BOT_MODE == "webhook":
+        if not settings.WEBHOOK_BASE_URL or not settings.WEBHOOK_SECRET:
+            raise RuntimeError("BOT_MODE=webhook requires WEBHOOK_BASE_URL and WEBHOOK_SECRET")
+        logger.info("Registering Telegram webhook...")
+        await bot.set_webhook(
+            url=f"{settings.WEBHOOK_BASE_URL.rstrip('/')}{settings.WEBHOOK_PATH}",
+            secret_token=settings.WEBHOOK_SECRET,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    else:
+        logger.info("Starting Telegram matching polling...")
+        polling_task = asyncio.create_task(dp.start_polling(bot, handle_signals=False))
     
     yield
     
     # Shutdown
     logger.info("Shutting down Bot backend...")
-    polling_task.cancel()
+    if polling_task:
+        polling_task.cancel()
+    # The webhook stays registered: other replicas keep serving it
+    await drain_pending_updates()
+    await task_listener.stop()
+    await outbound.stop()
+    await persistence_buffer.stop()
+    await loop_lag_monitor.stop()
     await bot.session.close()
 
 app = FastAPI(title=settings.PROJECT_NAME, lifespan=lifespan)
+app.state.bot = bot
+app.state.dp = dp
 
 app.include_router(api_router, prefix="/api")
+if settings.BOT_MODE == "webhook":
+    app.include_router(webhook_router)
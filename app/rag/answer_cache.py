@@ -0,0 +1,169 @@
+"""
+Per-video semantic cache of Q&A answers.
+
+Popular videos get asked the same questions in different words. Each answered
+question is stored with its embedding, and a new question whose embedding is
+within `ANSWER_CACHE_SIMILARITY` (cosine) of a cached one is answered from the
+cache, skipping both the FAISS search and the LLM call.
+
+Each video's cache is a Redis hash of entries plus a sorted set of last-use
+times, capped at `ANSWER_CACHE_MAX_ENTRIES` (least recently used entries are
+evicted) and expiring `ANSWER_CACHE_TTL` seconds after the last write. Both
+keys are hash-tagged with the video ID, so the store script touches a single
+Redis Cluster slot.
+"""
+import re
+import json
+import time
+import base64
+import hashlib
+import logging
+import numpy as np
+from app.core.config import settings
+from app.db.redis_client import get_redis
+from app.core.metrics import ANSWER_CACHE_REQUESTS, ANSWER_CACHE_EVICTIONS
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_PREFIX = "answer_cache:"
+ANSWER_CACHE_LRU_PREFIX = "answer_cache_lru:"
+
+
+def _entries_key(video_id: str) -> str:
+    return f"{ANSWER_CACHE_PREFIX}{{{video_id}}}"
+
+
+def _lru_key(video_id: str) -> str:
+    return f"{ANSWER_CACHE_LRU_PREFIX}{{{video_id}}}"
+
+# Words that only make sense relative to the previous turns
+_FOLLOW_UP_WORDS = {
+    "it", "its", "this", "that", "these", "those", "he", "she", "him", "her",
+    "his", "they", "them", "their", "more", "else", "again", "above",
+    "previous", "earlier", "elaborate", "further", "also",
+}
+_FOLLOW_UP_OPENERS = ("and ", "but ", "so ", "what about", "how about", "why?", "why not")
+
+# Adds an entry and evicts the least recently used ones beyond the cap
+_STORE_ANSWER_LUA = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+local excess = redis.call('ZCARD', KEYS[2]) - tonumber(ARGV[4])
+if excess > 0 then
+    local evicted = redis.call('ZRANGE', KEYS[2], 0, excess - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, excess - 1)
+    redis.call('HDEL', KEYS[1], unpack(evicted))
+else
+    excess = 0
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return excess
+"""
+
+
+def is_follow_up(question: str, history: list[dict] | None) -> bool:
+    """Whether the question depends on the conversation so far.
+
+    Such answers are specific to one conversation, so they are neither
+    served from nor written to the shared cache.
+    """
+    if not history:
+        return False
+    normalized = question.strip().lower()
+    if normalized.startswith(_FOLLOW_UP_OPENERS):
+        return True
+    return bool(_FOLLOW_UP_WORDS.intersection(re.findall(r"[a-z']+", normalized)))
+
+
+def _entry_id(question: str) -> str:
+    normalized = " ".join(question.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _encode_embedding(embedding: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(embedding, dtype="float32").ravel().tobytes()).decode("ascii")
+
+
+def _decode_embedding(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype="float32")
+
+
+class SemanticAnswerCache:
+    """Redis-backed answer cache keyed by question similarity, per video."""
+
+    def __init__(self, similarity: float = settings.ANSWER_CACHE_SIMILARITY,
+                 max_entries: int = settings.ANSWER_CACHE_MAX_ENTRIES,
+                 ttl: int = settings.ANSWER_CACHE_TTL):
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache by this process."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    async def lookup(self, video_id: str, embedding: np.ndarray) -> str | None:
+        """Return the answer to the most similar cached question, if close enough.
+
+        `embedding` must be L2-normalized, as produced by `embed_query`.
+        """
+        query = np.asarray(embedding, dtype="float32").ravel()
+        best_id, best_answer, best_score = None, None, self.similarity
+        try:
+            r = await get_redis()
+            entries = await r.hgetall(_entries_key(video_id))
+            for entry_id, raw in entries.items():
+                entry = json.loads(raw)
+                cached = _decode_embedding(entry["embedding"])
+                if cached.shape != query.shape:
+                    continue
+                score = float(np.dot(cached, query))
+                if score >= best_score:
+                    best_id, best_answer, best_score = entry_id, entry["answer"], score
+            if best_id:
+                await r.zadd(_lru_key(video_id), {best_id: time.time()})
+        except Exception as e:
+            logger.warning(f"Answer cache lookup failed for video {video_id}: {e}")
+            best_answer = None
+
+        if best_answer is None:
+            self.misses += 1
+            ANSWER_CACHE_REQUESTS.labels(result="miss").inc()
+        else:
+            self.hits += 1
+            ANSWER_CACHE_REQUESTS.labels(result="hit").inc()
+            logger.info(f"Answer cache hit for video {video_id} (similarity {best_score:.3f})")
+        logger.debug(f"Answer cache hit rate: {self.hit_rate:.1%}")
+        return best_answer
+
+    async def store(self, video_id: str, question: str, embedding: np.ndarray, answer: str):
+        """Cache an answer, evicting the least recently used entries beyond the cap."""
+        entry_id = _entry_id(question)
+        entry = json.dumps({
+            "question": question,
+            "answer": answer,
+            "embedding": _encode_embedding(embedding),
+        })
+        try:
+            r = await get_redis()
+            evicted = await r.eval(
+                _STORE_ANSWER_LUA, 2, _entries_key(video_id), _lru_key(video_id),
+                entry_id, entry, time.time(), self.max_entries, self.ttl,
+            )
+            if evicted:
+                ANSWER_CACHE_EVICTIONS.inc(int(evicted))
+        except Exception as e:
+            logger.warning(f"Failed to cache answer for video {video_id}: {e}")
+
+    @staticmethod
+    def record_bypass():
+        ANSWER_CACHE_REQUESTS.labels(result="bypass").inc()
+
+
+# Shared per-process cache (state lives in Redis, counters are per process)
+answer_cache = SemanticAnswerCache()
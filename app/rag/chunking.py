@@ -1,10 +1,12 @@
 from langchain_text_splitters import TokenTextSplitter
+from app.rag.token_index import count_tokens_batch
 
 def chunk_transcript(transcript_dicts: list[dict], chunk_size: int = 400, chunk_overlap: int = 50) -> list[dict]:
     """
     Chunks transcript while preserving accurate timestamp metadata.
     Uses TokenTextSplitter to ensure chunks are contextually meaningful.
-    Each chunk gets the correct start timestamp based on character offset mapping.
+    Each chunk gets the correct start timestamp based on character offset mapping,
+    and its token count so prompt builders can budget without re-encoding.
     """
     text_splitter = TokenTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
 
@@ -46,4 +48,7 @@ def chunk_transcript(transcript_dicts: list[dict], chunk_size: int = 400, chunk_
         })
         search_start = pos + 1
 
+    for chunk, tokens in zip(chunks, count_tokens_batch([chunk["text"] for chunk in chunks])):
+        chunk["tokens"] = tokens
+
     return chunks
@@ -0,0 +1,154 @@
+"""
+Shared embedding service.
+
+With `EMBEDDING_MODE=remote`, bot and worker processes send texts to a
+dedicated embedding process over Redis instead of loading the model
+themselves. Requests are pushed onto one list; the server waits a few
+milliseconds after the first one arrives, takes everything queued up to
+a batch limit, embeds it in a single `model.encode` call and pushes each
+caller's vectors onto its own reply list.
+
+    python -m app.rag.embedding_service
+"""
+import json
+import math
+import time
+import uuid
+import logging
+import numpy as np
+import redis
+from prometheus_client import start_http_server
+from app.core.config import settings
+from app.core.metrics import EMBEDDING_RPC_SECONDS, EMBEDDING_SERVICE_BATCH_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+REQUEST_QUEUE = "embedding:requests"
+REPLY_PREFIX = "embedding:reply:"
+POLL_TIMEOUT = 1  # seconds the server blocks waiting for the first request
+
+# Replies start with a marker byte: vectors as raw float32, or an error message
+_VECTORS = b"V"
+_ERROR = b"E"
+
+_redis = redis.from_url(settings.REDIS_URL, decode_responses=False)
+
+
+# ── Client ─────────────────────────────────────────────────────────────────
+
+def remote_embeddings(texts: list[str], timeout: float | None = None) -> list[list[float]]:
+    """Embed texts through the embedding service. Blocks until the reply arrives."""
+    if not texts:
+        return []
+    timeout = timeout or settings.EMBEDDING_REQUEST_TIMEOUT
+    request_id = uuid.uuid4().hex
+    request = {"id": request_id, "texts": texts, "expires": time.time() + timeout}
+
+    start = time.perf_counter()
+    _redis.rpush(REQUEST_QUEUE, json.dumps(request))
+    reply = _redis.blpop([f"{REPLY_PREFIX}{request_id}"], timeout=timeout)
+    if reply is None:
+        raise TimeoutError(f"Embedding service did not answer within {timeout}s")
+    EMBEDDING_RPC_SECONDS.observe(time.perf_counter() - start)
+    return decode_reply(reply[1], len(texts))
+
+
+def encode_reply(vectors: np.ndarray) -> bytes:
+    return _VECTORS + np.ascontiguousarray(vectors, dtype=np.float32).tobytes()
+
+
+def decode_reply(payload: bytes, count: int) -> list[list[float]]:
+    if payload[:1] == _ERROR:
+        raise RuntimeError(f"Embedding service failed: {payload[1:].decode('utf-8', 'replace')}")
+    return np.frombuffer(payload[1:], dtype=np.float32).reshape(count, -1).tolist()
+
+
+# ── Server ─────────────────────────────────────────────────────────────────
+
+class EmbeddingServer:
+    """Coalesces queued embedding requests into batched encode calls."""
+
+    def __init__(self, encode, client=None, window: float | None = None, max_batch: int | None = None):
+        self.encode = encode
+        self.client = client or _redis
+        self.window = settings.EMBEDDING_BATCH_WINDOW_MS / 1000 if window is None else window
+        self.max_batch = max_batch or settings.EMBEDDING_MAX_BATCH
+
+    def collect(self) -> list[dict]:
+        """Wait for a request, then take whatever else arrives within the window."""
+        first = self.client.blpop([REQUEST_QUEUE], timeout=POLL_TIMEOUT)
+        if first is None:
+            return []
+        requests = [json.loads(first[1])]
+        texts = len(requests[0]["texts"])
+        deadline = time.monotonic() + self.window
+        while texts < self.max_batch:
+            raw = self.client.lpop(REQUEST_QUEUE)
+            if raw is None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                time.sleep(min(remaining, 0.001))
+                continue
+            request = json.loads(raw)
+            requests.append(request)
+            texts += len(request["texts"])
+        return requests
+
+    def serve_batch(self, requests: list[dict]):
+        """Embed all requests in one call and send each caller its vectors."""
+        # Callers that already gave up don't need an answer
+        now = time.time()
+        requests = [request for request in requests if request.get("expires", now) >= now]
+        if not requests:
+            return
+        EMBEDDING_SERVICE_BATCH_REQUESTS.observe(len(requests))
+
+        texts = [text for request in requests for text in request["texts"]]
+        try:
+            vectors = np.asarray(self.encode(texts), dtype=np.float32)
+            replies, offset = [], 0
+            for request in requests:
+                count = len(request["texts"])
+                replies.append(encode_reply(vectors[offset:offset + count]))
+                offset += count
+        except Exception as e:
+            logger.error(f"Failed to embed batch of {len(texts)} texts: {e}")
+            replies = [_ERROR + str(e).encode("utf-8")] * len(requests)
+
+        # EXPIRE only takes whole seconds; redis-py would send 30.0 as "30.0"
+        ttl = math.ceil(settings.EMBEDDING_REQUEST_TIMEOUT)
+        pipe = self.client.pipeline()
+        for request, reply in zip(requests, replies):
+            key = f"{REPLY_PREFIX}{request['id']}"
+            pipe.rpush(key, reply)
+            pipe.expire(key, ttl)
+        pipe.execute()
+
+    def run(self):
+        logger.info(f"Embedding service ready (window {self.window * 1000:.0f}ms, max batch {self.max_batch})")
+        while True:
+            try:
+                requests = self.collect()
+                if requests:
+                    self.serve_batch(requests)
+            except redis.RedisError as e:
+                logger.error(f"Embedding service lost Redis: {e}")
+                time.sleep(1)
+
+
+def main():
+    from app.core.logging import setup_logging
+    from app.rag.embeddings import encode_local, _get_model
+
+    setup_logging()
+    # Load the model before taking requests so the first callers don't time out
+    if _get_model() is None:
+        raise SystemExit("SentenceTransformer model could not be loaded")
+    if settings.EMBEDDING_SERVICE_METRICS_PORT:
+        start_http_server(settings.EMBEDDING_SERVICE_METRICS_PORT)
+    EmbeddingServer(encode_local).run()
+
+
+if __name__ == "__main__":
+    main()
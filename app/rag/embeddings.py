@@ -1,4 +1,5 @@
-from sentence_transformers import SentenceTransformer
+from app.core.config import settings
+from app.core.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_SECONDS
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,6 +13,8 @@ def _get_model():
     if _model is None:
         logger.info("Loading SentenceTransformer model ('paraphrase-albert-small-v2')...")
         try:
+            # Imported here so processes using the embedding service never load torch
+            from sentence_transformers import SentenceTransformer
             # We use a much smaller model here (43MB vs 90MB) to fit into Railway's 500MB free tier RAM limit
             _model = SentenceTransformer('paraphrase-albert-small-v2')
             logger.info("Model loaded successfully.")
@@ -22,14 +25,28 @@ def _get_model():
 
 def get_embedding(text: str) -> list[float]:
     """Generate embedding for a single text."""
+    if settings.EMBEDDING_MODE == "remote":
+        from app.rag.embedding_service import remote_embeddings
+        return remote_embeddings([text])[0]
     model = _get_model()
     if not model:
         raise RuntimeError("SentenceTransformer model not loaded")
-    return model.encode(text).tolist()
+    EMBEDDING_BATCH_SIZE.observe(1)
+    with EMBEDDING_SECONDS.time():
+        return model.encode(text).tolist()
 
 def get_embeddings(texts: list[str]) -> list[list[float]]:
     """Generate embeddings for a list of texts."""
+    if settings.EMBEDDING_MODE == "remote":
+        from app.rag.embedding_service import remote_embeddings
+        return remote_embeddings(texts)
+    return encode_local(texts)
+
+def encode_local(texts: list[str]) -> list[list[float]]:
+    """Embed texts with the in-process model, whatever EMBEDDING_MODE says."""
     model = _get_model()
     if not model:
         raise RuntimeError("SentenceTransformer model not loaded")
-    return model.encode(texts).tolist()
+    EMBEDDING_BATCH_SIZE.observe(len(texts))
+    with EMBEDDING_SECONDS.time():
+        return model.encode(texts).tolist()
@@ -0,0 +1,92 @@
+"""
+Token-indexed transcripts.
+
+Token counts are computed once per transcript entry (and per chunk, at
+chunking time) with prefix sums over them, so prompt builders can cut text
+to a token budget with a binary search instead of encoding and decoding the
+whole context on every request.
+
+Cuts fall on entry/chunk boundaries. Counts are per piece, so the total can
+differ from encoding the joined text by about a token per boundary.
+"""
+import bisect
+import itertools
+import tiktoken
+from dataclasses import dataclass
+
+# Same tokenizer the prompt builders budget with
+_encoding = tiktoken.get_encoding("cl100k_base")
+
+CHUNK_SEPARATOR = "\n\n"
+_SEPARATOR_TOKENS = len(_encoding.encode(CHUNK_SEPARATOR))
+
+
+def count_tokens_batch(texts: list[str]) -> list[int]:
+    """Token count of each text."""
+    return [len(tokens) for tokens in _encoding.encode_batch(texts, disallowed_special=())]
+
+
+@dataclass
+class TokenIndex:
+    """Transcript entry texts with prefix sums of their token counts."""
+    texts: list[str]
+    prefix: list[int]  # prefix[i] = tokens in texts[:i]
+
+    @classmethod
+    def build(cls, transcript: list[dict]) -> "TokenIndex":
+        texts = [entry.get("text", "") for entry in transcript]
+        return cls.from_counts(transcript, count_tokens_batch(texts))
+
+    @classmethod
+    def from_counts(cls, transcript: list[dict], counts: list[int]) -> "TokenIndex":
+        """Rebuild from cached per-entry counts."""
+        texts = [entry.get("text", "") for entry in transcript]
+        return cls(texts, list(itertools.accumulate(counts, initial=0)))
+
+    @property
+    def counts(self) -> list[int]:
+        return [b - a for a, b in zip(self.prefix, self.prefix[1:])]
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prefix[-1]
+
+    def text(self, start: int = 0, end: int | None = None) -> str:
+        """Entries [start, end) joined like `get_full_text`."""
+        return " ".join(self.texts[start:end])
+
+    def fit(self, max_tokens: int, start: int = 0) -> int:
+        """End index of the longest run of entries from `start` within `max_tokens`."""
+        return bisect.bisect_right(self.prefix, self.prefix[start] + max_tokens) - 1
+
+    def cut(self, max_tokens: int) -> str:
+        """The transcript truncated to `max_tokens` at an entry boundary."""
+        return self.text(0, self.fit(max_tokens))
+
+    def sections(self, section_tokens: int) -> list[str]:
+        """Consecutive sections of at most `section_tokens` each."""
+        sections = []
+        start = 0
+        while start < len(self.texts):
+            # An entry longer than a whole section still gets one of its own
+            end = max(self.fit(section_tokens, start), start + 1)
+            section = self.text(start, end).strip()
+            if section:
+                sections.append(section)
+            start = end
+        return sections
+
+
+def fit_chunks(chunks: list[dict], max_tokens: int) -> str:
+    """Join retrieved chunks in order, keeping as many as fit in `max_tokens`.
+
+    Uses the token count stored with each chunk at chunking time, counting
+    chunks from older indexes that don't have one.
+    """
+    missing = [chunk["text"] for chunk in chunks if "tokens" not in chunk]
+    missing_counts = iter(count_tokens_batch(missing) if missing else [])
+    counts = [chunk["tokens"] if "tokens" in chunk else next(missing_counts) for chunk in chunks]
+
+    prefix = list(itertools.accumulate((count + _SEPARATOR_TOKENS for count in counts), initial=0))
+    keep = bisect.bisect_right(prefix, max_tokens + _SEPARATOR_TOKENS) - 1
+    return CHUNK_SEPARATOR.join(chunk["text"] for chunk in chunks[:keep])
@@ -1,18 +1,99 @@
 import json
+import time
+import uuid
+import threading
 import faiss
 import numpy as np
 import redis
+import redis.asyncio
 from app.core.config import settings
+from collections import OrderedDict
+from app.core.metrics import (
+    CACHE_REQUESTS, FAISS_LOAD_SECONDS, FAISS_LOAD_BYTES, VECTOR_STORE_CACHE_BYTES, VECTOR_STORE_CACHE_REQUESTS
+)
 from app.rag.embeddings import get_embeddings, get_embedding
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
 # Synchronous Redis client for blocking Celery & FAISS ops
 _sync_redis = redis.from_url(settings.REDIS_URL, decode_responses=False)
 
+# Async bytes client and a bounded thread pool for the bot's event loop
+_async_redis = redis.asyncio.from_url(settings.REDIS_URL, decode_responses=False)
+_executor = ThreadPoolExecutor(max_workers=settings.VECTOR_STORE_EXECUTOR_WORKERS, thread_name_prefix="vector-store")
+
+async def _run_blocking(fn, *args):
+    """Run CPU-bound FAISS or embedding work off the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
 FAISS_TTL = 86400  # 24 hours expiry for embeddings to save RAM/Redis memory
 
+def embed_query(query: str) -> np.ndarray:
+    """L2-normalized float32 embedding of a query, shape (1, dimension)."""
+    query_embedding = np.array([get_embedding(query)]).astype("float32")
+    faiss.normalize_L2(query_embedding)
+    return query_embedding
+
+async def aembed_query(query: str) -> np.ndarray:
+    """`embed_query` on the vector store's thread pool."""
+    return await _run_blocking(embed_query, query)
+
+class VectorStoreCache:
+    """Process-local LRU of deserialised FAISS indexes, bounded by serialised size.
+    
+    Entries are keyed by video_id and the version stamp `add_chunks` writes
+    next to the index, so a single GET of the stamp tells whether the cached
+    copy is still current. Cached indexes are shared and must not be mutated.
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[str, faiss.Index, list[dict], int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, video_id: str, version: str | None) -> tuple[faiss.Index, list[dict]] | None:
+        """The cached index and metadata of a video, if cached at `version`."""
+        with self._lock:
+            entry = self._entries.get(video_id)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                # Rebuilt or expired in Redis since it was cached
+                self._remove(video_id)
+                return None
+            self._entries.move_to_end(video_id)
+            return entry[1], entry[2]
+    
+    def put(self, video_id: str, version: str, index: faiss.Index, metadata: list[dict], nbytes: int):
+        with self._lock:
+            self._remove(video_id)
+            if nbytes > self.max_bytes:
+                return
+            self._entries[video_id] = (version, index, metadata, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            VECTOR_STORE_CACHE_BYTES.set(self._bytes)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            VECTOR_STORE_CACHE_BYTES.set(0)
+    
+    def _remove(self, video_id: str):
+        entry = self._entries.pop(video_id, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+            VECTOR_STORE_CACHE_BYTES.set(self._bytes)
+
+
+vector_store_cache = VectorStoreCache(settings.VECTOR_STORE_CACHE_MAX_BYTES)
+
 class VectorStore:
     def __init__(self, video_id: str, dimension: int = 768):
         self.video_id = video_id
@@ -20,20 +101,42 @@ class VectorStore:
         self.dimension = 768
         self.index_key = f"faiss_index:{video_id}"
         self.meta_key = f"faiss_meta:{video_id}"
+        self.version_key = f"faiss_version:{video_id}"
         
         self._load()
     
     def _load(self):
-        """Load FAISS index and metadata from Redis."""
-        index_data = _sync_redis.get(self.index_key)
-        meta_data = _sync_redis.get(self.meta_key)
+        """Load FAISS index and metadata, from the process cache while still current."""
+        if self._load_cached(_sync_redis.get(self.version_key)):
+            return
+        # Read all three together so the version matches the index it stamps
+        self._load_data(*_sync_redis.mget(self.index_key, self.meta_key, self.version_key))
+    
+    def _load_cached(self, version: bytes | None) -> bool:
+        """Use the process cache's copy if it is at `version`. Returns whether it was."""
+        cached = vector_store_cache.get(self.video_id, version.decode()) if version else None
+        VECTOR_STORE_CACHE_REQUESTS.labels(result="hit" if cached else "miss").inc()
+        if cached:
+            self.index, self.metadata = cached
+        return cached is not None
+    
+    def _load_data(self, index_data: bytes | None, meta_data: bytes | None, version: bytes | None):
+        """Deserialize index and metadata read from Redis, caching them if versioned."""
+        CACHE_REQUESTS.labels(cache="faiss", result="hit" if index_data and meta_data else "miss").inc()
         
         if index_data and meta_data:
             try:
+                start = time.perf_counter()
                 # Deserialize from bytes to numpy array, then to FAISS index
                 index_np = np.frombuffer(index_data, dtype=np.uint8)
                 self.index = faiss.deserialize_index(index_np)
                 self.metadata = json.loads(meta_data.decode('utf-8'))
+                FAISS_LOAD_SECONDS.observe(time.perf_counter() - start)
+                FAISS_LOAD_BYTES.observe(len(index_data) + len(meta_data))
+                # Indexes written before version stamps can't be checked for staleness
+                if version:
+                    vector_store_cache.put(self.video_id, version.decode(), self.index, self.metadata,
+                                           len(index_data) + len(meta_data))
             except Exception as e:
                 logger.error(f"Failed to deserialize FAISS index from Redis: {e}")
                 self.index = faiss.IndexFlatIP(self.dimension)
@@ -57,8 +160,10 @@ class VectorStore:
         # L2 normalize for cosine similarity via inner product
         faiss.normalize_L2(embeddings)
         
+        # Copy before adding: the loaded index may be shared through the process cache
+        self.index = faiss.clone_index(self.index)
         self.index.add(embeddings)
-        self.metadata.extend(chunks)
+        self.metadata = self.metadata + chunks
         
         try:
             # Serialize the updated index to a numpy array, then to bytes
@@ -66,22 +171,30 @@ class VectorStore:
             index_bytes = index_np.tobytes()
             meta_bytes = json.dumps(self.metadata).encode('utf-8')
             
-            # Save into Redis with TTL using pipeline for atomicity
+            # Save into Redis with TTL using pipeline for atomicity; the new
+            # version stamp makes other processes drop their cached copies
+            version = uuid.uuid4().hex
             pipe = _sync_redis.pipeline()
             pipe.setex(self.index_key, FAISS_TTL, index_bytes)
             pipe.setex(self.meta_key, FAISS_TTL, meta_bytes)
+            pipe.setex(self.version_key, FAISS_TTL, version)
             pipe.execute()
+            vector_store_cache.put(self.video_id, version, self.index, self.metadata, len(index_bytes) + len(meta_bytes))
         except Exception as e:
             logger.error(f"Failed to serialize/save FAISS index to Redis: {e}")
 
-    def search(self, query: str, top_k: int = 3) -> list[dict]:
-        """Search for the top-k most similar chunks using cosine similarity."""
+    def search(self, query: str, top_k: int = 3, query_embedding: np.ndarray | None = None) -> list[dict]:
+        """Search for the top-k most similar chunks using cosine similarity.
+        
+        Pass `query_embedding` (from `embed_query`) to reuse an embedding
+        already computed for the query.
+        """
         if self.index.ntotal == 0:
             return []
             
-        query_embedding = np.array([get_embedding(query)]).astype("float32")
-        # L2 normalize the query vector too
-        faiss.normalize_L2(query_embedding)
+        if query_embedding is None:
+            query_embedding = embed_query(query)
+        query_embedding = query_embedding.reshape(1, -1)
         
         distances, indices = self.index.search(query_embedding, top_k)
         
@@ -90,3 +203,29 @@ class VectorStore:
             if i != -1 and i < len(self.metadata):
                 results.append(self.metadata[i])
         return results
+
+
+class AsyncVectorStore(VectorStore):
+    """VectorStore for the bot's event loop.
+    
+    Reads go through the async Redis client; deserialisation, embedding and
+    search run on a bounded thread pool, so a question never blocks other
+    updates. Open with `await AsyncVectorStore.open(video_id)`.
+    """
+    
+    def _load(self):
+        # Loaded asynchronously by `open`
+        self.index = faiss.IndexFlatIP(self.dimension)
+        self.metadata = []
+    
+    @classmethod
+    async def open(cls, video_id: str) -> "AsyncVectorStore":
+        store = cls(video_id)
+        if not store._load_cached(await _async_redis.get(store.version_key)):
+            data = await _async_redis.mget(store.index_key, store.meta_key, store.version_key)
+            await _run_blocking(store._load_data, *data)
+        return store
+    
+    async def asearch(self, query: str, top_k: int = 3, query_embedding: np.ndarray | None = None) -> list[dict]:
+        """`search` on the vector store's thread pool."""
+        return await _run_blocking(self.search, query, top_k, query_embedding)
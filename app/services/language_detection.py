@@ -0,0 +1,254 @@
+"""
+Local detection of "answer in <language>" requests.
+
+Resolves the target language of messages like "summarize in Hindi",
+"hindi mein batao" or "தமிழில் சொல்லுங்கள்" without an LLM call, using
+compiled matchers over the English, transliterated and native-script names
+of each supported language and the cues around them ("in X", "X mein",
+native locative forms such as "తెలుగులో").
+
+Each detection carries a confidence. Callers only fall back to the LLM
+below LOCAL_CONFIDENCE_THRESHOLD, i.e. for genuinely ambiguous requests
+such as "explain in hindi and tamil" or "say it in klingon". A language
+merely mentioned in a question ("what did he say about hindi cinema?") is
+confidently not a request.
+"""
+import re
+import unicodedata
+from dataclasses import dataclass
+
+LOCAL_CONFIDENCE_THRESHOLD = 0.8
+SHORT_MESSAGE_WORDS = 3  # "hindi please", "tamil?": a bare name is the whole request
+
+# language -> (Latin-script names and transliterations, native-script names,
+#              native forms that already mean "in <language>")
+LANGUAGE_NAMES: dict[str, tuple[list[str], list[str], list[str]]] = {
+    "english": (
+        ["english", "angrezi", "angreji"],
+        ["अंग्रेजी", "अंग्रेज़ी", "ஆங்கிலம்", "ఇంగ్లీష్", "ಇಂಗ್ಲಿಷ್", "ইংরেজি", "અંગ્રેજી", "ഇംഗ്ലീഷ്", "ਅੰਗਰੇਜ਼ੀ"],
+        ["अंग्रेजी में", "अंग्रेज़ी में", "ஆங்கிலத்தில்", "ఇంగ్లీష్లో", "ఇంగ్లీషులో", "ಇಂಗ್ಲಿಷ್ನಲ್ಲಿ",
+         "ইংরেজিতে", "અંગ્રેજીમાં", "ഇംഗ്ലീഷിൽ", "ਅੰਗਰੇਜ਼ੀ ਵਿੱਚ"],
+    ),
+    "hindi": (
+        ["hindi", "hindee"],
+        ["हिंदी", "हिन्दी"],
+        ["हिंदी में", "हिन्दी में", "हिंदी मे", "हिन्दी मे"],
+    ),
+    "marathi": (
+        ["marathi"],
+        ["मराठी"],
+        ["मराठीत", "मराठीमध्ये", "मराठी मध्ये", "मराठी में"],
+    ),
+    "tamil": (
+        ["tamil", "tamizh", "thamizh", "thamil"],
+        ["தமிழ்"],
+        ["தமிழில்", "தமிழ்ல"],
+    ),
+    "telugu": (
+        ["telugu", "telgu"],
+        ["తెలుగు"],
+        ["తెలుగులో"],
+    ),
+    "kannada": (
+        ["kannada"],
+        ["ಕನ್ನಡ"],
+        ["ಕನ್ನಡದಲ್ಲಿ", "ಕನ್ನಡದಲ್ಲ", "ಕನ್ನಡಲ್ಲಿ"],
+    ),
+    "bengali": (
+        ["bengali", "bangla", "bangali"],
+        ["বাংলা"],
+        ["বাংলায়", "বাংলাতে"],
+    ),
+    "gujarati": (
+        ["gujarati", "gujrati"],
+        ["ગુજરાતી"],
+        ["ગુજરાતીમાં", "ગુજરાતી માં"],
+    ),
+    "malayalam": (
+        ["malayalam"],
+        ["മലയാളം"],
+        ["മലയാളത്തിൽ", "മലയാളത്തില്"],
+    ),
+    "punjabi": (
+        ["punjabi", "panjabi"],
+        ["ਪੰਜਾਬੀ"],
+        ["ਪੰਜਾਬੀ ਵਿੱਚ", "ਪੰਜਾਬੀ ਵਿਚ", "ਪੰਜਾਬੀ 'ਚ", "ਪੰਜਾਬੀ ਚ"],
+    ),
+}
+
+# Unsupported languages still get a confident answer, so the user is told so
+OTHER_LANGUAGES = {
+    "french", "spanish", "german", "italian", "portuguese", "russian", "japanese", "chinese",
+    "mandarin", "korean", "arabic", "urdu", "persian", "turkish", "dutch", "indonesian",
+    "nepali", "odia", "oriya", "assamese", "sanskrit", "sinhala", "thai", "vietnamese",
+}
+
+# Words that follow "explain in ..." without naming a language
+NON_LANGUAGE_WORDS = {
+    "a", "an", "the", "my", "your", "this", "that", "it", "me", "us", "them", "him", "her",
+    "detail", "details", "depth", "short", "brief", "simple", "simpler", "plain", "layman",
+    "laymans", "bullet", "bullets", "points", "point", "steps", "step", "one", "two", "three",
+    "few", "more", "less", "full", "summary", "order", "context", "terms", "words", "lines",
+    "sentences", "paragraphs", "general", "particular", "english",
+}
+
+# Native postpositions / "language" words that turn a bare native name into a request
+_NATIVE_CUE_WORDS = {
+    "में", "मे", "मध्ये", "भाषा", "ভাষায়", "ভাষা", "மொழியில்", "மொழி", "భాషలో", "భాష",
+    "ಭಾಷೆಯಲ್ಲಿ", "ಭಾಷೆ", "ഭാഷയിൽ", "ഭാഷ", "ਭਾਸ਼ਾ", "ਵਿੱਚ", "ભાષામાં", "ભાષા", "માં",
+}
+
+_REQUEST_VERBS = (
+    r"summari[sz]e|explain|translate|answer|reply|respond|write|say|speak|talk|tell|give|"
+    r"switch|change|convert|batao|bataiye|samjhao|samjhaiye|bolo|likho"
+)
+
+# Unicode blocks of the scripts the supported languages are written in
+_SCRIPT_RANGES = [
+    ("devanagari", 0x0900, 0x097F), ("bengali", 0x0980, 0x09FF), ("gurmukhi", 0x0A00, 0x0A7F),
+    ("gujarati", 0x0A80, 0x0AFF), ("tamil", 0x0B80, 0x0BFF), ("telugu", 0x0C00, 0x0C7F),
+    ("kannada", 0x0C80, 0x0CFF), ("malayalam", 0x0D00, 0x0D7F),
+]
+LANGUAGE_SCRIPTS = {
+    "english": "latin", "hindi": "devanagari", "marathi": "devanagari", "bengali": "bengali",
+    "punjabi": "gurmukhi", "gujarati": "gujarati", "tamil": "tamil", "telugu": "telugu",
+    "kannada": "kannada", "malayalam": "malayalam",
+}
+
+
+def _normalize(text: str) -> str:
+    # Zero-width (non-)joiners vary between keyboards and don't change the word
+    return unicodedata.normalize("NFC", text).replace("\u200c", "").replace("\u200d", "")
+
+
+def _alternation(names: list[str]) -> str:
+    return "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True))
+
+
+_LATIN_NAMES = {name: lang for lang, (latin, _, _) in LANGUAGE_NAMES.items() for name in latin}
+_NATIVE_NAMES = {_normalize(name): lang for lang, (_, native, _) in LANGUAGE_NAMES.items() for name in native}
+_NATIVE_REQUESTS = {_normalize(name): lang for lang, (_, _, forms) in LANGUAGE_NAMES.items() for name in forms}
+
+_LATIN_RE = re.compile(rf"\b(?:{_alternation(list(_LATIN_NAMES))})\b", re.IGNORECASE)
+# Request forms first so "हिंदी में" wins over the bare "हिंदी"
+_NATIVE_RE = re.compile(_alternation(list(_NATIVE_REQUESTS)) + "|" + _alternation(list(_NATIVE_NAMES)))
+
+_QUALIFIER = r"(?:pure\s+|proper\s+|simple\s+|plain\s+)?"
+# "in hindi" / "translate it to hindi"; a bare "to" ("listen to hindi songs") isn't a cue
+_BEFORE_CUE_RE = re.compile(
+    rf"(?:\b(?:in|into)\s+|\b(?:{_REQUEST_VERBS})\b(?:\s+\w+){{0,3}}?\s+to\s+){_QUALIFIER}$", re.IGNORECASE
+)
+_TARGET_CUE_RE = re.compile(rf"\b(?:into|to)\s+{_QUALIFIER}$", re.IGNORECASE)
+# "hindi mein", "tamil la", "telugu lo", "gujarati ma", "tamil please", "hindi में"
+_AFTER_CUE_RE = re.compile(
+    r"^\s*(?:(?:me|mein|mai|main|mei|mey|la|lo|ma|madhe|madhye|vich|language|version|translation|"
+    r"please|pls|plz)\b|(?:में|मे)(?!\S))",
+    re.IGNORECASE,
+)
+_SOURCE_CUE_RE = re.compile(r"\bfrom\s+$", re.IGNORECASE)
+# "say it in klingon": an unknown word that ends the request where a language
+# would. "to" only counts after "translate" ("explain how to train a model")
+_UNKNOWN_TARGET_RE = re.compile(
+    rf"(?:\b(?:{_REQUEST_VERBS})\b(?:\s+\w+){{0,3}}?\s+(?:in|into)|\btranslate\b(?:\s+\w+){{0,3}}?\s+to)"
+    r"\s+([a-z]+)(?:\s+(?:please|pls|plz))?\W*$",
+    re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class LanguageDetection:
+    """A detected target language (None: not a language request) and how sure we are."""
+    language: str | None
+    confidence: float
+    reason: str
+
+    @property
+    def confident(self) -> bool:
+        return self.confidence >= LOCAL_CONFIDENCE_THRESHOLD
+
+
+def dominant_script(text: str) -> str | None:
+    """The script most letters of `text` are written in ("latin", "tamil", ...)."""
+    counts: dict[str, int] = {}
+    for char in text:
+        if not char.isalpha():
+            continue
+        code = ord(char)
+        script = "latin" if code < 0x0250 else next(
+            (name for name, low, high in _SCRIPT_RANGES if low <= code <= high), "other"
+        )
+        counts[script] = counts.get(script, 0) + 1
+    return max(counts, key=counts.get) if counts else None
+
+
+def _mentions(text: str) -> list[tuple[str, str, int, int]]:
+    """(language, kind, start, end) for each language name; kind is "request" or "name"."""
+    found = []
+    for match in _LATIN_RE.finditer(text):
+        found.append((_LATIN_NAMES[match.group().lower()], "name", match.start(), match.end()))
+    for match in _NATIVE_RE.finditer(text):
+        if match.group() in _NATIVE_REQUESTS:
+            found.append((_NATIVE_REQUESTS[match.group()], "request", match.start(), match.end()))
+        else:
+            found.append((_NATIVE_NAMES[match.group()], "name", match.start(), match.end()))
+    return found
+
+
+def _has_cue(text: str, start: int, end: int) -> bool:
+    if _BEFORE_CUE_RE.search(text[:start]) or _AFTER_CUE_RE.match(text[end:]):
+        return True
+    following = text[end:].split(maxsplit=1)
+    return bool(following) and following[0].strip("?.!,") in _NATIVE_CUE_WORDS
+
+
+def detect_language_locally(text: str) -> LanguageDetection:
+    """Detect a request for content in a specific language, without an LLM.
+
+    The returned language is the English name ("Hindi"), and may be a
+    language the bot doesn't support ("French") so the user can be told.
+    """
+    text = _normalize(text).strip()
+    script = dominant_script(text)
+    mentions = _mentions(text)
+
+    cued: dict[str, tuple[float, bool]] = {}  # language -> (confidence, is a "to/into" target)
+    bare = set()
+    for language, kind, start, end in mentions:
+        if kind == "request" or _has_cue(text, start, end):
+            # Asking for the language the message is written in is the clearest case
+            confidence = 0.98 if LANGUAGE_SCRIPTS[language] == script else 0.95
+            target = bool(_TARGET_CUE_RE.search(text[:start]))
+            best = cued.get(language, (0.0, False))
+            cued[language] = (max(confidence, best[0]), target or best[1])
+        elif not _SOURCE_CUE_RE.search(text[:start]):
+            bare.add(language)
+
+    if len(cued) == 1:
+        language, (confidence, _) = next(iter(cued.items()))
+        if bare - cued.keys():
+            # "explain in hindi and tamil"
+            return LanguageDetection(None, 0.6, "other languages mentioned")
+        return LanguageDetection(language.title(), confidence, "cue")
+    if len(cued) > 1:
+        # "translate from hindi to tamil": the target is the one after to/into
+        targets = [language for language, (_, target) in cued.items() if target]
+        if len(targets) == 1:
+            return LanguageDetection(targets[0].title(), 0.85, "target cue")
+        return LanguageDetection(None, 0.4, "several languages")
+
+    unknown = _UNKNOWN_TARGET_RE.search(text)
+    if unknown:
+        word = unknown.group(1).lower()
+        if word in OTHER_LANGUAGES:
+            return LanguageDetection(word.title(), 0.9, "unsupported language")
+        if word not in NON_LANGUAGE_WORDS and word not in _LATIN_NAMES:
+            return LanguageDetection(None, 0.5, f"unknown target language: {word}")
+
+    if bare:
+        if len(bare) == 1 and len(_WORD_RE.findall(text)) <= SHORT_MESSAGE_WORDS:
+            return LanguageDetection(next(iter(bare)).title(), 0.85, "bare name")
+        # "what did he say about hindi cinema?" is a question, not a request
+        return LanguageDetection(None, 0.9, "language mentioned without a cue")
+
+    return LanguageDetection(None, 1.0, "no language mentioned")
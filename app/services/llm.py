@@ -1,6 +1,20 @@
+import asyncio
+import hashlib
+import logging
 import tiktoken
 from langchain_core.prompts import PromptTemplate
-from app.core.llm_client import invoke_with_retry
+from typing import AsyncIterator
+from app.core.config import settings
+from app.core.llm_client import invoke_with_retry, stream_with_retry, scheduler
+from app.core.llm_scheduler import LANE_BACKGROUND, LANE_INTERACTIVE, EXPECTED_COMPLETION_TOKENS, count_tokens
+from app.db.redis_client import (
+    cache_section_summaries, get_cached_section_summaries,
+    cache_actionpoints, get_cached_actionpoints
+)
+from app.rag.token_index import TokenIndex, fit_chunks
+from app.rag.vector_store import AsyncVectorStore
+
+logger = logging.getLogger(__name__)
 
 # Tokenizer for accurate token counting
 _encoding = tiktoken.get_encoding("cl100k_base")
@@ -20,6 +34,20 @@ def _truncate_to_tokens(text: str, max_tokens: int = MAX_TRANSCRIPT_TOKENS) -> s
         return truncated[:last_period + 1]
     return truncated
 
+def _fit_context(context: str | list[dict], max_tokens: int) -> str:
+    """Cut retrieved context to budget.
+    
+    Chunk lists (as returned by `VectorStore.search`) are cut with their
+    precomputed token counts; plain text is re-encoded.
+    """
+    if isinstance(context, str):
+        return _truncate_to_tokens(context, max_tokens=max_tokens)
+    fitted = fit_chunks(context, max_tokens)
+    if not fitted and context:
+        # Even the best chunk alone is over budget
+        return _truncate_to_tokens(context[0]["text"], max_tokens=max_tokens)
+    return fitted
+
 # ── Summary Prompt ─────────────────────────────────────────────────────────
 
 SUMMARY_PROMPT = PromptTemplate(
@@ -57,6 +85,22 @@ Generate the response strictly in the following structure:
 """
 )
 
+# ── Section Summary Prompt (map step for long transcripts) ─────────────────
+
+SECTION_SUMMARY_PROMPT = PromptTemplate(
+    input_variables=["title", "section", "part", "total"],
+    template="""You are summarising part {part} of {total} of a long YouTube video transcript.
+
+Video Title: {title}
+
+Transcript section:
+{section}
+
+Write a dense summary of this section in at most 250 words. Keep every key point, name, number, claim and recommendation, in the order they come up. Do not add an introduction or anything that is not in the section.
+
+Section summary:"""
+)
+
 # ── Q&A Prompt (with conversation history support) ─────────────────────────
 
 QA_PROMPT = PromptTemplate(
@@ -145,18 +189,188 @@ If no actionable items can be extracted, respond with "No clear action points fo
 Action Points:"""
 )
 
+# ── Map-Reduce Summarisation ───────────────────────────────────────────────
+# Transcripts over MAX_TRANSCRIPT_TOKENS are split into sections that are
+# summarised in parallel (map); the partial summaries then stand in for the
+# transcript in SUMMARY_PROMPT (reduce). Partials are cached per video and
+# section, so re-summarising a video only pays for the reduce step.
+#
+# Map calls draw on the background lane of the Groq budget, which refills at
+# GROQ_TPM_LIMIT per minute however the work is split. A map phase the budget
+# can't finish within SUMMARY_MAP_TIMEOUT is skipped (or cut short) and the
+# summary falls back to truncation; finished partials are still cached, so a
+# later request picks up where this one stopped.
+
+SECTION_TOKENS = 6000     # transcript tokens per map call, fits one call in the 12k TPM budget
+MAP_CONCURRENCY = 3       # parallel map calls at most; fewer when the budget can't pay for them at once
+MAX_REDUCE_LEVELS = 3     # map passes before falling back to truncation
+
+def _count_tokens(text: str) -> int:
+    return len(_encoding.encode(text))
+
+def _split_into_sections(text: str, section_tokens: int = SECTION_TOKENS) -> list[str]:
+    """Split text into sections of at most `section_tokens`, preferring sentence ends."""
+    tokens = _encoding.encode(text)
+    sections = []
+    start = 0
+    while start < len(tokens):
+        end = min(start + section_tokens, len(tokens))
+        if end < len(tokens):
+            # Back up to a sentence end within the last 20% of the section
+            for j in range(end - 1, start + int(section_tokens * 0.8), -1):
+                if _encoding.decode([tokens[j]]).rstrip().endswith((".", "?", "!")):
+                    end = j + 1
+                    break
+        sections.append(_encoding.decode(tokens[start:end]).strip())
+        start = end
+    return [section for section in sections if section]
+
+def _section_key(section: str) -> str:
+    return hashlib.sha1(section.encode("utf-8")).hexdigest()[:16]
+
+def _map_concurrency() -> int:
+    """Map calls the background lane can pay for at once, up to MAP_CONCURRENCY."""
+    if not scheduler.enabled:
+        return MAP_CONCURRENCY
+    call_cost = SECTION_TOKENS + EXPECTED_COMPLETION_TOKENS
+    return max(1, min(MAP_CONCURRENCY, int(scheduler.lane_capacity(LANE_BACKGROUND) // call_cost)))
+
+async def _summarize_sections(sections: list[str], video_title: str, video_id: str | None,
+                              deadline: float) -> list[str] | None:
+    """Summarise sections in parallel, reusing cached partials for this video.
+    
+    Returns None if the Groq budget can't map every section before `deadline`
+    (loop time). Sections that did finish are cached either way.
+    """
+    keys = [_section_key(section) for section in sections]
+    cached = [None] * len(sections)
+    if video_id:
+        try:
+            cached = await get_cached_section_summaries(video_id, keys)
+        except Exception as e:
+            logger.warning(f"Failed to read cached section summaries for {video_id}: {e}")
+
+    prompts = {
+        i: SECTION_SUMMARY_PROMPT.format(title=video_title, section=sections[i], part=i + 1, total=len(sections))
+        for i in range(len(sections)) if not cached[i]
+    }
+    loop = asyncio.get_running_loop()
+    cost = sum(count_tokens(prompt) + EXPECTED_COMPLETION_TOKENS for prompt in prompts.values())
+    needed = scheduler.min_seconds(cost, len(prompts), LANE_BACKGROUND)
+    if needed > deadline - loop.time():
+        logger.info(f"Mapping {len(prompts)} sections needs at least {needed:.0f}s of Groq budget, truncating instead")
+        return None
+
+    semaphore = asyncio.Semaphore(_map_concurrency())
+
+    async def summarize(prompt: str) -> str:
+        async with semaphore:
+            # Cached per section below, so skip the generic response cache
+            return await invoke_with_retry(prompt, use_cache=False, lane=LANE_BACKGROUND,
+                                           prompt_type="section_summary")
+
+    tasks = {i: asyncio.create_task(summarize(prompt)) for i, prompt in prompts.items()}
+    done, pending = set(), set()
+    if tasks:
+        done, pending = await asyncio.wait(
+            tasks.values(), timeout=max(0.0, deadline - loop.time()), return_when=asyncio.FIRST_EXCEPTION
+        )
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    failed = next((task for task in done if task.exception()), None)
+    fresh = {keys[i]: task.result() for i, task in tasks.items() if task in done and not task.exception()}
+    logger.info(f"Summarised {len(fresh)} of {len(sections)} transcript sections "
+                f"({len(sections) - len(prompts)} cached, {len(prompts) - len(fresh)} unfinished)")
+    if video_id and fresh:
+        try:
+            await cache_section_summaries(video_id, fresh)
+        except Exception as e:
+            logger.warning(f"Failed to cache section summaries for {video_id}: {e}")
+    if failed:
+        raise failed.exception()
+    if pending:
+        logger.warning(f"Section map ran past {settings.SUMMARY_MAP_TIMEOUT:.0f}s, truncating instead")
+        return None
+    return [cached[i] or tasks[i].result() for i in range(len(sections))]
+
+async def condense_transcript(transcript_text: str, video_title: str = "Unknown Title", video_id: str | None = None,
+                              token_index: TokenIndex | None = None) -> str:
+    """Fit a transcript into the summary budget.
+    
+    Transcripts within MAX_TRANSCRIPT_TOKENS are returned unchanged. Longer
+    ones are replaced by their section summaries, repeatedly if those still
+    don't fit. With a `token_index` of the transcript, the first pass sizes
+    and splits it without encoding. When the map phase can't finish within
+    SUMMARY_MAP_TIMEOUT, the text so far is returned for truncation.
+    """
+    deadline = asyncio.get_running_loop().time() + settings.SUMMARY_MAP_TIMEOUT
+    text = transcript_text
+    for level in range(MAX_REDUCE_LEVELS):
+        if token_index is not None and level == 0:
+            if token_index.total_tokens <= MAX_TRANSCRIPT_TOKENS:
+                break
+            sections = token_index.sections(SECTION_TOKENS)
+        elif _count_tokens(text) <= MAX_TRANSCRIPT_TOKENS:
+            break
+        else:
+            sections = _split_into_sections(text)
+        partials = await _summarize_sections(sections, video_title, video_id, deadline)
+        if partials is None:
+            break
+        text = "\n\n".join(
+            f"[Part {i + 1}/{len(partials)}]\n{partial}" for i, partial in enumerate(partials)
+        )
+    return text
+
 # ── Functions ──────────────────────────────────────────────────────────────
 
-async def generate_summary(transcript_text: str, video_title: str = "Unknown Title", timestamp_sections: str = "") -> str:
-    """Generate structured summary using token-aware truncation and real timestamps."""
-    truncated = _truncate_to_tokens(transcript_text, max_tokens=MAX_TRANSCRIPT_TOKENS)
+def _build_summary_prompt(transcript_text: str, video_title: str, timestamp_sections: str,
+                          token_index: TokenIndex | None = None) -> str:
+    if token_index is not None:
+        truncated = token_index.cut(MAX_TRANSCRIPT_TOKENS)
+    else:
+        truncated = _truncate_to_tokens(transcript_text, max_tokens=MAX_TRANSCRIPT_TOKENS)
     if not timestamp_sections:
         timestamp_sections = "(No timestamp data available — infer from transcript flow)"
-    prompt = SUMMARY_PROMPT.format(title=video_title, transcript=truncated, timestamp_sections=timestamp_sections)
-    return await invoke_with_retry(prompt)
-
-async def answer_question(context: str, question: str, history: list[dict] | None = None) -> str:
-    """Answer a question with conversation history for context-aware follow-ups."""
+    return SUMMARY_PROMPT.format(title=video_title, transcript=truncated, timestamp_sections=timestamp_sections)
+
+async def _prepare_summary_prompt(transcript_text: str, video_title: str, timestamp_sections: str,
+                                  video_id: str | None, hierarchical: bool, token_index: TokenIndex | None) -> str:
+    if hierarchical:
+        condensed = await condense_transcript(transcript_text, video_title, video_id, token_index)
+        if condensed != transcript_text:
+            # The index describes the transcript, not its section summaries
+            transcript_text, token_index = condensed, None
+    return _build_summary_prompt(transcript_text, video_title, timestamp_sections, token_index)
+
+async def generate_summary(transcript_text: str, video_title: str = "Unknown Title", timestamp_sections: str = "",
+                           video_id: str | None = None, hierarchical: bool = True,
+                           token_index: TokenIndex | None = None) -> str:
+    """Generate structured summary with real timestamps.
+    
+    Long transcripts are condensed with map-reduce summarisation (section
+    partials cached under `video_id`), or truncated to the token budget when
+    `hierarchical` is False. Pass the transcript's `token_index` to budget
+    without re-encoding it.
+    """
+    prompt = await _prepare_summary_prompt(
+        transcript_text, video_title, timestamp_sections, video_id, hierarchical, token_index
+    )
+    return await invoke_with_retry(prompt, lane=LANE_BACKGROUND, prompt_type="summary")
+
+async def stream_summary(transcript_text: str, video_title: str = "Unknown Title", timestamp_sections: str = "",
+                         video_id: str | None = None, hierarchical: bool = True,
+                         token_index: TokenIndex | None = None) -> AsyncIterator[str]:
+    """Streaming variant of generate_summary."""
+    prompt = await _prepare_summary_prompt(
+        transcript_text, video_title, timestamp_sections, video_id, hierarchical, token_index
+    )
+    async for delta in stream_with_retry(prompt, lane=LANE_BACKGROUND, prompt_type="summary"):
+        yield delta
+
+def _build_qa_prompt(context: str | list[dict], question: str, history: list[dict] | None = None) -> str:
     history_text = ""
     if history:
         for entry in history:
@@ -164,18 +378,61 @@ async def answer_question(context: str, question: str, history: list[dict] | Non
     if not history_text:
         history_text = "(No previous conversation)"
     
-    context = _truncate_to_tokens(context, max_tokens=6000)
-    prompt = QA_PROMPT.format(context=context, question=question, history=history_text)
-    return await invoke_with_retry(prompt)
+    context = _fit_context(context, max_tokens=6000)
+    return QA_PROMPT.format(context=context, question=question, history=history_text)
+
+async def answer_question(context: str | list[dict], question: str, history: list[dict] | None = None) -> str:
+    """Answer a question with conversation history for context-aware follow-ups."""
+    return await invoke_with_retry(_build_qa_prompt(context, question, history), prompt_type="qa")
+
+def stream_answer_question(context: str | list[dict], question: str, history: list[dict] | None = None) -> AsyncIterator[str]:
+    """Streaming variant of answer_question, yields the answer as it is generated."""
+    return stream_with_retry(_build_qa_prompt(context, question, history), prompt_type="qa")
 
-async def generate_deepdive(context: str, topic: str) -> str:
+def _build_deepdive_prompt(context: str | list[dict], topic: str) -> str:
+    context = _fit_context(context, max_tokens=7000)
+    return DEEPDIVE_PROMPT.format(context=context, topic=topic)
+
+async def generate_deepdive(context: str | list[dict], topic: str) -> str:
     """Generate a deep-dive analysis on a specific topic from the video."""
-    context = _truncate_to_tokens(context, max_tokens=7000)
-    prompt = DEEPDIVE_PROMPT.format(context=context, topic=topic)
-    return await invoke_with_retry(prompt)
+    return await invoke_with_retry(_build_deepdive_prompt(context, topic), prompt_type="deepdive")
+
+def stream_deepdive(context: str | list[dict], topic: str) -> AsyncIterator[str]:
+    """Streaming variant of generate_deepdive."""
+    return stream_with_retry(_build_deepdive_prompt(context, topic), prompt_type="deepdive")
 
-async def generate_actionpoints(context: str) -> str:
+async def generate_actionpoints(context: str | list[dict], lane: str = LANE_INTERACTIVE) -> str:
     """Extract actionable items from the video transcript."""
-    context = _truncate_to_tokens(context, max_tokens=7000)
+    context = _fit_context(context, max_tokens=7000)
     prompt = ACTIONPOINTS_PROMPT.format(context=context)
-    return await invoke_with_retry(prompt)
+    return await invoke_with_retry(prompt, lane=lane, prompt_type="actionpoints")
+
+# Broad query that retrieves representative chunks for action points
+ACTIONPOINTS_QUERY = "main topics actions recommendations steps"
+ACTIONPOINTS_TOP_K = 10
+
+async def get_actionpoints(video_id: str, lane: str = LANE_INTERACTIVE) -> str | None:
+    """A video's action points, from the cache or generated and cached.
+    
+    The query and prompt are fixed, so every user of a video gets the same
+    result. Returns None if the video has no FAISS index.
+    """
+    try:
+        cached = await get_cached_actionpoints(video_id)
+    except Exception as e:
+        logger.warning(f"Failed to read cached action points for {video_id}: {e}")
+        cached = None
+    if cached:
+        return cached
+    
+    store = await AsyncVectorStore.open(video_id)
+    results = await store.asearch(ACTIONPOINTS_QUERY, top_k=ACTIONPOINTS_TOP_K)
+    if not results:
+        return None
+    
+    actionpoints = await generate_actionpoints(results, lane=lane)
+    try:
+        await cache_actionpoints(video_id, actionpoints)
+    except Exception as e:
+        logger.warning(f"Failed to cache action points for {video_id}: {e}")
+    return actionpoints
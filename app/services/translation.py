@@ -1,6 +1,18 @@
+import json
+import asyncio
+import hashlib
 import logging
+from collections import OrderedDict
 from langchain_core.prompts import PromptTemplate
+from app.core.config import settings
+from app.core.metrics import TRANSLATION_CACHE_REQUESTS, LANGUAGE_DETECTIONS
 from app.core.llm_client import invoke_with_retry
+from app.core.llm_scheduler import LANE_BACKGROUND
+from app.db.redis_client import (
+    get_bounded_cache_many, set_bounded_cache_many,
+    cache_translated_summary, get_cached_translated_summary
+)
+from app.services.language_detection import detect_language_locally
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +28,17 @@ Text:
 Translation:"""
 )
 
+BATCH_TRANSLATION_PROMPT = PromptTemplate(
+    input_variables=["items", "target_language"],
+    template="""You are a professional translator. Translate every value of the following JSON object into {target_language}.
+Maintain the original formatting of each value perfectly, including emojis, markdown, bullet points, checkboxes and line breaks.
+Keep the keys unchanged. Output ONLY a JSON object with the same keys and the translated values, nothing else.
+
+{items}
+
+Translated JSON:"""
+)
+
 LANGUAGE_DETECTION_PROMPT = PromptTemplate(
     input_variables=["text"],
     template="""Analyze the following user message. If the user is requesting content in a specific language (e.g., "Summarize in Hindi", "Explain in Tamil", "हिंदी में बताओ"), extract the target language name in English.
@@ -41,69 +64,279 @@ def get_supported_languages_str() -> str:
     """Return a formatted string of supported languages."""
     return ", ".join(lang.title() for lang in sorted(SUPPORTED_LANGUAGES))
 
-# ── Boilerplate Cache ──────────────────────────────────────────────────────
-# Cache translated versions of common bot messages to avoid repeated LLM calls
-_boilerplate_cache: dict[tuple[str, str], str] = {}
-
-_BOILERPLATE_STRINGS = {
-    "Thinking...",
-    "Processing video {video_id}... This may take a moment. You will be notified when the summary is ready.",
-    "Please send a YouTube video link first before asking questions.",
-    "Video data unavailable. Please process the video again.",
-    "Invalid YouTube URL. Please make sure it's a valid link.",
-    "Error: Process timed out or failed.",
-}
+# ── Translation Cache ──────────────────────────────────────────────────────
+# Two tiers keyed by a hash of the target language and exact text: a small
+# per-process LRU in front of a size-bounded Redis cache shared by every bot
+# process and worker. Covers UI strings, summaries and answers alike.
+
+TRANSLATION_CACHE_NAMESPACE = "translation_cache"
+
+
+def _translation_key(text: str, language: str) -> str:
+    return hashlib.sha256(f"{language}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Per-process LRU in front of the shared Redis translation cache."""
+    
+    def __init__(self, local_size: int = settings.TRANSLATION_LOCAL_CACHE_SIZE):
+        self.local_size = local_size
+        self._local: OrderedDict[str, str] = OrderedDict()
+    
+    def _remember(self, key: str, translation: str):
+        self._local[key] = translation
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+    
+    def clear_local(self):
+        self._local.clear()
+    
+    def get_local(self, text: str, language: str) -> str | None:
+        """In-process lookup only, for callers that can skip waiting on Redis."""
+        key = _translation_key(text, language.lower())
+        translation = self._local.get(key)
+        if translation is not None:
+            self._local.move_to_end(key)
+            TRANSLATION_CACHE_REQUESTS.labels(result="local_hit").inc()
+        return translation
+    
+    async def get_many(self, texts: list[str], language: str) -> dict[str, str]:
+        """Cached translations of the given texts, checking Redis in one round trip."""
+        language = language.lower()
+        found: dict[str, str] = {}
+        remote: dict[str, str] = {}
+        for text in texts:
+            translation = self.get_local(text, language)
+            if translation is not None:
+                found[text] = translation
+            else:
+                remote[text] = _translation_key(text, language)
+        
+        values = [None] * len(remote)
+        if remote and settings.TRANSLATION_CACHE_TTL > 0:
+            try:
+                values = await get_bounded_cache_many(
+                    TRANSLATION_CACHE_NAMESPACE, list(remote.values()), ttl=settings.TRANSLATION_CACHE_TTL,
+                )
+            except Exception as e:
+                logger.warning(f"Translation cache read failed: {e}")
+        for (text, key), translation in zip(remote.items(), values):
+            if translation is not None:
+                found[text] = translation
+                self._remember(key, translation)
+                TRANSLATION_CACHE_REQUESTS.labels(result="redis_hit").inc()
+            else:
+                TRANSLATION_CACHE_REQUESTS.labels(result="miss").inc()
+        return found
+    
+    async def set_many(self, translations: dict[str, str], language: str):
+        language = language.lower()
+        items = {_translation_key(text, language): translation for text, translation in translations.items()}
+        for key, translation in items.items():
+            self._remember(key, translation)
+        if not items or settings.TRANSLATION_CACHE_TTL <= 0:
+            return
+        try:
+            await set_bounded_cache_many(
+                TRANSLATION_CACHE_NAMESPACE, items,
+                ttl=settings.TRANSLATION_CACHE_TTL, max_entries=settings.TRANSLATION_CACHE_MAX_ENTRIES,
+            )
+        except Exception as e:
+            logger.warning(f"Translation cache write failed: {e}")
+
+
+translation_cache = TranslationCache()
+
+
+# ── Batch Translation ─────────────────────────────────────────────────────
+# Several strings for the same language are translated in one LLM call.
+# They travel as a JSON object, so quotes, newlines or anything that looks
+# like a separator inside the strings can't break the split.
+
+BATCH_WINDOW = 0.02         # seconds translate_text waits for other strings to batch with
+MAX_BATCH_SIZE = 20         # strings per LLM call
+MAX_BATCHED_CHARS = 1000    # longer texts (summaries, answers) are translated on their own
+
+
+def _parse_batch_response(response: str, count: int) -> list[str] | None:
+    """Translations in input order, or None if the response is malformed."""
+    text = response.strip()
+    # Tolerate a markdown code fence around the JSON
+    if text.startswith("```"):
+        text = text.split("\n", 1)[-1].rsplit("```", 1)[0]
+    try:
+        data = json.loads(text[text.find("{"):text.rfind("}") + 1])
+        return [str(data[str(i)]) for i in range(1, count + 1)]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+async def _translate_one(text: str, target_language: str) -> str:
+    prompt = TRANSLATION_PROMPT.format(text=text, target_language=target_language)
+    # Cached by translate_batch already, not in the LLM response cache too
+    return await invoke_with_retry(prompt, use_cache=False, lane=LANE_BACKGROUND, prompt_type="translation")
+
+
+async def _translate_many(texts: list[str], target_language: str) -> list[str]:
+    """Translate distinct strings, in one call when there is more than one."""
+    if len(texts) == 1:
+        return [await _translate_one(texts[0], target_language)]
+    
+    items = json.dumps({str(i): text for i, text in enumerate(texts, 1)}, ensure_ascii=False, indent=1)
+    prompt = BATCH_TRANSLATION_PROMPT.format(items=items, target_language=target_language)
+    response = await invoke_with_retry(prompt, use_cache=False, lane=LANE_BACKGROUND, prompt_type="translation_batch")
+    translated = _parse_batch_response(response, len(texts))
+    if translated is not None:
+        return translated
+    
+    logger.warning(f"Malformed batch translation of {len(texts)} strings, translating one by one")
+    return list(await asyncio.gather(*(_translate_one(text, target_language) for text in texts)))
+
+
+async def translate_batch(texts: list[str], target_language: str) -> list[str]:
+    """Translate many strings into one language with as few LLM calls as possible.
+    
+    Cached translations are reused; new ones are added to the cache.
+    """
+    if not target_language or target_language.lower() == "english":
+        return list(texts)
+    
+    distinct = list(dict.fromkeys(texts))
+    results = await translation_cache.get_many(distinct, target_language)
+    pending = []
+    for text in distinct:
+        if text in results:
+            continue
+        if len(text) > MAX_BATCHED_CHARS:
+            pending.append([text])
+        elif pending and len(pending[-1]) < MAX_BATCH_SIZE and len(pending[-1][0]) <= MAX_BATCHED_CHARS:
+            pending[-1].append(text)
+        else:
+            pending.append([text])
+    
+    batches = await asyncio.gather(*(_translate_many(batch, target_language) for batch in pending))
+    fresh = {text: result for batch, translated in zip(pending, batches) for text, result in zip(batch, translated)}
+    await translation_cache.set_many(fresh, target_language)
+    results.update(fresh)
+    
+    return [results[text] for text in texts]
+
+
+class _TranslationBatcher:
+    """Coalesces concurrent translate_text calls per language into batch calls."""
+    
+    def __init__(self, window: float = BATCH_WINDOW):
+        self.window = window
+        self._pending: dict[str, list[tuple[str, asyncio.Future]]] = {}
+        # Strong references to flush timers and batch calls so they aren't garbage collected
+        self._tasks: set[asyncio.Task] = set()
+    
+    async def translate(self, text: str, target_language: str) -> str:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._pending.setdefault(target_language, [])
+        queue.append((text, future))
+        if len(queue) == 1:
+            self._spawn(self._flush_later(target_language, queue))
+        elif len(queue) >= MAX_BATCH_SIZE:
+            self._flush(target_language, queue)
+        return await future
+    
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _flush_later(self, target_language: str, queue: list):
+        await asyncio.sleep(self.window)
+        self._flush(target_language, queue)
+    
+    def _flush(self, target_language: str, queue: list):
+        # A timer outliving an early flush must not cut the next queue's window short
+        if self._pending.get(target_language) is not queue:
+            return
+        del self._pending[target_language]
+        self._spawn(self._run(target_language, queue))
+    
+    @staticmethod
+    async def _run(target_language: str, queue: list[tuple[str, asyncio.Future]]):
+        try:
+            translated = await translate_batch([text for text, _ in queue], target_language)
+        except Exception as e:
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(queue, translated):
+            if not future.done():
+                future.set_result(result)
+
 
-def _is_boilerplate(text: str) -> bool:
-    """Check if text matches a known boilerplate pattern."""
-    for bp in _BOILERPLATE_STRINGS:
-        if bp.startswith(text[:20]) or text.startswith(bp[:20]):
-            return True
-    return False
+_batcher = _TranslationBatcher()
 
 
 async def translate_text(text: str, target_language: str) -> str:
-    """Translate text to target language with boilerplate caching."""
+    """Translate text to target language through the translation cache.
+    
+    Short strings requested concurrently for the same language are looked
+    up and translated together, in one Redis round trip and one LLM call.
+    """
     if not target_language or target_language.lower() == "english":
         return text
     
-    # Check boilerplate cache first
-    cache_key = (text, target_language.lower())
-    if cache_key in _boilerplate_cache:
-        return _boilerplate_cache[cache_key]
-        
-    prompt = TRANSLATION_PROMPT.format(text=text, target_language=target_language)
-    result = await invoke_with_retry(prompt)
+    # Recently used translations skip the batching window entirely
+    cached = translation_cache.get_local(text, target_language)
+    if cached is not None:
+        return cached
     
-    # Cache boilerplate translations for reuse
-    if _is_boilerplate(text):
-        _boilerplate_cache[cache_key] = result
+    if len(text) > MAX_BATCHED_CHARS:
+        return (await translate_batch([text], target_language))[0]
     
-    return result
+    return await _batcher.translate(text, target_language)
+
+
+async def get_translated_summary(video_id: str, summary: str, target_language: str) -> str:
+    """A video's summary in the target language, translated once per video and language.
+    
+    Translations are cached next to the summary and dropped when it is
+    regenerated. The cache fails open: Redis errors only cost a translation.
+    """
+    if not target_language or target_language.lower() == "english":
+        return summary
+    
+    try:
+        cached = await get_cached_translated_summary(video_id, target_language)
+    except Exception as e:
+        logger.warning(f"Translated summary cache read failed for {video_id}: {e}")
+        cached = None
+    if cached:
+        return cached
+    
+    translated = await translate_text(summary, target_language)
+    try:
+        await cache_translated_summary(video_id, target_language, translated)
+    except Exception as e:
+        logger.warning(f"Translated summary cache write failed for {video_id}: {e}")
+    return translated
 
 
 async def detect_language_request(text: str) -> str | None:
     """
     Detect if a user message is requesting content in a specific language.
     Returns the language name (e.g., 'Hindi') or None if not a language request.
+    
+    Resolved locally from language names and cues; the LLM is only asked
+    when the local detector isn't confident (e.g. "explain in hindi and tamil").
     """
-    # Quick heuristic check before spending an LLM call
-    language_keywords = [
-        "in hindi", "in tamil", "in telugu", "in kannada", "in marathi",
-        "in bengali", "in gujarati", "in malayalam", "in punjabi",
-        "hindi me", "hindi mein", "हिंदी", "தமிழ்", "తెలుగు", "ಕನ್ನಡ",
-        "summarize in", "explain in", "translate to", "translate in",
-    ]
-    
-    text_lower = text.lower()
-    has_keyword = any(kw in text_lower for kw in language_keywords)
-    
-    if not has_keyword:
-        return None
+    detection = detect_language_locally(text)
+    if detection.confident:
+        LANGUAGE_DETECTIONS.labels(method="local").inc()
+        return detection.language
     
-    # Use LLM for precise extraction
+    LANGUAGE_DETECTIONS.labels(method="llm").inc()
+    logger.debug(f"Ambiguous language request ({detection.reason}), asking the LLM")
     prompt = LANGUAGE_DETECTION_PROMPT.format(text=text)
-    result = await invoke_with_retry(prompt)
+    result = await invoke_with_retry(prompt, prompt_type="language_detection")
     result = result.strip()
     
     if result.upper() == "NONE":
@@ -74,6 +74,81 @@ async def fetch_transcript(video_id: str) -> list[dict]:
     except Exception as e:
         raise ValueError(f"Could not fetch transcript: {str(e)}")
 
+# ── Transcript Normalisation ───────────────────────────────────────────────
+# Auto-generated captions repeat text across rolling caption windows and are
+# full of non-speech annotations and filler. Removing it before chunking and
+# summarising saves embedding slots and LLM tokens.
+
+# [Music], [Applause], (laughter), ♪ lyrics markers, ">>" speaker changes
+_ANNOTATION_RE = re.compile(r"\[[^\]]*\]|\((?:music|applause|laughter|laughs|inaudible|silence)[^)]*\)|[♪♫]+|>>",
+                            re.IGNORECASE)
+# "mm" alone is left in: it is far more often millimetres than a hesitation
+_FILLER_RE = re.compile(r"\b(?:u+m+|u+h+|uhm+|erm+|hmm+|mhm+|mmm+)\b[,.]?", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+MAX_OVERLAP_WORDS = 20   # longest repeated caption window looked for
+MIN_ENTRY_WORDS = 4      # entries shorter than this are merged with a neighbour
+MAX_MERGE_SECONDS = 10   # ...as long as the merged entry spans at most this long
+
+
+def _clean_caption(text: str) -> str:
+    text = _ANNOTATION_RE.sub(" ", text)
+    text = _FILLER_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip(" ,")
+
+
+def _overlap_words(previous: list[str], current: list[str]) -> int:
+    """Number of leading words of `current` that repeat the end of `previous`.
+    
+    A single repeated word only counts when it is the whole entry, since
+    speech repeats single words ("the", "so") across captions all the time.
+    """
+    prev_lower = [w.lower() for w in previous[-MAX_OVERLAP_WORDS:]]
+    cur_lower = [w.lower() for w in current[:MAX_OVERLAP_WORDS]]
+    for size in range(min(len(prev_lower), len(cur_lower)), 0, -1):
+        if prev_lower[-size:] == cur_lower[:size] and (size > 1 or len(current) == 1):
+            return size
+    return 0
+
+
+def _extend(entry: dict, other: dict, text: str):
+    """Append `text` from `other` to `entry`, keeping the entry's start."""
+    if text:
+        entry["text"] = f"{entry['text']} {text}"
+    end = other.get("start", 0.0) + other.get("duration", 0.0)
+    entry["duration"] = max(entry.get("duration", 0.0), end - entry.get("start", 0.0))
+
+
+def normalize_transcript(transcript: list[dict]) -> list[dict]:
+    """Strip annotations, filler and rolling-caption repeats, then merge tiny entries.
+    
+    Returns new entries in the same shape; each keeps the `start` of its
+    first source entry, and its `duration` covers everything merged into it.
+    Idempotent, so already-normalised transcripts pass through unchanged.
+    """
+    normalized: list[dict] = []
+    for entry in transcript:
+        words = _clean_caption(entry.get("text", "")).split()
+        if normalized and words:
+            # Rolling captions re-show the tail of the previous window
+            words = words[_overlap_words(normalized[-1]["text"].split(), words):]
+        if not words:
+            if normalized:
+                _extend(normalized[-1], entry, "")
+            continue
+        
+        text = " ".join(words)
+        if normalized:
+            last = normalized[-1]
+            micro = len(words) < MIN_ENTRY_WORDS or len(last["text"].split()) < MIN_ENTRY_WORDS
+            span = entry.get("start", 0.0) + entry.get("duration", 0.0) - last.get("start", 0.0)
+            if micro and span <= MAX_MERGE_SECONDS:
+                _extend(last, entry, text)
+                continue
+        normalized.append({"text": text, "start": entry.get("start", 0.0), "duration": entry.get("duration", 0.0)})
+    return normalized
+
+
 def get_full_text(transcript: list[dict]) -> str:
     """Concatenate transcript snippet texts into a single string."""
     return " ".join(entry.get("text", "") for entry in transcript)
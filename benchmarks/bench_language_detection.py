@@ -0,0 +1,124 @@
+"""
+Benchmark: local language-request detection vs. the old keyword gate + LLM.
+
+Runs every message in tests/data/language_requests.jsonl through both
+paths of `detect_language_request` and reports LLM calls, latency
+percentiles and accuracy against the labels.
+
+The old path sent any message containing one of a fixed list of keywords
+to the LLM and let every other message through as "no language request".
+By default the LLM is simulated as an oracle that answers with the label
+after a fixed delay, so the old path's accuracy is an upper bound and its
+misses are the keyword gate's. Pass --live to call Groq (needs
+GROQ_API_KEY and a reachable Redis for the budget scheduler).
+
+    python -m benchmarks.bench_language_detection
+    python -m benchmarks.bench_language_detection --live
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CORPUS_PATH = Path(__file__).parent.parent / "tests" / "data" / "language_requests.jsonl"
+SIMULATED_CALL_S = 0.35  # simulated round trip of a short classification call
+
+# The pre-detector heuristic from app/services/translation.py
+LEGACY_KEYWORDS = [
+    "in hindi", "in tamil", "in telugu", "in kannada", "in marathi",
+    "in bengali", "in gujarati", "in malayalam", "in punjabi",
+    "hindi me", "hindi mein", "हिंदी", "தமிழ்", "తెలుగు", "ಕನ್ನಡ",
+    "summarize in", "explain in", "translate to", "translate in",
+]
+
+
+def load_corpus() -> list[dict]:
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Meter:
+    def __init__(self, labels: dict[str, str | None]):
+        self.labels = labels
+        self.current: str | None = None  # message being detected
+        self.calls = 0
+
+    async def fake_invoke(self, prompt: str, *args, **kwargs) -> str:
+        self.calls += 1
+        await asyncio.sleep(SIMULATED_CALL_S)
+        label = self.labels.get(self.current)
+        return label if label and label != "ambiguous" else "NONE"
+
+    def wrap_live(self, invoke):
+        async def live_invoke(prompt: str, *args, **kwargs) -> str:
+            self.calls += 1
+            return await invoke(prompt, *args, **kwargs)
+        return live_invoke
+
+
+async def legacy_detect(text: str) -> str | None:
+    from app.services import translation
+
+    if not any(kw in text.lower() for kw in LEGACY_KEYWORDS):
+        return None
+    result = (await translation.invoke_with_retry(
+        translation.LANGUAGE_DETECTION_PROMPT.format(text=text))).strip()
+    return None if result.upper() == "NONE" else result
+
+
+def correct(result: str | None, expected: str | None) -> bool:
+    # Ambiguous messages have no single right answer; only a wrong language counts against
+    if expected == "ambiguous":
+        return True
+    return (result or None) == expected
+
+
+async def run_case(corpus: list[dict], detect, live: bool) -> dict:
+    from app.services import translation
+
+    meter = Meter({case["text"]: case["expected"] for case in corpus})
+    invoke = meter.wrap_live(translation.invoke_with_retry) if live else meter.fake_invoke
+    latencies, right = [], 0
+    with patch.object(translation, "invoke_with_retry", invoke):
+        for case in corpus:
+            meter.current = case["text"]
+            start = time.perf_counter()
+            result = await detect(case["text"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            right += correct(result, case["expected"])
+    latencies.sort()
+    return {
+        "calls": meter.calls,
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+        "accuracy": right / len(corpus),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="call Groq instead of the simulated LLM")
+    args = parser.parse_args()
+
+    if not args.live:
+        os.environ.setdefault("GROQ_API_KEY", "offline")
+        os.environ.setdefault("TELEGRAM_TOKEN", "0:offline")
+    from app.services.translation import detect_language_request
+
+    corpus = load_corpus()
+    print(f"{len(corpus)} labelled messages")
+    print(f"{'mode':<16} {'LLM calls':>9} {'p50 ms':>8} {'p99 ms':>8} {'accuracy':>8}")
+    for mode, detect in (("keywords + LLM", legacy_detect), ("local first", detect_language_request)):
+        r = await run_case(corpus, detect, args.live)
+        print(f"{mode:<16} {r['calls']:>9} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['accuracy']:>8.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,205 @@
+"""
+Benchmark: map-reduce summarisation vs. truncation for long transcripts.
+
+Compares LLM calls, token spend, end-to-end latency and transcript coverage
+of `generate_summary(hierarchical=True)` against the old truncation path.
+
+By default the LLM is simulated: each call sleeps for a fixed overhead plus
+a per-token generation time, so the numbers reflect call structure and
+parallelism rather than Groq's current load. Calls still go through
+`invoke_with_retry` and the Groq budget scheduler, whose Redis buckets are
+replaced by an in-memory copy on a clock running --speedup times faster than
+real time; latencies are reported in simulated seconds. Pass --live to call
+Groq (needs GROQ_API_KEY and a reachable Redis for the budget scheduler).
+
+    python -m benchmarks.bench_summary --minutes 30 60 120
+    python -m benchmarks.bench_summary --minutes 60 --live
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS_PER_MINUTE = 150          # typical speaking rate
+CALL_OVERHEAD_S = 0.4           # simulated time to first token
+OUTPUT_TOKENS_PER_S = 250       # simulated generation speed
+SIMULATED_SUMMARY_TOKENS = 350  # simulated completion length
+
+SENTENCES = [
+    "Today we look at how neural networks learn from data.",
+    "The speaker explains gradient descent with a simple example.",
+    "Pricing strategy depends on the customer segment you target.",
+    "She argues that most startups underestimate distribution costs.",
+    "Regularisation keeps the model from memorising the training set.",
+    "The guest shares three lessons from scaling the support team.",
+]
+
+
+def make_transcript(minutes: int) -> str:
+    words_needed = minutes * WORDS_PER_MINUTE
+    out, words, i = [], 0, 0
+    while words < words_needed:
+        sentence = f"{SENTENCES[i % len(SENTENCES)]} (minute {words // WORDS_PER_MINUTE})"
+        out.append(sentence)
+        words += len(sentence.split())
+        i += 1
+    return " ".join(out)
+
+
+def simulated_scheduler(model: str, speedup: float):
+    """The Groq budget scheduler with its Redis buckets kept in memory, on a sped-up clock."""
+    from app.core.llm_scheduler import LLMScheduler
+
+    class SimulatedScheduler(LLMScheduler):
+        def __init__(self):
+            super().__init__(model)
+            self.requests, self.tokens, self.ts = float(self.rpm), float(self.tpm), self._now()
+
+        @staticmethod
+        def _now() -> float:
+            return time.monotonic() * speedup
+
+        def _refill(self):
+            now = self._now()
+            elapsed, self.ts = now - self.ts, now
+            self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+            self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+        async def _take(self, r, cost: int, lane: str) -> float:
+            # Same arithmetic as _ACQUIRE_LUA; waits are returned in real seconds
+            reserve = self.reserves[lane]
+            cost = min(cost, self.tpm * (1 - reserve))
+            self._refill()
+            wait = max(0.0,
+                       (1 + reserve * self.rpm - self.requests) * 60 / self.rpm,
+                       (cost + reserve * self.tpm - self.tokens) * 60 / self.tpm)
+            if wait == 0:
+                self.requests -= 1
+                self.tokens -= cost
+            return wait / speedup
+
+        async def settle(self, charged: int, used: int | None):
+            if charged and used is not None:
+                self._refill()
+                self.tokens = min(self.tpm, self.tokens + charged - used)
+
+        def min_seconds(self, tokens: int, requests: int, lane: str) -> float:
+            return super().min_seconds(tokens, requests, lane) / speedup
+
+    return SimulatedScheduler()
+
+
+class Meter:
+    def __init__(self, count_tokens, speedup: float = 1.0):
+        self.count_tokens = count_tokens
+        self.speedup = speedup
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    async def fake_ainvoke(self, prompt: str, *args, **kwargs):
+        self.calls += 1
+        prompt_tokens = self.count_tokens(prompt)
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += SIMULATED_SUMMARY_TOKENS
+        await asyncio.sleep((CALL_OVERHEAD_S + SIMULATED_SUMMARY_TOKENS / OUTPUT_TOKENS_PER_S) / self.speedup)
+        return SimpleNamespace(
+            content="summary " * SIMULATED_SUMMARY_TOKENS,
+            usage_metadata={"input_tokens": prompt_tokens, "output_tokens": SIMULATED_SUMMARY_TOKENS,
+                            "total_tokens": prompt_tokens + SIMULATED_SUMMARY_TOKENS},
+        )
+
+    def wrap_live(self, invoke):
+        async def live_invoke(prompt: str, *args, **kwargs) -> str:
+            self.calls += 1
+            self.prompt_tokens += self.count_tokens(prompt)
+            result = await invoke(prompt, *args, **kwargs)
+            self.completion_tokens += self.count_tokens(result)
+            return result
+        return live_invoke
+
+
+async def run_case(transcript: str, hierarchical: bool, live: bool, speedup: float) -> dict:
+    from app.core import llm_client
+    from app.services import llm
+
+    speedup = 1.0 if live else speedup
+    meter = Meter(llm._count_tokens, speedup)
+    condensed = {}
+    condense = llm.condense_transcript
+
+    async def watch_condense(text, *args, **kwargs):
+        condensed["text"] = await condense(text, *args, **kwargs)
+        return condensed["text"]
+
+    patches = [patch.object(llm, "condense_transcript", watch_condense)]
+    if live:
+        patches.append(patch.object(llm, "invoke_with_retry", meter.wrap_live(llm.invoke_with_retry)))
+    else:
+        # No Redis or Groq needed: the real retry and budget code runs against
+        # a simulated model and in-memory buckets, with cold caches every run
+        scheduler = simulated_scheduler(llm_client.llm.model_name, speedup)
+        patches += [
+            patch.object(llm_client, "llm", SimpleNamespace(model_name="simulated", temperature=0.0,
+                                                            ainvoke=meter.fake_ainvoke)),
+            patch.object(llm_client, "scheduler", scheduler),
+            patch.object(llm, "scheduler", scheduler),
+            patch.object(llm_client, "_get_cached_response", AsyncMock(return_value=None)),
+            patch.object(llm_client, "_cache_response", AsyncMock()),
+            patch.object(llm, "get_cached_section_summaries", AsyncMock(side_effect=lambda vid, keys: [None] * len(keys))),
+            patch.object(llm, "cache_section_summaries", AsyncMock()),
+            patch.object(llm.settings, "SUMMARY_MAP_TIMEOUT", llm.settings.SUMMARY_MAP_TIMEOUT / speedup),
+        ]
+    for p in patches:
+        p.start()
+    try:
+        start = time.perf_counter()
+        await llm.generate_summary(transcript, "Benchmark Video", hierarchical=hierarchical)
+        elapsed = (time.perf_counter() - start) * speedup
+    finally:
+        for p in patches:
+            p.stop()
+
+    transcript_tokens = llm._count_tokens(transcript)
+    # A map phase that ran out of time leaves the transcript to be truncated
+    mapped = hierarchical and condensed.get("text", transcript) != transcript
+    covered = transcript_tokens if mapped else min(transcript_tokens, llm.MAX_TRANSCRIPT_TOKENS)
+    return {
+        "calls": meter.calls,
+        "prompt": meter.prompt_tokens,
+        "completion": meter.completion_tokens,
+        "seconds": elapsed,
+        "coverage": covered / transcript_tokens,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=int, nargs="+", default=[20, 60, 120], help="video lengths to simulate")
+    parser.add_argument("--live", action="store_true", help="call Groq instead of the simulated LLM")
+    parser.add_argument("--speedup", type=float, default=20.0, help="simulated clock rate (ignored with --live)")
+    args = parser.parse_args()
+
+    if not args.live:
+        os.environ.setdefault("GROQ_API_KEY", "offline")
+        os.environ.setdefault("TELEGRAM_TOKEN", "0:offline")
+    from app.services import llm
+
+    print(f"{'video':>6} {'tokens':>7} {'mode':<12} {'calls':>5} {'prompt tok':>10} "
+          f"{'compl tok':>9} {'latency s':>9} {'coverage':>8}")
+    for minutes in args.minutes:
+        transcript = make_transcript(minutes)
+        tokens = llm._count_tokens(transcript)
+        for mode, hierarchical in (("truncate", False), ("map-reduce", True)):
+            r = await run_case(transcript, hierarchical, args.live, args.speedup)
+            print(f"{minutes:>4}m {tokens:>7} {mode:<12} {r['calls']:>5} {r['prompt']:>10} "
+                  f"{r['completion']:>9} {r['seconds']:>9.2f} {r['coverage']:>8.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import json
+import pytest
+import numpy as np
+from unittest.mock import AsyncMock, patch
+
+
+def _unit(*values):
+    vector = np.array(values, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def _entry(question: str, answer: str, embedding: np.ndarray) -> str:
+    from app.rag.answer_cache import _encode_embedding
+    return json.dumps({"question": question, "answer": answer, "embedding": _encode_embedding(embedding)})
+
+
+class TestFollowUpDetection:
+    """Test which questions bypass the shared answer cache."""
+
+    def test_no_history_is_never_a_follow_up(self):
+        from app.rag.answer_cache import is_follow_up
+        assert is_follow_up("Can you explain that?", []) is False
+
+    def test_anaphora_with_history_is_a_follow_up(self):
+        from app.rag.answer_cache import is_follow_up
+        history = [{"question": "Who is the speaker?", "answer": "Jane Doe."}]
+        assert is_follow_up("What else did she say?", history) is True
+        assert is_follow_up("What about pricing?", history) is True
+
+    def test_standalone_question_with_history(self):
+        from app.rag.answer_cache import is_follow_up
+        history = [{"question": "Who is the speaker?", "answer": "Jane Doe."}]
+        assert is_follow_up("What is gradient descent?", history) is False
+
+
+@pytest.mark.asyncio
+class TestSemanticAnswerCache:
+    """Test similarity lookups and bounded storage."""
+
+    async def test_similar_question_hits(self, mock_redis):
+        from app.rag.answer_cache import SemanticAnswerCache
+
+        mock_redis.hgetall = AsyncMock(return_value={
+            "a": _entry("What is the main point?", "Neural networks.", _unit(1, 0, 0)),
+            "b": _entry("Who is the speaker?", "Jane Doe.", _unit(0, 1, 0)),
+        })
+        mock_redis.zadd = AsyncMock()
+        cache = SemanticAnswerCache(similarity=0.9)
+
+        with patch("app.rag.answer_cache.get_redis", AsyncMock(return_value=mock_redis)):
+            answer = await cache.lookup("vid123", _unit(1, 0.1, 0))
+
+        assert answer == "Neural networks."
+        mock_redis.zadd.assert_called_once()  # LRU position refreshed
+        assert cache.hit_rate == 1.0
+
+    async def test_dissimilar_question_misses(self, mock_redis):
+        from app.rag.answer_cache import SemanticAnswerCache
+
+        mock_redis.hgetall = AsyncMock(return_value={
+            "a": _entry("What is the main point?", "Neural networks.", _unit(1, 0, 0)),
+        })
+        cache = SemanticAnswerCache(similarity=0.9)
+
+        with patch("app.rag.answer_cache.get_redis", AsyncMock(return_value=mock_redis)):
+            assert await cache.lookup("vid123", _unit(0, 0, 1)) is None
+        assert cache.hit_rate == 0.0
+
+    async def test_redis_errors_are_misses(self, mock_redis):
+        from app.rag.answer_cache import SemanticAnswerCache
+
+        mock_redis.hgetall = AsyncMock(side_effect=ConnectionError("down"))
+        cache = SemanticAnswerCache()
+
+        with patch("app.rag.answer_cache.get_redis", AsyncMock(return_value=mock_redis)):
+            assert await cache.lookup("vid123", _unit(1, 0, 0)) is None
+
+    async def test_store_is_bounded(self, mock_redis):
+        from app.rag.answer_cache import SemanticAnswerCache, ANSWER_CACHE_PREFIX
+
+        mock_redis.eval = AsyncMock(return_value=1)
+        cache = SemanticAnswerCache(max_entries=10, ttl=3600)
+
+        with patch("app.rag.answer_cache.get_redis", AsyncMock(return_value=mock_redis)):
+            await cache.store("vid123", "What is the main point?", _unit(1, 0, 0), "Neural networks.")
+
+        args = mock_redis.eval.call_args.args
+        assert args[2] == f"{ANSWER_CACHE_PREFIX}{{vid123}}"
+        assert args[-2:] == (10, 3600)
+
+    async def test_store_keys_share_a_cluster_slot(self, mock_redis):
+        from redis.crc import key_slot
+        from app.rag.answer_cache import SemanticAnswerCache
+
+        mock_redis.eval = AsyncMock(return_value=0)
+        with patch("app.rag.answer_cache.get_redis", AsyncMock(return_value=mock_redis)):
+            await SemanticAnswerCache().store("vid123", "What is the main point?", _unit(1, 0, 0), "Neural networks.")
+
+        entries_key, lru_key = mock_redis.eval.call_args.args[2:4]
+        assert key_slot(entries_key.encode()) == key_slot(lru_key.encode())
@@ -7,3 +7,11 @@ def test_health_check():
     response = client.get("/api/health")
     assert response.status_code == 200
     assert response.json() == {"status": "ok", "app": "Telegram YouTube Summarizer Bot"}
+
+def test_metrics_endpoint():
+    client = TestClient(app)
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "llm_request_seconds" in response.text
+    assert "video_processing_stage_seconds" in response.text
@@ -0,0 +1,143 @@
+import threading
+import pytest
+import numpy as np
+from collections import defaultdict, deque
+from unittest.mock import patch
+
+
+class _FakeListRedis:
+    """Thread-safe in-memory stand-in for the Redis list commands the service uses."""
+
+    def __init__(self):
+        self.lists = defaultdict(deque)
+        self.cond = threading.Condition()
+
+    def rpush(self, key, value):
+        with self.cond:
+            self.lists[key].append(value.encode() if isinstance(value, str) else value)
+            self.cond.notify_all()
+
+    def lpop(self, key):
+        with self.cond:
+            return self.lists[key].popleft() if self.lists[key] else None
+
+    def blpop(self, keys, timeout=0):
+        with self.cond:
+            found = self.cond.wait_for(lambda: any(self.lists[key] for key in keys), timeout=timeout)
+            if not found:
+                return None
+            key = next(key for key in keys if self.lists[key])
+            return key.encode(), self.lists[key].popleft()
+
+    def expire(self, key, ttl):
+        pass
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+
+def _fake_encode(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+    return encode
+
+
+class TestEmbeddingService:
+    """Test the micro-batching embedding service and its client."""
+
+    @pytest.fixture
+    def fake_redis(self):
+        fake = _FakeListRedis()
+        with patch("app.rag.embedding_service._redis", fake):
+            yield fake
+
+    def test_reply_round_trip(self):
+        from app.rag.embedding_service import encode_reply, decode_reply
+
+        vectors = np.array([[0.5, -1.0], [2.0, 3.0]], dtype=np.float32)
+        assert decode_reply(encode_reply(vectors), 2) == vectors.tolist()
+
+    def test_queued_requests_share_one_encode_call(self, fake_redis):
+        from app.rag.embedding_service import EmbeddingServer, remote_embeddings
+
+        calls = []
+        server = EmbeddingServer(_fake_encode(calls), client=fake_redis, window=0.05)
+        results = {}
+        clients = [
+            threading.Thread(target=lambda text=text: results.__setitem__(text, remote_embeddings([text], timeout=5)))
+            for text in ("a", "bb", "ccc")
+        ]
+        for client in clients:
+            client.start()
+        # Let all three requests reach the queue before the first batch is served
+        with fake_redis.cond:
+            fake_redis.cond.wait_for(lambda: len(fake_redis.lists["embedding:requests"]) == 3, timeout=5)
+        server.serve_batch(server.collect())
+        for client in clients:
+            client.join(timeout=5)
+
+        assert len(calls) == 1
+        assert sorted(calls[0]) == ["a", "bb", "ccc"]
+        assert results == {"a": [[1.0, 1.0]], "bb": [[2.0, 1.0]], "ccc": [[3.0, 1.0]]}
+
+    def test_batch_is_bounded_by_texts(self, fake_redis):
+        import json
+        from app.rag.embedding_service import EmbeddingServer, REQUEST_QUEUE
+
+        for i in range(5):
+            fake_redis.rpush(REQUEST_QUEUE, json.dumps({"id": str(i), "texts": ["x", "y"]}))
+        server = EmbeddingServer(_fake_encode([]), client=fake_redis, window=0, max_batch=4)
+
+        assert len(server.collect()) == 2
+        assert len(server.collect()) == 2
+
+    def test_expired_requests_are_skipped(self, fake_redis):
+        from app.rag.embedding_service import EmbeddingServer
+
+        calls = []
+        server = EmbeddingServer(_fake_encode(calls), client=fake_redis)
+        server.serve_batch([{"id": "gone", "texts": ["late"], "expires": 0}])
+        assert calls == []
+
+    def test_encode_failure_reaches_caller(self, fake_redis):
+        from app.rag.embedding_service import EmbeddingServer, REPLY_PREFIX, decode_reply
+
+        def broken(texts):
+            raise ValueError("model exploded")
+
+        EmbeddingServer(broken, client=fake_redis).serve_batch([{"id": "r1", "texts": ["hi"]}])
+        payload = fake_redis.lpop(f"{REPLY_PREFIX}r1")
+        with pytest.raises(RuntimeError, match="model exploded"):
+            decode_reply(payload, 1)
+
+    def test_reply_ttl_is_sent_as_an_integer(self):
+        import redis
+        from app.rag.embedding_service import EmbeddingServer
+
+        # A real redis-py pipeline, so arguments go through its encoder
+        client = redis.Redis()
+        pipe = client.pipeline()
+        with patch.object(client, "pipeline", return_value=pipe), patch.object(pipe, "execute"):
+            EmbeddingServer(_fake_encode([]), client=client).serve_batch([{"id": "r1", "texts": ["hi"]}])
+
+        expire = next(args for args, _ in pipe.command_stack if args[0] == "EXPIRE")
+        assert client.connection_pool.get_encoder().encode(expire[2]).isdigit()
+
+    def test_client_times_out_without_server(self, fake_redis):
+        from app.rag.embedding_service import remote_embeddings
+
+        with pytest.raises(TimeoutError):
+            remote_embeddings(["hello"], timeout=0.05)
+
+    def test_remote_mode_never_loads_model(self):
+        from app.rag import embeddings
+
+        with patch.object(embeddings.settings, "EMBEDDING_MODE", "remote"), \
+             patch.object(embeddings, "_get_model", side_effect=AssertionError("model loaded")), \
+             patch("app.rag.embedding_service.remote_embeddings", return_value=[[0.1, 0.2]]) as remote:
+            assert embeddings.get_embedding("hello") == [0.1, 0.2]
+            remote.assert_called_once_with(["hello"])
@@ -0,0 +1,162 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+class _FakeChatModel:
+    """Local stand-in for ChatGroq with a fixed delay."""
+
+    def __init__(self, model_name: str, delay: float, reply: str, error: Exception | None = None):
+        self.model_name = model_name
+        self.delay = delay
+        self.reply = reply
+        self.error = error
+        self.cancelled = False
+
+    async def ainvoke(self, prompt: str):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return AIMessage(content=self.reply)
+
+    async def astream(self, prompt: str):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        for word in self.reply.split(" "):
+            yield AIMessageChunk(content=word + " ")
+
+
+def _make_hedger(max_ratio: float = 1.0, warm: bool = True):
+    from app.core.hedging import Hedger
+
+    fallback_scheduler = AsyncMock()
+    fallback_scheduler.try_acquire = AsyncMock(return_value=100)
+    hedger = Hedger(fallback_scheduler, percentile=0.95, max_ratio=max_ratio, min_delay=0.01)
+    if warm:
+        for _ in range(30):
+            hedger.tracker.observe("primary-model", "total", 0.05)
+            hedger.tracker.observe("primary-model", "first_token", 0.05)
+    return hedger
+
+
+@pytest.mark.asyncio
+class TestHedger:
+    """Test hedged requests against fake chat models."""
+
+    async def test_fast_primary_is_not_hedged(self):
+        hedger = _make_hedger()
+        primary = _FakeChatModel("primary-model", 0.01, "primary answer")
+        fallback = _FakeChatModel("fallback-model", 0.01, "fallback answer")
+
+        response, role = await hedger.ainvoke(primary, fallback, "prompt", "interactive")
+        assert (response.content, role) == ("primary answer", "primary")
+        hedger.fallback_scheduler.try_acquire.assert_not_called()
+
+    async def test_slow_primary_loses_to_fallback_and_is_cancelled(self):
+        hedger = _make_hedger()
+        primary = _FakeChatModel("primary-model", 5, "primary answer")
+        fallback = _FakeChatModel("fallback-model", 0.01, "fallback answer")
+
+        response, role = await hedger.ainvoke(primary, fallback, "prompt", "interactive")
+        await asyncio.sleep(0)
+        assert (response.content, role) == ("fallback answer", "fallback")
+        assert primary.cancelled
+
+    async def test_no_hedging_before_latency_is_known(self):
+        hedger = _make_hedger(warm=False)
+        primary = _FakeChatModel("primary-model", 0.2, "primary answer")
+        fallback = _FakeChatModel("fallback-model", 0.01, "fallback answer")
+
+        _, role = await hedger.ainvoke(primary, fallback, "prompt", "interactive")
+        assert role == "primary"
+
+    async def test_budget_caps_hedges(self):
+        hedger = _make_hedger(max_ratio=0.0)
+        primary = _FakeChatModel("primary-model", 0.2, "primary answer")
+        fallback = _FakeChatModel("fallback-model", 0.01, "fallback answer")
+
+        _, role = await hedger.ainvoke(primary, fallback, "prompt", "interactive")
+        assert role == "primary"
+        hedger.fallback_scheduler.try_acquire.assert_not_called()
+
+    async def test_failed_hedge_falls_back_to_primary(self):
+        hedger = _make_hedger()
+        primary = _FakeChatModel("primary-model", 0.2, "primary answer")
+        fallback = _FakeChatModel("fallback-model", 0.01, "", error=RuntimeError("boom"))
+
+        response, role = await hedger.ainvoke(primary, fallback, "prompt", "interactive")
+        assert (response.content, role) == ("primary answer", "primary")
+
+    async def test_stream_hedges_on_slow_first_token(self):
+        hedger = _make_hedger()
+        primary = _FakeChatModel("primary-model", 5, "slow primary")
+        fallback = _FakeChatModel("fallback-model", 0.01, "quick fallback")
+
+        text = "".join([delta async for delta in hedger.astream(primary, fallback, "prompt", "interactive")])
+        assert text == "quick fallback "
+        assert primary.cancelled
+
+
+    async def test_cancelled_primary_latency_is_not_recorded(self):
+        hedger = _make_hedger()
+        primary = _FakeChatModel("primary-model", 5, "primary answer")
+        fallback = _FakeChatModel("fallback-model", 0.01, "fallback answer")
+        before = list(hedger.tracker._samples[("primary-model", "total")])
+
+        _, role = await hedger.ainvoke(primary, fallback, "prompt", "interactive")
+        assert role == "fallback"
+        assert list(hedger.tracker._samples[("primary-model", "total")]) == before
+
+    async def test_losing_hedge_is_settled_with_its_prompt(self):
+        from app.core.llm_scheduler import count_tokens
+
+        hedger = _make_hedger()
+        primary = _FakeChatModel("primary-model", 0.2, "primary answer")
+        fallback = _FakeChatModel("fallback-model", 5, "fallback answer")
+
+        _, role = await hedger.ainvoke(primary, fallback, "prompt", "interactive")
+        assert role == "primary"
+        hedger.fallback_scheduler.settle.assert_awaited_once_with(100, count_tokens("prompt"))
+
+    async def test_winning_hedge_is_settled_with_its_usage(self):
+        from app.core.llm_scheduler import count_tokens
+
+        hedger = _make_hedger()
+        primary = _FakeChatModel("primary-model", 5, "slow primary")
+        fallback = _FakeChatModel("fallback-model", 0.01, "quick fallback")
+
+        text = "".join([delta async for delta in hedger.astream(primary, fallback, "prompt", "interactive")])
+        hedger.fallback_scheduler.settle.assert_awaited_once_with(100, count_tokens("prompt") + count_tokens(text))
+
+    async def test_stream_reports_winner(self):
+        hedger = _make_hedger()
+        primary = _FakeChatModel("primary-model", 5, "slow primary")
+        fallback = _FakeChatModel("fallback-model", 0.01, "quick fallback")
+
+        winner = {}
+        async for _ in hedger.astream(primary, fallback, "prompt", "interactive", winner_info=winner):
+            pass
+        assert winner == {"role": "fallback"}
+
+
+class TestHedgeBudget:
+    """Test the cap on extra calls."""
+
+    def test_ratio_is_enforced(self):
+        from app.core.hedging import HedgeBudget
+
+        budget = HedgeBudget(max_ratio=0.1)
+        hedges = 0
+        for _ in range(100):
+            allowed = budget.allow()
+            hedges += allowed
+            budget.record(allowed)
+        assert hedges == 10
@@ -0,0 +1,48 @@
+import json
+import pytest
+from pathlib import Path
+from app.services.language_detection import (
+    LANGUAGE_NAMES, LanguageDetection, detect_language_locally, dominant_script
+)
+from app.services.translation import SUPPORTED_LANGUAGES
+
+CORPUS_PATH = Path(__file__).parent / "data" / "language_requests.jsonl"
+AMBIGUOUS = "ambiguous"
+
+
+def _load_corpus() -> list[dict]:
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _label(detection: LanguageDetection) -> str | None:
+    return detection.language if detection.confident else AMBIGUOUS
+
+
+class TestLocalLanguageDetection:
+    """Local language-request detection against the labelled corpus."""
+    
+    @pytest.mark.parametrize("case", _load_corpus(), ids=lambda case: case["text"])
+    def test_corpus(self, case):
+        assert _label(detect_language_locally(case["text"])) == case["expected"]
+    
+    def test_corpus_covers_every_supported_language(self):
+        expected = {case["expected"] for case in _load_corpus()}
+        assert {language.title() for language in SUPPORTED_LANGUAGES} <= expected
+    
+    def test_names_cover_supported_languages(self):
+        assert set(LANGUAGE_NAMES) == SUPPORTED_LANGUAGES
+    
+    def test_zero_width_joiners_are_ignored(self):
+        assert detect_language_locally("ఇంగ్లీష్‌లో చెప్పండి").language == "English"
+    
+    def test_native_request_in_own_script_is_most_confident(self):
+        native = detect_language_locally("हिंदी में बताओ")
+        latin = detect_language_locally("explain in hindi")
+        assert native.language == latin.language == "Hindi"
+        assert native.confidence > latin.confidence
+    
+    def test_dominant_script(self):
+        assert dominant_script("What is this?") == "latin"
+        assert dominant_script("இது என்ன? ok") == "tamil"
+        assert dominant_script("123 !!") is None
@@ -1,3 +1,4 @@
+import asyncio
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from tests.conftest import SAMPLE_FULL_TEXT, SAMPLE_SUMMARY
@@ -79,6 +80,306 @@ class TestLLMService:
             assert "Action Points" in result
 
 
+@pytest.mark.asyncio
+class TestCachedActionPoints:
+    """Test per-video caching of /actionpoints."""
+    
+    async def test_cache_hit_skips_retrieval_and_llm(self):
+        with patch("app.services.llm.get_cached_actionpoints", AsyncMock(return_value="cached points")), \
+             patch("app.services.llm.AsyncVectorStore") as store, \
+             patch("app.services.llm.invoke_with_retry", AsyncMock()) as invoke:
+            from app.services.llm import get_actionpoints
+            
+            assert await get_actionpoints("vid") == "cached points"
+            store.open.assert_not_called()
+            invoke.assert_not_called()
+    
+    async def test_miss_generates_and_caches(self):
+        store = MagicMock()
+        store.asearch = AsyncMock(return_value=[{"text": "Step one: practise daily.", "tokens": 6}])
+        cache = AsyncMock()
+        with patch("app.services.llm.get_cached_actionpoints", AsyncMock(return_value=None)), \
+             patch("app.services.llm.cache_actionpoints", cache), \
+             patch("app.services.llm.AsyncVectorStore.open", AsyncMock(return_value=store)), \
+             patch("app.services.llm.invoke_with_retry", AsyncMock(return_value="fresh points")) as invoke:
+            from app.services.llm import get_actionpoints, LANE_BACKGROUND
+            
+            assert await get_actionpoints("vid", lane=LANE_BACKGROUND) == "fresh points"
+            assert invoke.call_args.kwargs["lane"] == LANE_BACKGROUND
+            cache.assert_awaited_once_with("vid", "fresh points")
+    
+    async def test_missing_index_returns_none(self):
+        store = MagicMock()
+        store.asearch = AsyncMock(return_value=[])
+        with patch("app.services.llm.get_cached_actionpoints", AsyncMock(return_value=None)), \
+             patch("app.services.llm.AsyncVectorStore.open", AsyncMock(return_value=store)), \
+             patch("app.services.llm.invoke_with_retry", AsyncMock()) as invoke:
+            from app.services.llm import get_actionpoints
+            
+            assert await get_actionpoints("vid") is None
+            invoke.assert_not_called()
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+@pytest.mark.asyncio
+class TestLLMResponseCache:
+    """Test the content-addressed response cache in invoke_with_retry."""
+    
+    async def test_cache_hit_skips_llm(self, mock_llm):
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.get_bounded_cache", AsyncMock(return_value="cached answer")):
+            from app.core.llm_client import invoke_with_retry
+            
+            assert await invoke_with_retry("same prompt") == "cached answer"
+            mock_llm.ainvoke.assert_not_called()
+    
+    async def test_cache_miss_stores_response(self, mock_llm):
+        set_cache = AsyncMock(return_value=0)
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.get_bounded_cache", AsyncMock(return_value=None)), \
+             patch("app.core.llm_client.set_bounded_cache", set_cache):
+            from app.core.llm_client import invoke_with_retry
+            
+            assert await invoke_with_retry("new prompt") == SAMPLE_SUMMARY
+            mock_llm.ainvoke.assert_called_once()
+            assert set_cache.call_args.args[2] == SAMPLE_SUMMARY
+    
+    async def test_opt_out_bypasses_cache(self, mock_llm):
+        get_cache = AsyncMock(return_value="cached answer")
+        set_cache = AsyncMock()
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.get_bounded_cache", get_cache), \
+             patch("app.core.llm_client.set_bounded_cache", set_cache):
+            from app.core.llm_client import invoke_with_retry
+            
+            assert await invoke_with_retry("prompt", use_cache=False) == SAMPLE_SUMMARY
+            get_cache.assert_not_called()
+            set_cache.assert_not_called()
+    
+    async def test_cache_errors_fall_back_to_llm(self, mock_llm):
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.get_bounded_cache", AsyncMock(side_effect=ConnectionError("down"))), \
+             patch("app.core.llm_client.set_bounded_cache", AsyncMock(side_effect=ConnectionError("down"))):
+            from app.core.llm_client import invoke_with_retry
+            
+            assert await invoke_with_retry("prompt") == SAMPLE_SUMMARY
+    
+    async def test_stream_cache_hit_yields_cached_text(self, mock_llm):
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.get_bounded_cache", AsyncMock(return_value="cached analysis")):
+            from app.core.llm_client import stream_with_retry
+            
+            assert [delta async for delta in stream_with_retry("deepdive prompt")] == ["cached analysis"]
+            mock_llm.astream.assert_not_called()
+    
+    async def test_stream_miss_stores_joined_response(self):
+        from langchain_core.messages import AIMessageChunk
+        
+        async def astream(prompt):
+            for part in ("Deep ", "dive"):
+                yield AIMessageChunk(content=part)
+        
+        model = MagicMock()
+        model.astream = astream
+        set_cache = AsyncMock(return_value=0)
+        with patch("app.core.llm_client.llm", model), \
+             patch("app.core.llm_client.settings.LLM_HEDGE_ENABLED", False), \
+             patch("app.core.llm_client.scheduler.acquire", AsyncMock(return_value=0)), \
+             patch("app.core.llm_client.get_bounded_cache", AsyncMock(return_value=None)), \
+             patch("app.core.llm_client.set_bounded_cache", set_cache):
+            from app.core.llm_client import stream_with_retry
+            
+            assert "".join([delta async for delta in stream_with_retry("prompt")]) == "Deep dive"
+            assert set_cache.call_args.args[2] == "Deep dive"
+    
+    async def test_stream_opt_out_bypasses_cache(self, mock_llm):
+        get_cache = AsyncMock(return_value="cached analysis")
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.settings.LLM_HEDGE_ENABLED", False), \
+             patch("app.core.llm_client.scheduler.acquire", AsyncMock(return_value=0)), \
+             patch("app.core.llm_client.get_bounded_cache", get_cache):
+            from app.core.llm_client import stream_with_retry
+            
+            mock_llm.astream = MagicMock(return_value=_aiter([]))
+            assert [delta async for delta in stream_with_retry("prompt", use_cache=False)] == []
+            get_cache.assert_not_called()
+    
+    async def test_fallback_win_refunds_completion_estimate(self, mock_llm):
+        settle = AsyncMock()
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.scheduler.acquire", AsyncMock(return_value=1500)), \
+             patch("app.core.llm_client.scheduler.settle", settle), \
+             patch("app.core.llm_client.hedger.ainvoke", AsyncMock(return_value=(MagicMock(content="fast"), "fallback"))), \
+             patch("app.core.llm_client.get_bounded_cache", AsyncMock(return_value=None)):
+            from app.core.llm_client import invoke_with_retry, count_tokens
+            
+            assert await invoke_with_retry("prompt") == "fast"
+            settle.assert_awaited_once_with(1500, count_tokens("prompt"))
+    
+    async def test_stream_settles_with_estimated_usage(self):
+        from langchain_core.messages import AIMessageChunk
+        
+        async def astream(prompt):
+            for part in ("Deep ", "dive"):
+                yield AIMessageChunk(content=part)
+        
+        model = MagicMock()
+        model.astream = astream
+        settle = AsyncMock()
+        with patch("app.core.llm_client.llm", model), \
+             patch("app.core.llm_client.settings.LLM_HEDGE_ENABLED", False), \
+             patch("app.core.llm_client.scheduler.acquire", AsyncMock(return_value=1500)), \
+             patch("app.core.llm_client.scheduler.settle", settle):
+            from app.core.llm_client import stream_with_retry, count_tokens
+            
+            assert "".join([delta async for delta in stream_with_retry("prompt", use_cache=False)]) == "Deep dive"
+            settle.assert_awaited_once_with(1500, count_tokens("prompt") + count_tokens("Deep dive"))
+    
+    async def test_failed_attempts_are_settled(self, mock_llm):
+        mock_llm.ainvoke = AsyncMock(side_effect=[Exception("429 rate limit"), MagicMock(content="ok", usage_metadata=None)])
+        settle = AsyncMock()
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.settings.LLM_HEDGE_ENABLED", False), \
+             patch("app.core.llm_client.scheduler.acquire", AsyncMock(return_value=1500)), \
+             patch("app.core.llm_client.scheduler.settle", settle), \
+             patch("app.core.llm_client.asyncio.sleep", AsyncMock()):
+            from app.core.llm_client import invoke_with_retry, count_tokens
+            
+            assert await invoke_with_retry("prompt", use_cache=False) == "ok"
+            assert [c.args for c in settle.await_args_list] == [
+                (1500, count_tokens("prompt")),
+                (1500, count_tokens("prompt") + count_tokens("ok")),
+            ]
+    
+    async def test_key_depends_on_model_and_prompt(self):
+        from app.core.llm_client import _response_cache_key, llm
+        
+        key = _response_cache_key("prompt")
+        assert key == _response_cache_key("prompt")
+        assert key != _response_cache_key("prompt ")
+        with patch.object(llm, "model_name", "another-model"):
+            assert key != _response_cache_key("prompt")
+
+
+@pytest.mark.asyncio
+class TestLLMMetrics:
+    """Test per-prompt-type latency, token and 429 metrics."""
+    
+    async def test_records_tokens_and_latency(self, mock_llm):
+        from prometheus_client import REGISTRY
+        mock_llm.ainvoke.return_value.usage_metadata = {"input_tokens": 120, "output_tokens": 30, "total_tokens": 150}
+        
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, {"prompt_type": "metrics_test", **labels}) or 0
+        
+        before_in, before_out = sample("llm_tokens_total", direction="input"), sample("llm_tokens_total", direction="output")
+        with patch("app.core.llm_client.llm", mock_llm):
+            from app.core.llm_client import invoke_with_retry
+            await invoke_with_retry("prompt", use_cache=False, prompt_type="metrics_test")
+        
+        assert sample("llm_tokens_total", direction="input") - before_in == 120
+        assert sample("llm_tokens_total", direction="output") - before_out == 30
+        assert sample("llm_request_seconds_count") >= 1
+    
+    async def test_counts_rate_limit_retries(self, mock_llm):
+        from prometheus_client import REGISTRY
+        mock_llm.ainvoke.side_effect = [Exception("429 Too Many Requests"), mock_llm.ainvoke.return_value]
+        labels = {"prompt_type": "retry_test", "outcome": "retried"}
+        
+        with patch("app.core.llm_client.llm", mock_llm), \
+             patch("app.core.llm_client.asyncio.sleep", AsyncMock()):
+            from app.core.llm_client import invoke_with_retry
+            assert await invoke_with_retry("prompt", use_cache=False, prompt_type="retry_test") == SAMPLE_SUMMARY
+        
+        assert REGISTRY.get_sample_value("llm_rate_limited_total", labels) == 1
+
+
+@pytest.mark.asyncio
+class TestMapReduceSummary:
+    """Test hierarchical summarisation of transcripts over the token budget."""
+    
+    async def test_short_transcript_is_unchanged(self):
+        from app.services.llm import condense_transcript
+        
+        with patch("app.services.llm.invoke_with_retry", AsyncMock()) as invoke:
+            assert await condense_transcript(SAMPLE_FULL_TEXT) == SAMPLE_FULL_TEXT
+            invoke.assert_not_called()
+    
+    async def test_sections_cover_whole_text(self):
+        from app.services.llm import _split_into_sections, _count_tokens
+        
+        text = "This is one sentence about training. " * 2000
+        sections = _split_into_sections(text, section_tokens=1000)
+        assert len(sections) > 1
+        assert all(_count_tokens(section) <= 1000 for section in sections)
+        assert all(section.endswith(".") for section in sections)
+        assert " ".join(sections) == text.strip()
+    
+    async def test_long_transcript_is_condensed_from_partials(self):
+        from app.services.llm import condense_transcript, _split_into_sections
+        
+        long_text = "Neural networks learn by gradient descent. " * 3000
+        sections = _split_into_sections(long_text)
+        cached = ["cached partial"] + [None] * (len(sections) - 1)
+        cache_write = AsyncMock()
+        
+        with patch("app.services.llm.invoke_with_retry", AsyncMock(return_value="fresh partial")) as invoke, \
+             patch("app.services.llm.get_cached_section_summaries", AsyncMock(return_value=cached)), \
+             patch("app.services.llm.cache_section_summaries", cache_write):
+            condensed = await condense_transcript(long_text, "Test Video", video_id="vid123")
+        
+        assert "cached partial" in condensed
+        assert condensed.count("fresh partial") == len(sections) - 1
+        assert invoke.call_count == len(sections) - 1
+        # Only the newly summarised sections are written back
+        assert len(cache_write.call_args.args[1]) == len(set(sections[1:]))
+    
+    async def test_map_over_the_groq_budget_falls_back_to_truncation(self):
+        from app.services.llm import condense_transcript
+        
+        long_text = "Neural networks learn by gradient descent. " * 3000
+        with patch("app.services.llm.invoke_with_retry", AsyncMock()) as invoke, \
+             patch("app.services.llm.get_cached_section_summaries", AsyncMock(side_effect=lambda vid, keys: [None] * len(keys))), \
+             patch("app.services.llm.settings.SUMMARY_MAP_TIMEOUT", 10.0):
+            assert await condense_transcript(long_text, "Test Video", video_id="vid123") == long_text
+            invoke.assert_not_called()
+    
+    async def test_map_past_deadline_caches_finished_sections(self):
+        from app.services.llm import condense_transcript
+        
+        long_text = "Neural networks learn by gradient descent. " * 3000
+        
+        async def invoke(prompt, **kwargs):
+            # The first section answers at once, the rest never do
+            if "part 1 of" not in prompt:
+                await asyncio.sleep(10)
+            return "fresh partial"
+        
+        cache_write = AsyncMock()
+        with patch("app.services.llm.invoke_with_retry", invoke), \
+             patch("app.services.llm.scheduler.min_seconds", return_value=0.0), \
+             patch("app.services.llm.get_cached_section_summaries", AsyncMock(side_effect=lambda vid, keys: [None] * len(keys))), \
+             patch("app.services.llm.cache_section_summaries", cache_write), \
+             patch("app.services.llm.settings.SUMMARY_MAP_TIMEOUT", 0.05):
+            assert await condense_transcript(long_text, "Test Video", video_id="vid123") == long_text
+        
+        assert list(cache_write.call_args.args[1].values()) == ["fresh partial"]
+    
+    async def test_map_concurrency_fits_the_background_budget(self):
+        from app.services.llm import _map_concurrency, SECTION_TOKENS
+        from app.core.llm_scheduler import LLMScheduler
+        
+        # 12k TPM with a 25% reserve pays for one ~7k-token map call at a time
+        with patch("app.services.llm.scheduler", LLMScheduler("m", rpm=30, tpm=12000, background_reserve=0.25)):
+            assert _map_concurrency() == 1
+        with patch("app.services.llm.scheduler", LLMScheduler("m", rpm=1000, tpm=SECTION_TOKENS * 100)):
+            assert _map_concurrency() == 3
+
+
 class TestTokenTruncation:
     """Test token-aware truncation."""
     
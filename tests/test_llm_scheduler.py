@@ -0,0 +1,73 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.mark.asyncio
+class TestLLMScheduler:
+    """Test waiting for shared Groq budget."""
+
+    async def test_acquires_immediately_with_budget(self, mock_redis):
+        from app.core.llm_scheduler import LLMScheduler, EXPECTED_COMPLETION_TOKENS, count_tokens
+
+        mock_redis.eval = AsyncMock(return_value="0")
+        scheduler = LLMScheduler("model", rpm=30, tpm=12000)
+
+        with patch("app.core.llm_scheduler.get_redis", AsyncMock(return_value=mock_redis)):
+            charged = await scheduler.acquire("Summarize this video")
+
+        assert charged == count_tokens("Summarize this video") + EXPECTED_COMPLETION_TOKENS
+        mock_redis.eval.assert_called_once()
+
+    async def test_waits_until_budget_frees_up(self, mock_redis):
+        from app.core.llm_scheduler import LLMScheduler
+
+        mock_redis.eval = AsyncMock(side_effect=["0.05", "0.05", "0"])
+        scheduler = LLMScheduler("model", rpm=30, tpm=12000)
+
+        with patch("app.core.llm_scheduler.get_redis", AsyncMock(return_value=mock_redis)), \
+             patch("app.core.llm_scheduler.asyncio.sleep", AsyncMock()) as sleep:
+            await scheduler.acquire("prompt")
+
+        assert mock_redis.eval.call_count == 3
+        assert sleep.call_count == 2
+
+    async def test_background_lane_keeps_reserve(self, mock_redis):
+        from app.core.llm_scheduler import LLMScheduler, LANE_BACKGROUND, LANE_INTERACTIVE
+
+        mock_redis.eval = AsyncMock(return_value="0")
+        scheduler = LLMScheduler("model", rpm=30, tpm=12000, background_reserve=0.25)
+
+        with patch("app.core.llm_scheduler.get_redis", AsyncMock(return_value=mock_redis)):
+            await scheduler.acquire("prompt", LANE_BACKGROUND)
+            await scheduler.acquire("prompt", LANE_INTERACTIVE)
+
+        background, interactive = mock_redis.eval.call_args_list
+        assert background.args[-1] == 0.25
+        assert interactive.args[-1] == 0.0
+
+    async def test_fails_open_without_redis(self, mock_redis):
+        from app.core.llm_scheduler import LLMScheduler
+
+        mock_redis.eval = AsyncMock(side_effect=ConnectionError("down"))
+        scheduler = LLMScheduler("model", rpm=30, tpm=12000)
+
+        with patch("app.core.llm_scheduler.get_redis", AsyncMock(return_value=mock_redis)):
+            assert await scheduler.acquire("prompt") == 0
+
+    async def test_disabled_without_limits(self):
+        from app.core.llm_scheduler import LLMScheduler
+
+        with patch("app.core.llm_scheduler.get_redis", AsyncMock()) as get_redis:
+            assert await LLMScheduler("model", rpm=0, tpm=0).acquire("prompt") == 0
+            get_redis.assert_not_called()
+
+    async def test_settle_returns_overcharge(self, mock_redis):
+        from app.core.llm_scheduler import LLMScheduler
+
+        mock_redis.eval = AsyncMock(return_value=1)
+        scheduler = LLMScheduler("model", rpm=30, tpm=12000)
+
+        with patch("app.core.llm_scheduler.get_redis", AsyncMock(return_value=mock_redis)):
+            await scheduler.settle(1000, 600)
+
+        assert mock_redis.eval.call_args.args[-2:] == (400, 12000)
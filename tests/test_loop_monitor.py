@@ -0,0 +1,32 @@
+import time
+import asyncio
+import pytest
+from app.core.metrics import EVENT_LOOP_LAG_SECONDS
+
+
+def _lag_sum() -> float:
+    samples = EVENT_LOOP_LAG_SECONDS.collect()[0].samples
+    return next(sample.value for sample in samples if sample.name.endswith("_sum"))
+
+
+@pytest.mark.asyncio
+class TestLoopLagMonitor:
+    """Test event-loop lag sampling."""
+
+    async def test_blocking_call_is_recorded_as_lag(self):
+        from app.core.loop_monitor import LoopLagMonitor
+
+        monitor = LoopLagMonitor(interval=0.01)
+        before = _lag_sum()
+        await monitor.start()
+        await asyncio.sleep(0.02)
+        time.sleep(0.2)  # blocks the loop
+        await asyncio.sleep(0.02)
+        await monitor.stop()
+
+        assert _lag_sum() - before >= 0.15
+
+    async def test_stop_without_start(self):
+        from app.core.loop_monitor import LoopLagMonitor
+
+        await LoopLagMonitor().stop()
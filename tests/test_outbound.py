@@ -0,0 +1,123 @@
+import time
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+from aiogram.exceptions import TelegramRetryAfter
+
+
+def _make_message(chat_id: int = 1, message_id: int = 10, chat_type: str = "private"):
+    message = MagicMock()
+    message.chat.id = chat_id
+    message.chat.type = chat_type
+    message.message_id = message_id
+    message.answer = AsyncMock(return_value="sent")
+    message.edit_text = AsyncMock(return_value=True)
+    message.delete = AsyncMock(return_value=True)
+    return message
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    import app.bot.outbound as outbound_module
+
+    monkeypatch.setattr(outbound_module, "PRIVATE_CHAT_INTERVAL", 0.2)
+    monkeypatch.setattr(outbound_module, "GROUP_CHAT_INTERVAL", 0.2)
+    return outbound_module.OutboundDispatcher(global_rate=1000)
+
+
+@pytest.mark.asyncio
+class TestOutboundDispatcher:
+    """Test paced, ordered delivery of outbound Telegram requests."""
+
+    async def test_send_returns_telegram_result(self, dispatcher):
+        message = _make_message()
+
+        assert await dispatcher.answer(message, "hello") == "sent"
+        message.answer.assert_called_once_with("hello")
+        await dispatcher.stop()
+
+    async def test_requests_to_one_chat_are_paced(self, dispatcher):
+        message = _make_message()
+
+        start = time.monotonic()
+        await asyncio.gather(*(dispatcher.answer(message, f"part {i}") for i in range(3)))
+        assert time.monotonic() - start >= 0.4
+        assert [c.args[0] for c in message.answer.call_args_list] == ["part 0", "part 1", "part 2"]
+        await dispatcher.stop()
+
+    async def test_other_chats_are_not_held_back(self, dispatcher):
+        first, second = _make_message(chat_id=1), _make_message(chat_id=2)
+
+        start = time.monotonic()
+        await asyncio.gather(dispatcher.answer(first, "a"), dispatcher.answer(second, "b"))
+        assert time.monotonic() - start < 0.2
+        await dispatcher.stop()
+
+    async def test_queued_edits_are_coalesced(self, dispatcher):
+        message = _make_message()
+        status_msg = _make_message(message_id=11)
+
+        # The send occupies the chat, so all three edits are still queued
+        results = await asyncio.gather(
+            dispatcher.answer(message, "first"),
+            dispatcher.edit_text(status_msg, "v1"),
+            dispatcher.edit_text(status_msg, "v2"),
+            dispatcher.edit_text(status_msg, "v3"),
+        )
+        status_msg.edit_text.assert_called_once_with("v3")
+        assert results[1:] == [True, True, True]
+        await dispatcher.stop()
+
+    async def test_retry_after_is_honoured(self, dispatcher):
+        message = _make_message()
+        message.answer.side_effect = [
+            TelegramRetryAfter(method=MagicMock(), message="Too Many Requests", retry_after=0.3),
+            "sent",
+        ]
+
+        start = time.monotonic()
+        assert await dispatcher.answer(message, "hello") == "sent"
+        assert time.monotonic() - start >= 0.3
+        assert message.answer.call_count == 2
+        await dispatcher.stop()
+
+    async def test_errors_reach_the_caller(self, dispatcher):
+        message = _make_message()
+        message.edit_text.side_effect = RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await dispatcher.edit_text(message, "hello")
+        await dispatcher.stop()
+
+    async def test_inflight_requests_are_referenced(self, dispatcher):
+        message = _make_message()
+        release = asyncio.Event()
+
+        async def slow_answer(text):
+            await release.wait()
+            return "sent"
+
+        message.answer.side_effect = slow_answer
+        pending = asyncio.create_task(dispatcher.answer(message, "hello"))
+        await asyncio.sleep(0.05)
+        assert len(dispatcher._inflight) == 1
+
+        release.set()
+        assert await pending == "sent"
+        await asyncio.sleep(0)
+        assert not dispatcher._inflight
+        await dispatcher.stop()
+
+    async def test_execute_survives_reset_queues(self, dispatcher):
+        import app.bot.outbound as outbound_module
+
+        message = _make_message()
+        op = outbound_module._Op("send", message, "hello")
+        future = asyncio.get_running_loop().create_future()
+        op.futures.append(future)
+
+        # _ensure_running cleared the queues while the request was in flight
+        dispatcher._wakeup = asyncio.Event()
+        await dispatcher._execute(message.chat.id, op)
+        assert future.result() == "sent"
+        assert dispatcher._queues == {}
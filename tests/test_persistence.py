@@ -0,0 +1,89 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.mark.asyncio
+class TestWriteBehindBuffer:
+    """Test batched write-behind persistence."""
+    
+    async def test_enqueue_does_not_touch_database(self):
+        from app.db.persistence import WriteBehindBuffer
+        
+        buffer = WriteBehindBuffer()
+        with patch("app.db.persistence.AsyncSessionLocal") as session_factory:
+            buffer.add_qa({"user_id": "1", "video_id": "abc", "question": "Q", "answer": "A", "language": "english"})
+            session_factory.assert_not_called()
+    
+    async def test_flush_writes_one_batch_per_table(self):
+        from app.db.persistence import WriteBehindBuffer
+        
+        buffer = WriteBehindBuffer()
+        buffer._insert_qa = AsyncMock()
+        buffer._upsert_videos = AsyncMock()
+        for i in range(3):
+            buffer.add_qa({"user_id": str(i), "video_id": "abc", "question": "Q", "answer": "A", "language": "english"})
+        buffer.add_video({"video_id": "abc", "title": "T1", "summary": "S1"})
+        buffer.add_video({"video_id": "abc", "title": "T2", "summary": "S2"})
+        
+        await buffer.flush()
+        
+        buffer._insert_qa.assert_called_once()
+        assert len(buffer._insert_qa.call_args[0][0]) == 3
+        # Repeated writes for one video are coalesced into the latest values
+        buffer._upsert_videos.assert_called_once_with([{"video_id": "abc", "title": "T2", "summary": "S2"}])
+    
+    async def test_buffer_is_bounded(self):
+        from app.db.persistence import WriteBehindBuffer
+        
+        buffer = WriteBehindBuffer(max_size=2)
+        for i in range(5):
+            buffer.add_qa({"user_id": str(i), "video_id": "abc", "question": "Q", "answer": "A", "language": "english"})
+        assert [row["user_id"] for row in buffer._qa_rows] == ["3", "4"]
+    
+    async def test_failed_flush_requeues_records(self):
+        from app.db.persistence import WriteBehindBuffer
+        
+        buffer = WriteBehindBuffer()
+        buffer._insert_qa = AsyncMock(side_effect=Exception("connection refused"))
+        buffer.add_qa({"user_id": "1", "video_id": "abc", "question": "Q", "answer": "A", "language": "english"})
+        
+        await buffer.flush()
+        assert len(buffer._qa_rows) == 1
+    
+    async def test_partial_failure_requeues_only_unwritten_batches(self):
+        from app.db.persistence import WriteBehindBuffer
+        
+        buffer = WriteBehindBuffer(batch_size=2)
+        buffer._insert_qa = AsyncMock(side_effect=[None, Exception("connection reset"), None])
+        for i in range(5):
+            buffer.add_qa({"user_id": str(i), "video_id": "abc", "question": "Q", "answer": "A", "language": "english"})
+        
+        await buffer.flush()
+        # The first batch committed before the failure and must not be written again
+        assert [row["user_id"] for row in buffer._qa_rows] == ["2", "3", "4"]
+    
+    async def test_poison_batch_is_dropped_after_max_attempts(self):
+        from app.db.persistence import WriteBehindBuffer, MAX_WRITE_ATTEMPTS
+        
+        buffer = WriteBehindBuffer()
+        buffer._insert_qa = AsyncMock(side_effect=Exception("value too long"))
+        buffer.add_qa({"user_id": "1", "video_id": "abc", "question": "Q", "answer": "A", "language": "english"})
+        
+        for _ in range(MAX_WRITE_ATTEMPTS):
+            await buffer.flush()
+        assert buffer._insert_qa.call_count == MAX_WRITE_ATTEMPTS
+        assert buffer._qa_rows == []
+        assert buffer._attempts == {}
+    
+    async def test_flush_if_due_waits_for_batch_or_interval(self):
+        from app.db.persistence import WriteBehindBuffer
+        
+        buffer = WriteBehindBuffer(batch_size=2, flush_interval=3600)
+        buffer.flush = AsyncMock()
+        buffer.add_qa({"user_id": "1", "video_id": "abc", "question": "Q", "answer": "A", "language": "english"})
+        await buffer.flush_if_due()
+        buffer.flush.assert_not_called()
+        
+        buffer.add_qa({"user_id": "2", "video_id": "abc", "question": "Q", "answer": "A", "language": "english"})
+        await buffer.flush_if_due()
+        buffer.flush.assert_called_once()
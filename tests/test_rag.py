@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 from app.rag.chunking import chunk_transcript
 from tests.conftest import SAMPLE_TRANSCRIPT
 
@@ -53,3 +54,170 @@ class TestChunkTranscript:
         small_chunks = chunk_transcript(SAMPLE_TRANSCRIPT, chunk_size=10, chunk_overlap=2)
         large_chunks = chunk_transcript(SAMPLE_TRANSCRIPT, chunk_size=100, chunk_overlap=20)
         assert len(small_chunks) >= len(large_chunks)
+
+
+class TestTokenIndex:
+    """Test prefix-sum token budgeting over transcript entries and chunks."""
+    
+    def test_total_matches_entry_counts(self):
+        from app.rag.token_index import TokenIndex, count_tokens_batch
+        
+        index = TokenIndex.build(SAMPLE_TRANSCRIPT)
+        assert index.total_tokens == sum(count_tokens_batch([e["text"] for e in SAMPLE_TRANSCRIPT]))
+        assert index.text() == " ".join(e["text"] for e in SAMPLE_TRANSCRIPT)
+    
+    def test_cut_stays_within_budget_at_entry_boundary(self):
+        from app.rag.token_index import TokenIndex
+        
+        index = TokenIndex.build(SAMPLE_TRANSCRIPT)
+        budget = index.prefix[4] + 2  # a bit more than four entries
+        assert index.cut(budget) == " ".join(e["text"] for e in SAMPLE_TRANSCRIPT[:4])
+        assert index.cut(index.total_tokens) == index.text()
+        assert index.cut(0) == ""
+    
+    def test_rebuilt_from_cached_counts(self):
+        from app.rag.token_index import TokenIndex
+        
+        index = TokenIndex.build(SAMPLE_TRANSCRIPT)
+        assert TokenIndex.from_counts(SAMPLE_TRANSCRIPT, index.counts) == index
+    
+    def test_sections_cover_all_entries(self):
+        from app.rag.token_index import TokenIndex
+        
+        index = TokenIndex.build(SAMPLE_TRANSCRIPT)
+        sections = index.sections(25)
+        assert len(sections) > 1
+        assert " ".join(sections) == index.text()
+    
+    def test_fit_chunks_uses_stored_counts(self):
+        from app.rag.token_index import fit_chunks
+        
+        chunks = [{"text": "first", "tokens": 100}, {"text": "second", "tokens": 100}, {"text": "third"}]
+        assert fit_chunks(chunks, 150) == "first"
+        assert fit_chunks(chunks, 201) == "first\n\nsecond"
+        assert fit_chunks(chunks, 1000) == "first\n\nsecond\n\nthird"
+
+
+class _FakeSyncRedis:
+    """Minimal bytes-returning stand-in for the FAISS store's sync Redis client."""
+    
+    def __init__(self):
+        self.data = {}
+        self.reads = []
+    
+    def get(self, key):
+        self.reads.append(key)
+        return self.data.get(key)
+    
+    def mget(self, *keys):
+        self.reads.extend(keys)
+        return [self.data.get(key) for key in keys]
+    
+    def pipeline(self):
+        return self
+    
+    def setex(self, key, ttl, value):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+    
+    def execute(self):
+        return []
+
+
+class TestVectorStoreCache:
+    """Test the process-local cache of loaded FAISS indexes."""
+    
+    @pytest.fixture
+    def store_env(self):
+        import numpy as np
+        from app.rag import vector_store
+        
+        fake = _FakeSyncRedis()
+        cache = vector_store.VectorStoreCache(max_bytes=10_000_000)
+        embeddings = lambda texts: np.random.default_rng(len(texts)).random((len(texts), 8)).tolist()
+        with patch.object(vector_store, "_sync_redis", fake), \
+             patch.object(vector_store, "vector_store_cache", cache), \
+             patch.object(vector_store, "get_embeddings", embeddings):
+            yield vector_store, fake, cache
+    
+    def test_current_version_skips_index_transfer(self, store_env):
+        vector_store, fake, cache = store_env
+        vector_store.VectorStore("abc").add_chunks([{"text": "one"}, {"text": "two"}])
+        cache.clear()
+        
+        first = vector_store.VectorStore("abc")
+        assert first.index.ntotal == 2
+        fake.reads.clear()
+        
+        second = vector_store.VectorStore("abc")
+        assert second.index is first.index
+        assert fake.reads == ["faiss_version:abc"]
+    
+    def test_new_version_reloads(self, store_env):
+        vector_store, fake, cache = store_env
+        vector_store.VectorStore("abc").add_chunks([{"text": "one"}])
+        cached = vector_store.VectorStore("abc")
+        
+        # Another process, with its own cache, adds to the index
+        with patch.object(vector_store, "vector_store_cache", vector_store.VectorStoreCache(10_000_000)):
+            vector_store.VectorStore("abc").add_chunks([{"text": "two"}, {"text": "three"}])
+        
+        reloaded = vector_store.VectorStore("abc")
+        assert reloaded.index is not cached.index
+        assert reloaded.index.ntotal == 3
+    
+    def test_add_chunks_does_not_mutate_shared_index(self, store_env):
+        vector_store, fake, cache = store_env
+        vector_store.VectorStore("abc").add_chunks([{"text": "one"}])
+        shared = vector_store.VectorStore("abc")
+        
+        vector_store.VectorStore("abc").add_chunks([{"text": "two"}])
+        assert shared.index.ntotal == 1
+        assert len(shared.metadata) == 1
+    
+    def test_unversioned_index_is_not_cached(self, store_env):
+        vector_store, fake, cache = store_env
+        vector_store.VectorStore("abc").add_chunks([{"text": "one"}])
+        del fake.data["faiss_version:abc"]
+        cache.clear()
+        
+        assert vector_store.VectorStore("abc").index.ntotal == 1
+        assert cache.get("abc", None) is None
+    
+    @pytest.mark.asyncio
+    async def test_async_store_reads_through_async_client(self, store_env):
+        from unittest.mock import AsyncMock
+        vector_store, fake, cache = store_env
+        vector_store.VectorStore("abc").add_chunks([{"text": "one"}, {"text": "two"}])
+        cache.clear()
+        
+        async_redis = AsyncMock()
+        async_redis.get.side_effect = fake.get
+        async_redis.mget.side_effect = fake.mget
+        with patch.object(vector_store, "_async_redis", async_redis), \
+             patch.object(fake, "get", side_effect=AssertionError("sync Redis used")):
+            store = await vector_store.AsyncVectorStore.open("abc")
+            assert store.index.ntotal == 2
+            
+            query = store.index.reconstruct(0).reshape(1, -1)
+            assert await store.asearch("", top_k=1, query_embedding=query) == [{"text": "one"}]
+            
+            # Served from the process cache the second time
+            again = await vector_store.AsyncVectorStore.open("abc")
+            assert again.index is store.index
+            assert async_redis.mget.await_count == 1
+    
+    def test_evicts_least_recently_used_by_bytes(self):
+        from app.rag.vector_store import VectorStoreCache
+        
+        cache = VectorStoreCache(max_bytes=100)
+        cache.put("a", "v1", "index-a", [], 40)
+        cache.put("b", "v1", "index-b", [], 40)
+        assert cache.get("a", "v1") == ("index-a", [])
+        cache.put("c", "v1", "index-c", [], 40)
+        
+        assert cache.get("b", "v1") is None
+        assert cache.get("a", "v1") is not None
+        assert cache.get("c", "v1") is not None
+        
+        cache.put("huge", "v1", "index-huge", [], 101)
+        assert cache.get("huge", "v1") is None
@@ -1,6 +1,6 @@
 import pytest
 import json
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 
 @pytest.mark.asyncio
@@ -46,6 +46,25 @@ class TestRedisCache:
             await cache_summary("abc123", "This is a summary")
             mock_redis.setex.assert_called_once()
     
+    async def test_new_summary_drops_translations(self, mock_redis):
+        with patch("app.db.redis_client.get_redis", return_value=mock_redis):
+            from app.db.redis_client import cache_summary
+            
+            await cache_summary("abc123", "This is a summary")
+            mock_redis.delete.assert_called_once_with("summary_translations:abc123")
+    
+    async def test_translated_summary_keyed_by_language(self, mock_redis):
+        mock_redis.hget = AsyncMock(return_value="सारांश")
+        
+        with patch("app.db.redis_client.get_redis", return_value=mock_redis):
+            from app.db.redis_client import cache_translated_summary, get_cached_translated_summary
+            
+            await cache_translated_summary("abc123", "Hindi", "सारांश")
+            mock_redis.pipeline.return_value.hset.assert_called_once_with("summary_translations:abc123", "hindi", "सारांश")
+            
+            assert await get_cached_translated_summary("abc123", "HINDI") == "सारांश"
+            mock_redis.hget.assert_called_once_with("summary_translations:abc123", "hindi")
+    
     async def test_get_cached_summary_hit(self, mock_redis):
         mock_redis.get = AsyncMock(return_value="Cached summary")
         
@@ -55,6 +74,55 @@ class TestRedisCache:
             result = await get_cached_summary("abc123")
             assert result == "Cached summary"
 
+    
+    async def test_bounded_cache_declares_keys_in_one_slot(self, mock_redis):
+        mock_redis.eval = AsyncMock(return_value=[])
+        
+        with patch("app.db.redis_client.get_redis", return_value=mock_redis):
+            from app.db.redis_client import set_bounded_cache
+            
+            assert await set_bounded_cache("llm_cache", "abc", "value", ttl=60, max_entries=10) == 0
+            args = mock_redis.eval.call_args.args
+            assert args[1:4] == (2, "{llm_cache}:index", "{llm_cache}:abc")
+            mock_redis.delete.assert_not_called()
+    
+    async def test_bounded_cache_caller_deletes_evicted_keys(self, mock_redis):
+        mock_redis.eval = AsyncMock(return_value=["{llm_cache}:old1", "{llm_cache}:old2"])
+        
+        with patch("app.db.redis_client.get_redis", return_value=mock_redis):
+            from app.db.redis_client import set_bounded_cache
+            
+            assert await set_bounded_cache("llm_cache", "abc", "value", ttl=60, max_entries=1) == 2
+            mock_redis.delete.assert_awaited_once_with("{llm_cache}:old1", "{llm_cache}:old2")
+    
+    async def test_bounded_cache_hit_restarts_ttl(self, mock_redis):
+        pipe = mock_redis.pipeline.return_value
+        pipe.get = MagicMock()
+        pipe.zadd = MagicMock()
+        pipe.execute = AsyncMock(return_value=["value", 1, True, True])
+        
+        with patch("app.db.redis_client.get_redis", return_value=mock_redis):
+            from app.db.redis_client import get_bounded_cache
+            
+            assert await get_bounded_cache("llm_cache", "abc", ttl=60) == "value"
+            pipe.zadd.assert_called_once()
+            assert [c.args for c in pipe.expire.call_args_list] == [
+                ("{llm_cache}:abc", 60), ("{llm_cache}:index", 60),
+            ]
+    
+    async def test_bounded_cache_many_restarts_ttls(self, mock_redis):
+        pipe = mock_redis.pipeline.return_value
+        pipe.mget = MagicMock()
+        pipe.zadd = MagicMock()
+        pipe.execute = AsyncMock(return_value=[["a", None], 1, True, False, True])
+        
+        with patch("app.db.redis_client.get_redis", return_value=mock_redis):
+            from app.db.redis_client import get_bounded_cache_many
+            
+            assert await get_bounded_cache_many("tr", ["k1", "k2"], ttl=60) == ["a", None]
+            assert [c.args for c in pipe.expire.call_args_list] == [
+                ("{tr}:k1", 60), ("{tr}:k2", 60), ("{tr}:index", 60),
+            ]
 
 @pytest.mark.asyncio
 class TestRateLimiting:
@@ -1,6 +1,6 @@
 import pytest
 import json
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 
 @pytest.mark.asyncio
@@ -66,4 +66,95 @@ class TestSessionManagement:
             from app.bot.session import clear_conversation_history
             
             await clear_conversation_history(123, "abc")
-            mock_redis.delete.assert_called_with("history:123:abc")
+            mock_redis.delete.assert_called_with("history:{session:123}:abc")
+
+
+@pytest.mark.asyncio
+class TestUserSession:
+    """Test the one-round-trip per-update session."""
+    
+    async def test_load_in_single_call(self, mock_redis):
+        mock_redis.eval = AsyncMock(return_value=[
+            "Hindi", "abc", [json.dumps({"question": "Q1", "answer": "A1"})], 1
+        ])
+        with patch("app.bot.session.get_redis", return_value=mock_redis):
+            from app.bot.session import UserSession
+            
+            session = await UserSession.load(123, ("question", 30, 3600))
+            assert session.language == "Hindi"
+            assert session.current_video == "abc"
+            assert session.history == [{"question": "Q1", "answer": "A1"}]
+            assert session.allowed is True
+            mock_redis.eval.assert_called_once()
+            assert mock_redis.eval.call_args[0][1:4] == (2, "session:123", "ratelimit:question:{session:123}")
+    
+    async def test_load_without_rate_limit_declares_only_the_session(self, mock_redis):
+        mock_redis.eval = AsyncMock(return_value=[None, None, [], 1])
+        with patch("app.bot.session.get_redis", return_value=mock_redis):
+            from app.bot.session import UserSession
+            
+            await UserSession.load(123)
+            assert mock_redis.eval.call_args[0][1:3] == (1, "session:123")
+    
+    async def test_keys_share_the_session_slot(self):
+        from redis.crc import key_slot
+        from app.bot.session import _session_key, _history_key
+        from app.db.redis_client import rate_limit_key
+        
+        slot = key_slot(_session_key(123).encode())
+        assert key_slot(_history_key(123, "abc").encode()) == slot
+        assert key_slot(rate_limit_key(123, "question").encode()) == slot
+    
+    async def test_load_defaults(self, mock_redis):
+        mock_redis.eval = AsyncMock(return_value=[None, None, [], 0])
+        with patch("app.bot.session.get_redis", return_value=mock_redis):
+            from app.bot.session import UserSession
+            
+            session = await UserSession.load(123)
+            assert session.language == "english"
+            assert session.current_video is None
+            assert session.allowed is False
+    
+    async def test_flush_writes_in_one_pipeline(self, mock_redis):
+        pipe = mock_redis.pipeline.return_value
+        pipe.hset = MagicMock()
+        pipe.delete = MagicMock()
+        pipe.rpush = MagicMock()
+        pipe.ltrim = MagicMock()
+        with patch("app.bot.session.get_redis", return_value=mock_redis):
+            from app.bot.session import UserSession
+            
+            session = UserSession(123, "english", "old", [])
+            session.switch_video("new")
+            session.add_history("What is ML?", "ML is...")
+            await session.flush()
+            
+            mock_redis.pipeline.assert_called_once()
+            pipe.hset.assert_called_once_with("session:123", mapping={"current_video": "new"})
+            pipe.delete.assert_called_once_with("history:{session:123}:new")
+            pipe.rpush.assert_called_once()
+            assert pipe.rpush.call_args[0][0] == "history:{session:123}:new"
+            pipe.execute.assert_called_once()
+    
+    async def test_flush_without_changes_skips_redis(self, mock_redis):
+        with patch("app.bot.session.get_redis", return_value=mock_redis):
+            from app.bot.session import UserSession
+            
+            await UserSession(123, "english", "abc", []).flush()
+            mock_redis.pipeline.assert_not_called()
+    
+    async def test_refund_only_when_slot_was_consumed(self, mock_redis):
+        pipe = mock_redis.pipeline.return_value
+        pipe.eval = MagicMock()
+        with patch("app.bot.session.get_redis", return_value=mock_redis):
+            from app.bot.session import UserSession
+            
+            denied = UserSession(123, "english", "abc", [], rate_action="question", allowed=False)
+            denied.refund_rate_limit()
+            await denied.flush()
+            pipe.eval.assert_not_called()
+            
+            allowed = UserSession(123, "english", "abc", [], rate_action="question", allowed=True)
+            allowed.refund_rate_limit()
+            await allowed.flush()
+            assert pipe.eval.call_args[0][2] == "ratelimit:question:{session:123}"
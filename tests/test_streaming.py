@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+class _PassthroughOutbound:
+    """Sends immediately, so tests don't wait out the dispatcher's pacing."""
+
+    async def answer(self, message, text, **kwargs):
+        return await message.answer(text, **kwargs)
+
+    async def edit_text(self, message, text, **kwargs):
+        return await message.edit_text(text, **kwargs)
+
+    async def delete(self, message):
+        return await message.delete()
+
+
+@pytest.fixture(autouse=True)
+def passthrough_outbound():
+    with patch("app.bot.streaming.outbound", _PassthroughOutbound()):
+        yield
+
+
+def _make_message(chat_type: str = "private"):
+    message = MagicMock()
+    message.chat.type = chat_type
+    message.answer = AsyncMock(side_effect=lambda text: _make_sent(text))
+    return message
+
+
+def _make_sent(text: str):
+    sent = MagicMock()
+    sent.text = text
+    sent.edit_text = AsyncMock()
+    return sent
+
+
+async def _tokens(*parts):
+    for part in parts:
+        yield part
+
+
+@pytest.mark.asyncio
+class TestStreamingReply:
+    """Test throttled progressive rendering of streamed answers."""
+
+    async def test_final_text_lands_in_status_message(self):
+        from app.bot.streaming import StreamingReply
+
+        message = _make_message()
+        status_msg = _make_sent("🤔 Thinking...")
+
+        text = await StreamingReply(message, status_msg).consume(_tokens("Hello", " world", "!"))
+        assert text == "Hello world!"
+        status_msg.edit_text.assert_called_with("Hello world!")
+        message.answer.assert_not_called()
+
+    async def test_edits_are_throttled(self):
+        from app.bot.streaming import StreamingReply
+
+        message = _make_message()
+        status_msg = _make_sent("🤔 Thinking...")
+        reply = StreamingReply(message, status_msg)
+        reply.edit_interval = 3600
+
+        await reply.consume(_tokens(*["token "] * 50))
+        # One early edit plus the final one, not one per token
+        assert status_msg.edit_text.call_count <= 2
+
+    async def test_rolls_over_at_message_boundary(self):
+        from app.bot.streaming import StreamingReply, MESSAGE_CHUNK_SIZE
+
+        message = _make_message()
+        status_msg = _make_sent("🤔 Thinking...")
+
+        text = await StreamingReply(message, status_msg).consume(
+            _tokens("a" * MESSAGE_CHUNK_SIZE, "b" * 10)
+        )
+        assert len(text) == MESSAGE_CHUNK_SIZE + 10
+        status_msg.edit_text.assert_called_with("a" * MESSAGE_CHUNK_SIZE)
+        message.answer.assert_called_once_with("b" * 10)
+
+    async def test_group_chats_use_slower_edit_rate(self):
+        from app.bot.streaming import StreamingReply, GROUP_EDIT_INTERVAL
+
+        reply = StreamingReply(_make_message("supergroup"), None)
+        assert reply.edit_interval == GROUP_EDIT_INTERVAL
+
+    async def test_complete_renders_missing_suffix(self):
+        from app.bot.streaming import StreamingReply
+
+        message = _make_message()
+        status_msg = _make_sent("⏳ Processing...")
+        reply = StreamingReply(message, status_msg)
+
+        await reply.feed("🎥 Title: Intro")
+        await reply.complete("🎥 Title: Intro to ML ⚡ (cached)")
+        status_msg.edit_text.assert_called_with("🎥 Title: Intro to ML ⚡ (cached)")
+
+    async def test_complete_replaces_diverged_stream(self):
+        from app.bot.streaming import StreamingReply
+
+        message = _make_message()
+        status_msg = _make_sent("⏳ Processing...")
+        reply = StreamingReply(message, status_msg)
+
+        await reply.feed("partial output from a failed attempt")
+        text = await reply.complete("Final summary")
+        assert text == "Final summary"
+        status_msg.edit_text.assert_called_with("Final summary")
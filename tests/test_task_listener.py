@@ -0,0 +1,50 @@
+import pytest
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+
+@pytest.mark.asyncio
+class TestTaskResultListener:
+    """Test push-based task completion waiting."""
+
+    async def test_returns_already_stored_result(self):
+        from app.bot.task_listener import TaskResultListener
+
+        listener = TaskResultListener()
+        listener.start = AsyncMock()
+        stored = {"status": "success", "summary": "done"}
+
+        with patch("app.bot.task_listener.get_task_result", AsyncMock(return_value=stored)):
+            result = await listener.wait_for_result("task-1", timeout=1)
+            assert result == stored
+            assert listener._waiters == {}
+
+    async def test_resolves_all_waiters_on_publish(self):
+        from app.bot.task_listener import TaskResultListener
+
+        listener = TaskResultListener()
+        listener.start = AsyncMock()
+        published = {"status": "success", "summary": "pushed"}
+
+        with patch("app.bot.task_listener.get_task_result", AsyncMock(return_value=None)):
+            waiters = [
+                asyncio.create_task(listener.wait_for_result("task-1", timeout=1))
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0)
+            listener._resolve("task-1", published)
+            results = await asyncio.gather(*waiters)
+
+        assert results == [published] * 3
+        assert listener._waiters == {}
+
+    async def test_timeout_returns_none(self):
+        from app.bot.task_listener import TaskResultListener
+
+        listener = TaskResultListener()
+        listener.start = AsyncMock()
+
+        with patch("app.bot.task_listener.get_task_result", AsyncMock(return_value=None)):
+            result = await listener.wait_for_result("task-1", timeout=0.01)
+            assert result is None
+            assert listener._waiters == {}
@@ -0,0 +1,79 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.bot.ui_strings import UI_STRINGS, CATALOGUE_FORMAT, UICatalogue, ui_text, build_catalogue
+from app.services.translation import SUPPORTED_LANGUAGES
+
+
+def _write_catalogue(path, languages, source=None):
+    path.write_text(json.dumps({
+        "format": CATALOGUE_FORMAT,
+        "built_at": "2026-01-01T00:00:00+00:00",
+        "source": source if source is not None else dict(UI_STRINGS),
+        "languages": languages,
+    }, ensure_ascii=False), encoding="utf-8")
+
+
+@pytest.mark.asyncio
+class TestUIText:
+    """Test UI string lookup from the pre-translated catalogue."""
+    
+    async def test_english_needs_no_translation(self):
+        with patch("app.bot.ui_strings.translate_text", AsyncMock()) as translate:
+            assert await ui_text("processing", "English", video_id="abc") == \
+                "⏳ Processing video `abc`... This may take a moment."
+            translate.assert_not_called()
+    
+    async def test_catalogue_hit_is_formatted_without_llm(self, tmp_path):
+        path = tmp_path / "ui_strings.json"
+        _write_catalogue(path, {"hindi": {"processing": "⏳ वीडियो `{video_id}` प्रोसेस हो रहा है..."}})
+        with patch("app.bot.ui_strings.ui_catalogue", UICatalogue(path)), \
+             patch("app.bot.ui_strings.translate_text", AsyncMock()) as translate:
+            assert await ui_text("processing", "Hindi", video_id="abc") == "⏳ वीडियो `abc` प्रोसेस हो रहा है..."
+            translate.assert_not_called()
+    
+    async def test_stale_entries_fall_back_to_translation(self, tmp_path):
+        path = tmp_path / "ui_strings.json"
+        source = dict(UI_STRINGS, thinking="🤔 Hmm...")
+        _write_catalogue(path, {"hindi": {"thinking": "🤔 हम्म..."}}, source=source)
+        with patch("app.bot.ui_strings.ui_catalogue", UICatalogue(path)), \
+             patch("app.bot.ui_strings.translate_text", AsyncMock(return_value="🤔 सोच रहा हूँ...")) as translate:
+            assert await ui_text("thinking", "Hindi") == "🤔 सोच रहा हूँ..."
+            translate.assert_awaited_once_with(UI_STRINGS["thinking"], "Hindi")
+    
+    async def test_missing_catalogue_falls_back_to_translation(self, tmp_path):
+        catalogue = UICatalogue(tmp_path / "missing.json")
+        with patch("app.bot.ui_strings.ui_catalogue", catalogue), \
+             patch("app.bot.ui_strings.translate_text", AsyncMock(return_value="translated")) as translate:
+            assert await ui_text("processing", "Tamil", video_id="abc") == "translated"
+            # The fallback translates the formatted string, so the LLM never sees a placeholder
+            translate.assert_awaited_once_with("⏳ Processing video `abc`... This may take a moment.", "Tamil")
+        assert catalogue.load() == 0
+
+
+class TestShippedCatalogue:
+    """Test the catalogue file committed with the app."""
+    
+    @pytest.mark.parametrize("language", sorted(SUPPORTED_LANGUAGES - {"english"}))
+    def test_covers_every_string(self, language):
+        catalogue = UICatalogue()
+        missing = [string_id for string_id in UI_STRINGS if catalogue.lookup(string_id, language) is None]
+        assert not missing, f"{language} has no catalogue entry for {missing}; run python -m app.bot.ui_strings"
+
+
+@pytest.mark.asyncio
+class TestBuildCatalogue:
+    """Test the offline catalogue build."""
+    
+    async def test_drops_translations_with_broken_placeholders(self):
+        async def fake_translate_batch(texts, language):
+            return [text.replace("{video_id}", "{वीडियो}") for text in texts]
+        
+        with patch("app.bot.ui_strings.translate_batch", fake_translate_batch):
+            catalogue = await build_catalogue(["hindi"])
+        
+        assert catalogue["source"] == UI_STRINGS
+        entries = catalogue["languages"]["hindi"]
+        assert "processing" not in entries
+        assert entries["thinking"] == UI_STRINGS["thinking"]
+        assert len(entries) == len(UI_STRINGS) - 1
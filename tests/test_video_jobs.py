@@ -0,0 +1,104 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.mark.asyncio
+class TestSingleFlightVideoJobs:
+    """Test per-video deduplication of processing jobs."""
+
+    async def test_first_requester_enqueues_task(self):
+        from app.bot import handlers
+
+        result = {"status": "success", "summary": "done"}
+        claim = AsyncMock(side_effect=lambda video_id, task_id: task_id)
+        task = MagicMock()
+
+        with patch.object(handlers, "claim_video_job", claim), \
+             patch.object(handlers, "process_video_task", task), \
+             patch.object(handlers.task_listener, "wait_for_result", AsyncMock(return_value=result)):
+            assert await handlers._run_video_job("abc") == result
+            task.apply_async.assert_called_once()
+            owner = claim.call_args[0][1]
+            assert task.apply_async.call_args.kwargs["task_id"] == owner
+
+    async def test_new_task_translates_for_requester(self):
+        from app.bot import handlers
+
+        task = MagicMock()
+        with patch.object(handlers, "claim_video_job", AsyncMock(side_effect=lambda video_id, task_id: task_id)), \
+             patch.object(handlers, "process_video_task", task), \
+             patch.object(handlers.task_listener, "wait_for_result", AsyncMock(return_value={"status": "success"})):
+            await handlers._run_video_job("abc", language="hindi")
+            assert task.apply_async.call_args.kwargs["args"] == ["abc", "hindi"]
+
+    async def test_concurrent_requester_attaches(self):
+        from app.bot import handlers
+
+        result = {"status": "success", "summary": "shared"}
+        wait = AsyncMock(return_value=result)
+        task = MagicMock()
+
+        with patch.object(handlers, "claim_video_job", AsyncMock(return_value="leader-task")), \
+             patch.object(handlers, "process_video_task", task), \
+             patch.object(handlers.task_listener, "wait_for_result", wait):
+            assert await handlers._run_video_job("abc") == result
+            task.apply_async.assert_not_called()
+            assert wait.call_args[0][0] == "leader-task"
+
+    async def test_takes_over_expired_lease(self):
+        from app.bot import handlers
+
+        result = {"status": "success", "summary": "recovered"}
+        claims = iter(["dead-task", None])
+
+        async def fake_claim(video_id, task_id):
+            owner = next(claims)
+            return owner or task_id
+
+        wait = AsyncMock(side_effect=[None, result])
+        task = MagicMock()
+
+        with patch.object(handlers, "claim_video_job", fake_claim), \
+             patch.object(handlers, "get_video_job_owner", AsyncMock(return_value=None)), \
+             patch.object(handlers, "get_task_result", AsyncMock(return_value=None)), \
+             patch.object(handlers, "process_video_task", task), \
+             patch.object(handlers.task_listener, "wait_for_result", wait):
+            assert await handlers._run_video_job("abc") == result
+            task.apply_async.assert_called_once()
+
+
+def _run_task(video_id: str, task_id: str):
+    from app.bot.tasks import process_video_task
+
+    process_video_task.push_request(id=task_id, retries=0)
+    try:
+        return process_video_task.run(video_id)
+    finally:
+        process_video_task.pop_request()
+
+
+class TestDuplicateVideoTask:
+    """Test that a task which loses the lease doesn't occupy a worker."""
+
+    def test_duplicate_returns_without_waiting(self):
+        from app.bot import tasks
+
+        with patch.object(tasks, "claim_video_job", AsyncMock(return_value="leader-task")), \
+             patch.object(tasks, "get_task_result", AsyncMock(return_value=None)), \
+             patch.object(tasks, "_process_video") as process, \
+             patch.object(tasks, "_notify_result") as notify:
+            assert _run_task("abc", "dup-task") is None
+            process.assert_not_called()
+            notify.assert_not_called()
+
+    def test_duplicate_republishes_finished_result(self):
+        from app.bot import tasks
+
+        result = {"status": "success", "summary": "shared"}
+        with patch.object(tasks, "claim_video_job", AsyncMock(return_value="leader-task")), \
+             patch.object(tasks, "get_task_result", AsyncMock(return_value=result)), \
+             patch.object(tasks, "_process_video") as process, \
+             patch.object(tasks, "_notify_result") as notify:
+            assert _run_task("abc", "dup-task") == result
+            process.assert_not_called()
+            notify.assert_called_once_with("dup-task", result)
@@ -0,0 +1,72 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+SAMPLE_UPDATE = {
+    "update_id": 1001,
+    "message": {
+        "message_id": 1,
+        "date": 1700000000,
+        "chat": {"id": 42, "type": "private"},
+        "from": {"id": 42, "is_bot": False, "first_name": "Test"},
+        "text": "/start",
+    },
+}
+
+
+@pytest.fixture
+def webhook_app():
+    from app.api.webhook import router
+
+    app = FastAPI()
+    app.state.bot = MagicMock()
+    app.state.dp = MagicMock()
+    app.state.dp.feed_update = AsyncMock()
+    app.include_router(router)
+    return app
+
+
+class TestTelegramWebhook:
+    """Test webhook secret validation and update deduplication."""
+
+    def test_rejects_missing_secret(self, webhook_app):
+        with patch("app.api.webhook.settings.WEBHOOK_SECRET", "s3cret"):
+            client = TestClient(webhook_app)
+            response = client.post("/telegram/webhook", json=SAMPLE_UPDATE)
+            assert response.status_code == 403
+            webhook_app.state.dp.feed_update.assert_not_called()
+
+    def test_rejects_wrong_secret(self, webhook_app):
+        with patch("app.api.webhook.settings.WEBHOOK_SECRET", "s3cret"):
+            client = TestClient(webhook_app)
+            response = client.post(
+                "/telegram/webhook", json=SAMPLE_UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"},
+            )
+            assert response.status_code == 403
+
+    def test_feeds_new_update_to_dispatcher(self, webhook_app):
+        with patch("app.api.webhook.settings.WEBHOOK_SECRET", "s3cret"), \
+             patch("app.api.webhook.mark_update_seen", AsyncMock(return_value=True)):
+            client = TestClient(webhook_app)
+            response = client.post(
+                "/telegram/webhook", json=SAMPLE_UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+            )
+            assert response.status_code == 200
+            webhook_app.state.dp.feed_update.assert_called_once()
+            update = webhook_app.state.dp.feed_update.call_args[0][1]
+            assert update.update_id == 1001
+
+    def test_skips_duplicate_update(self, webhook_app):
+        with patch("app.api.webhook.settings.WEBHOOK_SECRET", "s3cret"), \
+             patch("app.api.webhook.mark_update_seen", AsyncMock(return_value=False)):
+            client = TestClient(webhook_app)
+            response = client.post(
+                "/telegram/webhook", json=SAMPLE_UPDATE,
+                headers={"X-Telegram-Bot-Api-Secret-Token": "s3cret"},
+            )
+            assert response.status_code == 200
+            webhook_app.state.dp.feed_update.assert_not_called()
@@ -1,5 +1,5 @@
 import pytest
-from app.services.youtube import extract_video_id
+from app.services.youtube import extract_video_id, normalize_transcript
 
 
 class TestExtractVideoId:
@@ -46,3 +46,64 @@ class TestExtractVideoId:
     
     def test_short_url_with_params(self):
         assert extract_video_id("https://youtu.be/dQw4w9WgXcQ?t=42") == "dQw4w9WgXcQ"
+
+
+class TestNormalizeTranscript:
+    """Caption clean-up before chunking and summarising."""
+    
+    def test_strips_annotations_and_filler(self):
+        result = normalize_transcript([
+            {"text": "[Music]", "start": 0.0, "duration": 3.0},
+            {"text": "um so today uh we look at attention, um, in transformers", "start": 3.0, "duration": 4.0},
+            {"text": "♪ la la ♪ (applause) >> thanks everyone for coming along", "start": 30.0, "duration": 3.0},
+        ])
+        assert [entry["text"] for entry in result] == [
+            "so today we look at attention, in transformers",
+            "la la thanks everyone for coming along",
+        ]
+        assert result[0]["start"] == 3.0
+    
+    def test_units_survive_filler_removal(self):
+        result = normalize_transcript([
+            {"text": "mmm the bolt is 5 mm wide, hmm, and 20 MM long", "start": 0.0, "duration": 4.0},
+        ])
+        assert result[0]["text"] == "the bolt is 5 mm wide, and 20 MM long"
+    
+    def test_removes_rolling_caption_overlap(self):
+        result = normalize_transcript([
+            {"text": "the key idea behind attention is", "start": 0.0, "duration": 2.0},
+            {"text": "behind attention is that every token", "start": 2.0, "duration": 2.0},
+            {"text": "that every token looks at every other", "start": 4.0, "duration": 2.0},
+        ])
+        text = " ".join(entry["text"] for entry in result)
+        assert text == "the key idea behind attention is that every token looks at every other"
+    
+    def test_keeps_single_repeated_words(self):
+        result = normalize_transcript([
+            {"text": "we trained it for a week on the", "start": 0.0, "duration": 2.0},
+            {"text": "the full dataset of ten million images", "start": 2.0, "duration": 2.0},
+        ])
+        assert result[1]["text"] == "the full dataset of ten million images"
+    
+    def test_merges_micro_entries_keeping_first_start(self):
+        result = normalize_transcript([
+            {"text": "okay", "start": 5.0, "duration": 0.5},
+            {"text": "right", "start": 5.5, "duration": 0.5},
+            {"text": "let's get started with the first example", "start": 6.0, "duration": 3.0},
+            {"text": "and here is something completely different", "start": 40.0, "duration": 3.0},
+        ])
+        assert len(result) == 2
+        assert result[0] == {"text": "okay right let's get started with the first example", "start": 5.0, "duration": 4.0}
+        assert result[1]["start"] == 40.0
+    
+    def test_is_idempotent(self):
+        transcript = [
+            {"text": "[Music] hello and welcome back to the channel", "start": 0.0, "duration": 3.0},
+            {"text": "to the channel today we build a compiler", "start": 3.0, "duration": 3.0},
+            {"text": "uh", "start": 6.0, "duration": 1.0},
+        ]
+        once = normalize_transcript(transcript)
+        assert normalize_transcript(once) == once
+    
+    def test_all_noise_gives_empty_transcript(self):
+        assert normalize_transcript([{"text": "[Music]", "start": 0.0, "duration": 60.0}]) == []